@@ -0,0 +1,254 @@
+"""Content-addressed cache for LLM classification results.
+
+Duplicate and near-template emails (newsletters, holiday wishes, repeated
+invoice reminders) produce the same cleaned text, so their LLM results can be
+reused instead of paying for another Groq call. Entries are keyed on a hash
+of the normalized output of `clean_email_text` plus the detected language,
+expire after a TTL and are evicted in LRU order once the cache is full.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+from .config import (
+    RESPONSE_CACHE_BACKEND,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_PATH,
+    RESPONSE_CACHE_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Fields of a classification result worth caching (metadata is per-request)
+CACHED_FIELDS = ("is_productive", "category", "suggested_subject", "suggested_body")
+
+
+class CacheBackend(ABC):
+    """Storage for cache entries with TTL expiry and LRU eviction.
+
+    Attributes:
+        ttl (float): Seconds an entry stays valid after being stored.
+        max_entries (int): Maximum number of entries before LRU eviction.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[dict]:
+        """Return the value stored under ``key``, or ``None`` if absent/expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: dict) -> None:
+        """Store ``value`` under ``key``, evicting old entries if needed."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every entry."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of entries currently stored (expired ones may be included)."""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process cache backed by an ``OrderedDict`` kept in LRU order."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        super().__init__(ttl, max_entries)
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(value)
+
+    def set(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCacheBackend(CacheBackend):
+    """Local on-disk cache stored in a SQLite database.
+
+    Survives restarts and can be shared by several worker processes on the
+    same host.
+
+    Attributes:
+        path (str): Location of the SQLite database file.
+    """
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        super().__init__(ttl, max_entries)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_response_cache_access"
+            " ON response_cache (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE response_cache SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            return json.loads(row[0])
+
+    def set(self, key: str, value: dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + self.ttl, now),
+            )
+            self._conn.execute("DELETE FROM response_cache WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM response_cache WHERE key IN ("
+                " SELECT key FROM response_cache ORDER BY last_access DESC"
+                " LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+class ResponseCache:
+    """Content-addressed cache of classification results with hit/miss counters.
+
+    Attributes:
+        backend (CacheBackend): Storage used for the entries.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that found no valid entry.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(cleaned_text: str, lang: str) -> str:
+        """Build the cache key for a cleaned email.
+
+        Case and whitespace differences are normalized away before hashing.
+
+        Args:
+            cleaned_text (str): Output of `clean_email_text`.
+            lang (str): Language detected by `clean_email_text`.
+
+        Returns:
+            str: Hex SHA-256 digest identifying the content.
+        """
+        normalized = " ".join(cleaned_text.lower().split())
+        return hashlib.sha256(f"{lang}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, cleaned_text: str, lang: str) -> Optional[dict]:
+        """Look up a cached result, updating the hit/miss counters."""
+        value = self.backend.get(self.make_key(cleaned_text, lang))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, cleaned_text: str, lang: str, result: dict) -> None:
+        """Store the cacheable fields of a validated classification result."""
+        value = {field: result[field] for field in CACHED_FIELDS if field in result}
+        self.backend.set(self.make_key(cleaned_text, lang), value)
+
+    def stats(self) -> dict:
+        """Return counters and sizing information for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "max_entries": self.backend.max_entries,
+            "ttl_seconds": self.backend.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache configured via environment.
+
+    Returns:
+        Optional[ResponseCache]: The cache, or ``None`` when
+        ``RESPONSE_CACHE_BACKEND`` is ``none``.
+
+    Raises:
+        ValueError: If ``RESPONSE_CACHE_BACKEND`` names an unknown backend.
+    """
+    if RESPONSE_CACHE_BACKEND == "none":
+        return None
+    if RESPONSE_CACHE_BACKEND == "memory":
+        backend = MemoryCacheBackend(RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES)
+    elif RESPONSE_CACHE_BACKEND == "disk":
+        backend = DiskCacheBackend(
+            RESPONSE_CACHE_PATH, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES
+        )
+    else:
+        raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {RESPONSE_CACHE_BACKEND}")
+
+    logger.info(f"Response cache enabled ({RESPONSE_CACHE_BACKEND})")
+    return ResponseCache(backend)
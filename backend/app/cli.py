@@ -0,0 +1,294 @@
+"""Offline batch classification of mailbox files, without going through HTTP.
+
+Reads ``.mbox`` files, directories of ``.eml`` files, or JSON/JSONL files
+shaped like ``emailsTest.json``, runs every email through
+`classify_and_respond` on a worker pool and appends JSONL results. Inputs are
+streamed, so multi-GB mailboxes are never loaded into memory, and runs can be
+resumed: emails whose id already has a result in the output file are skipped,
+unless that result was an error or a degraded template (LLM outage).
+
+Usage (from the ``backend`` directory):
+    python -m app.cli mail.mbox archive/ emails.json -o results.jsonl --resume
+"""
+
+import argparse
+import email
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from email import policy
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Iterator, Optional, Union
+from pydantic import ValidationError
+from .config import EMAIL_CONCURRENCY
+from .exceptions import AppError
+from .pipeline import build_email_response, format_email
+from .schemas import Email
+from .services import classify_and_respond
+
+logger = logging.getLogger(__name__)
+
+# Bytes read at a time when streaming JSON arrays
+_JSON_CHUNK_SIZE = 64 * 1024
+
+
+def _message_to_email(message: EmailMessage) -> Email:
+    """Extract subject and body (plain text preferred over HTML) from a message."""
+    subject = str(message.get("subject", "") or "")
+    part = message.get_body(preferencelist=("plain", "html"))
+    if part is None:
+        return Email(subject=subject, body="")
+    try:
+        body = part.get_content()
+    except (LookupError, UnicodeDecodeError):
+        payload = part.get_payload(decode=True) or b""
+        body = payload.decode("utf-8", errors="replace")
+    return Email(subject=subject, body=body)
+
+
+def iter_mbox(path: Path) -> Iterator[tuple[str, EmailMessage]]:
+    """Stream the messages of an mbox file one at a time.
+
+    Yields:
+        tuple[str, EmailMessage]: ``("<file>:<n>", message)`` per message.
+    """
+    def parse(lines: list[bytes]) -> EmailMessage:
+        return email.message_from_bytes(b"".join(lines), policy=policy.default)
+
+    with open(path, "rb") as f:
+        lines: list[bytes] = []
+        index = 0
+        in_message = False
+        previous_blank = True
+        for line in f:
+            if line.startswith(b"From ") and previous_blank:
+                if in_message:
+                    yield f"{path}:{index}", parse(lines)
+                    index += 1
+                lines = []
+                in_message = True
+                previous_blank = False
+                continue
+            if in_message:
+                # Undo mboxrd quoting of body lines starting with "From "
+                if line.startswith(b">") and line.lstrip(b">").startswith(b"From "):
+                    line = line[1:]
+                lines.append(line)
+            previous_blank = not line.strip()
+        if in_message:
+            yield f"{path}:{index}", parse(lines)
+
+
+def iter_eml_dir(path: Path) -> Iterator[tuple[str, EmailMessage]]:
+    """Stream the ``.eml`` files of a directory tree in a stable order."""
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(".eml"):
+                file_path = Path(root) / name
+                with open(file_path, "rb") as f:
+                    yield str(file_path), email.message_from_binary_file(f, policy=policy.default)
+
+
+def iter_json_array(path: Path) -> Iterator[tuple[str, dict]]:
+    """Stream the objects of a JSON array file without loading the whole file.
+
+    Yields:
+        tuple[str, dict]: ``(id, item)``, where ``id`` is the item's ``id``
+        field or ``"<file>:<n>"``.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer, pos, index = "", 0, 0
+        started = False
+
+        def fill() -> bool:
+            nonlocal buffer, pos
+            chunk = f.read(_JSON_CHUNK_SIZE)
+            buffer, pos = buffer[pos:] + chunk, 0
+            return bool(chunk)
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                if not fill():
+                    return
+                continue
+
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError(f"{path}: expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+                continue
+            yield str(item.get("id", f"{path}:{index}")), item
+            index += 1
+
+
+def iter_json_lines(path: Path) -> Iterator[tuple[str, dict]]:
+    """Stream the objects of a JSONL/NDJSON file."""
+    with open(path, encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            if line.strip():
+                item = json.loads(line)
+                yield str(item.get("id", f"{path}:{index}")), item
+
+
+def iter_inputs(paths: list[Path]) -> Iterator[tuple[str, Union[dict, EmailMessage]]]:
+    """Dispatch every input path to the matching streaming reader."""
+    for path in paths:
+        if path.is_dir():
+            yield from iter_eml_dir(path)
+        elif path.suffix.lower() == ".mbox":
+            yield from iter_mbox(path)
+        elif path.suffix.lower() == ".eml":
+            with open(path, "rb") as f:
+                yield str(path), email.message_from_binary_file(f, policy=policy.default)
+        elif path.suffix.lower() in (".jsonl", ".ndjson"):
+            yield from iter_json_lines(path)
+        elif path.suffix.lower() == ".json":
+            yield from iter_json_array(path)
+        else:
+            raise ValueError(f"Unsupported input: {path}")
+
+
+def load_completed_ids(output: Path) -> set[str]:
+    """Return ids that already have an LLM-written result in ``output``.
+
+    Errors and degraded template answers (circuit breaker open, deadline
+    passed) are left out, so a resumed run retries them.
+    """
+    completed = set()
+    if output.exists():
+        with open(output, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partially written line from an interrupted run
+                if "error" not in record and not record.get("degraded"):
+                    completed.add(record["id"])
+    return completed
+
+
+def classify_record(record_id: str, item: Union[dict, EmailMessage]) -> dict:
+    """Classify one input item, returning a JSON-serializable output record."""
+    try:
+        if isinstance(item, EmailMessage):
+            email_item = _message_to_email(item)
+        else:
+            email_item = Email.model_validate(item)
+        result_dict = classify_and_respond(format_email(email_item))
+        response = build_email_response(result_dict, email_item)
+    except ValidationError as e:
+        return {"id": record_id, "error": str(e), "code": "ValidationError"}
+    except AppError as e:
+        return {"id": record_id, "error": e.message, "code": e.__class__.__name__}
+    except Exception as e:
+        # A bug on one email must not abort the rest of the run
+        logger.exception(f"Unexpected error classifying {record_id}")
+        return {"id": record_id, "error": str(e), "code": e.__class__.__name__}
+
+    return {"id": record_id, **response.model_dump(mode="json", by_alias=True)}
+
+
+def run(inputs: list[Path], output: Path, workers: int, resume: bool, progress_every: float) -> dict:
+    """Classify every input email and append results to ``output``.
+
+    Args:
+        inputs (list[Path]): Input files or directories.
+        output (Path): JSONL file results are appended to.
+        workers (int): Emails classified concurrently.
+        resume (bool): Skip ids that already have an LLM-written result in
+            ``output``.
+        progress_every (float): Seconds between progress lines on stderr.
+
+    Returns:
+        dict: Final counters (processed, errors, degraded, skipped, elapsed,
+        rate).
+    """
+    completed = load_completed_ids(output) if resume else set()
+    counters = {"processed": 0, "errors": 0, "degraded": 0, "skipped": 0}
+    start = last_report = time.monotonic()
+
+    def report(final: bool = False) -> None:
+        elapsed = time.monotonic() - start
+        rate = counters["processed"] / elapsed if elapsed else 0.0
+        print(
+            f"{'done' if final else 'progress'}: {counters['processed']} processed, "
+            f"{counters['errors']} errors, {counters['degraded']} degraded, {counters['skipped']} skipped, "
+            f"{rate:.2f} emails/s",
+            file=sys.stderr,
+        )
+
+    with open(output, "a", encoding="utf-8") as out, ThreadPoolExecutor(workers) as pool:
+        # Never glue a record onto a line left half-written by a killed run
+        if out.tell() > 0:
+            with open(output, "rb") as existing:
+                existing.seek(-1, os.SEEK_END)
+                if existing.read(1) != b"\n":
+                    out.write("\n")
+
+        def write(futures) -> None:
+            nonlocal last_report
+            for future in futures:
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                counters["processed"] += 1
+                counters["errors"] += "error" in record
+                counters["degraded"] += bool(record.get("degraded"))
+            out.flush()
+            if time.monotonic() - last_report >= progress_every:
+                last_report = time.monotonic()
+                report()
+
+        pending = set()
+        for record_id, item in iter_inputs(inputs):
+            if record_id in completed:
+                counters["skipped"] += 1
+                continue
+            pending.add(pool.submit(classify_record, record_id, item))
+            # Bound the number of parsed emails held in memory
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                write(done)
+        write(wait(pending).done)
+
+    report(final=True)
+    elapsed = time.monotonic() - start
+    return {**counters, "elapsed": elapsed, "rate": counters["processed"] / elapsed if elapsed else 0.0}
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.cli",
+        description="Classify emails from .mbox, .eml directories or JSON files offline.",
+    )
+    parser.add_argument("inputs", nargs="+", type=Path, help=".mbox, .eml, directory, .json or .jsonl")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="JSONL results file (appended)")
+    parser.add_argument("-w", "--workers", type=int, default=EMAIL_CONCURRENCY, help="Concurrent emails")
+    parser.add_argument("--resume", action="store_true", help="Skip emails already in the output")
+    parser.add_argument("--progress-every", type=float, default=5.0, help="Seconds between progress lines")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every classification")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    run(args.inputs, args.output, max(1, args.workers), args.resume, args.progress_every)
+
+
+if __name__ == "__main__":
+    main()
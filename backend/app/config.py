@@ -0,0 +1,187 @@
+"""Runtime configuration for the email classification API.
+
+Settings are read once from environment variables (optionally loaded from a
+``.env`` file) so every module shares the same values.
+"""
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _get_int(name: str, default: int) -> int:
+    """Read an integer environment variable, falling back to ``default``."""
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _get_token_budgets(name: str, default: str) -> dict[str, int]:
+    """Read comma-separated ``category:tokens`` pairs into a dict."""
+    budgets = {}
+    for pair in os.getenv(name, default).split(","):
+        category, _, tokens = pair.partition(":")
+        if category.strip() and tokens.strip():
+            budgets[category.strip()] = max(1, int(tokens))
+    return budgets
+
+
+# Maximum number of emails from a single request processed concurrently
+EMAIL_CONCURRENCY = max(1, _get_int("EMAIL_CONCURRENCY", 5))
+
+# Number of processes in the CPU-bound preprocessing pool (0 = thread pool)
+PREPROCESS_WORKERS = max(0, _get_int("PREPROCESS_WORKERS", 1))
+
+# Multiprocessing start method for the preprocessing pool
+PREPROCESS_START_METHOD = os.getenv("PREPROCESS_START_METHOD", "spawn")
+
+# Response cache: "memory", "disk" (SQLite file) or "none"
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+
+# Seconds a cached classification result stays valid
+RESPONSE_CACHE_TTL = _get_int("RESPONSE_CACHE_TTL", 24 * 60 * 60)
+
+# Maximum cached results before least-recently-used eviction
+RESPONSE_CACHE_MAX_ENTRIES = max(1, _get_int("RESPONSE_CACHE_MAX_ENTRIES", 1024))
+
+# SQLite file used by the "disk" cache backend
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "response_cache.sqlite3")
+
+# Reuse of near-duplicate results (SimHash over the cleaned text, see
+# app/near_duplicates.py): "none", "category" (template of the matched
+# email's category) or "reply" (the matched email's whole reply)
+NEAR_DUPLICATE_REUSE = os.getenv("NEAR_DUPLICATE_REUSE", "none").lower()
+
+# Largest Hamming distance between 64-bit fingerprints treated as a near duplicate
+NEAR_DUPLICATE_MAX_DISTANCE = min(16, max(0, _get_int("NEAR_DUPLICATE_MAX_DISTANCE", 8)))
+
+# Classified emails kept in the near-duplicate index before LRU eviction
+NEAR_DUPLICATE_MAX_ENTRIES = max(1, _get_int("NEAR_DUPLICATE_MAX_ENTRIES", 10000))
+
+# Seconds to wait for preprocessing workers to finish loading their models
+WARMUP_TIMEOUT = _get_int("WARMUP_TIMEOUT", 120)
+
+# spaCy pipeline: "minimal" (lemmatization components only) or "full"
+SPACY_PIPELINE = os.getenv("SPACY_PIPELINE", "minimal").lower()
+
+# Texts buffered per spaCy nlp.pipe batch when preprocessing several emails
+NLP_BATCH_SIZE = max(1, _get_int("NLP_BATCH_SIZE", 32))
+
+# Processes spaCy's nlp.pipe uses per language group (outside the pool)
+NLP_N_PROCESS = max(1, _get_int("NLP_N_PROCESS", 1))
+
+# Lemmatization: "model" runs spaCy on every email, "memo" reuses the lemmas of
+# tokens seen before and runs spaCy only on emails with unseen ones (see app/lemmas.py)
+LEMMATIZER_MODE = os.getenv("LEMMATIZER_MODE", "model").lower()
+
+# Tokens remembered per language by the lemma memo (roughly 200 bytes each)
+LEMMA_MEMO_MAX_ENTRIES = max(1, _get_int("LEMMA_MEMO_MAX_ENTRIES", 50000))
+
+# Strip quoted history, signatures and disclaimers before spaCy and the prompt
+EMAIL_STRIP_BOILERPLATE = os.getenv("EMAIL_STRIP_BOILERPLATE", "1").lower() in ("1", "true", "yes")
+
+# Maximum characters of an email passed to spaCy and the prompt
+EMAIL_MAX_CHARS = max(1, _get_int("EMAIL_MAX_CHARS", 4000))
+
+# Language detection: "fast" (scorer with langdetect fallback) or "langdetect"
+LANG_DETECT_ENGINE = os.getenv("LANG_DETECT_ENGINE", "fast").lower()
+
+# Leading characters of an email scored by the fast language detector
+LANG_DETECT_PREFIX_CHARS = max(1, _get_int("LANG_DETECT_PREFIX_CHARS", 1000))
+
+# Share of the evidence (0.5-1.0) the fast detector needs to skip langdetect
+LANG_DETECT_MIN_CONFIDENCE = float(os.getenv("LANG_DETECT_MIN_CONFIDENCE", "0.75"))
+
+# Emails in flight at once for the NDJSON bulk endpoint
+BULK_CONCURRENCY = max(1, _get_int("BULK_CONCURRENCY", 10))
+
+# Maximum size in bytes of one NDJSON line accepted by the bulk endpoint
+BULK_MAX_LINE_BYTES = max(1, _get_int("BULK_MAX_LINE_BYTES", 1024 * 1024))
+
+# JSON file the local classifier model is loaded from (empty = disabled)
+LOCAL_CLASSIFIER_MODEL = os.getenv("LOCAL_CLASSIFIER_MODEL", "")
+
+# Minimum local classifier probability to answer without the LLM
+LOCAL_CLASSIFIER_THRESHOLD = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.9"))
+
+# JSONL file LLM-assigned categories are appended to as training data
+LLM_LABEL_LOG = os.getenv("LLM_LABEL_LOG", "")
+
+# LLM backend: "groq", "openai" (any OpenAI-compatible API) or "stub" (offline)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq").lower()
+
+# Model requested from the LLM backend
+LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.3-70b-versatile")
+
+# Base URL of the OpenAI-compatible API (LLM_PROVIDER=openai)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.openai.com/v1")
+
+# API key for the LLM backend (groq falls back to GROQ_API_KEY)
+LLM_API_KEY = os.getenv("LLM_API_KEY", "")
+
+# Seconds before an LLM call times out
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+# Two-stage model cascade: LLM_CLASSIFIER_MODEL (same backend) picks the
+# category first, greeting/spam are answered from the templates and only
+# productive emails reach LLM_MODEL, with a max_tokens budget per category
+# (categories without a budget keep 600)
+LLM_CASCADE = os.getenv("LLM_CASCADE", "0").lower() in ("1", "true", "yes")
+LLM_CLASSIFIER_MODEL = os.getenv("LLM_CLASSIFIER_MODEL", "llama-3.1-8b-instant")
+LLM_CLASSIFIER_MAX_TOKENS = max(1, _get_int("LLM_CLASSIFIER_MAX_TOKENS", 20))
+LLM_REPLY_MAX_TOKENS = _get_token_budgets(
+    "LLM_REPLY_MAX_TOKENS",
+    "payment_issue:450,technical_support:500,information_request:400,complaint:500",
+)
+
+# Stub LLM (LLM_PROVIDER=stub): simulated latency, failures and token usage
+STUB_LLM_LATENCY_MS = float(os.getenv("STUB_LLM_LATENCY_MS", "200"))
+STUB_LLM_LATENCY_JITTER_MS = float(os.getenv("STUB_LLM_LATENCY_JITTER_MS", "50"))
+STUB_LLM_ERROR_RATE = float(os.getenv("STUB_LLM_ERROR_RATE", "0"))
+STUB_LLM_COMPLETION_TOKENS = max(1, _get_int("STUB_LLM_COMPLETION_TOKENS", 250))
+STUB_LLM_SEED = _get_int("STUB_LLM_SEED", 0)
+STUB_LLM_RPM_LIMIT = max(0, _get_int("STUB_LLM_RPM_LIMIT", 0))
+STUB_LLM_BATCH_DROP_RATE = float(os.getenv("STUB_LLM_BATCH_DROP_RATE", "0"))
+
+# Mean latency of the stub standing for LLM_CLASSIFIER_MODEL (LLM_CASCADE=1)
+STUB_LLM_CLASSIFIER_LATENCY_MS = float(os.getenv("STUB_LLM_CLASSIFIER_LATENCY_MS", "50"))
+
+# Header carrying the request ID (read from the client or generated, and echoed back)
+REQUEST_ID_HEADER = os.getenv("REQUEST_ID_HEADER", "X-Request-ID")
+
+# Attach request IDs to /metrics histogram buckets as OpenMetrics exemplars
+METRICS_EXEMPLARS = os.getenv("METRICS_EXEMPLARS", "0").lower() in ("1", "true", "yes")
+
+# Process-wide LLM budget: requests and tokens per minute (0 = unlimited)
+LLM_RPM_LIMIT = max(0, _get_int("LLM_RPM_LIMIT", 0))
+LLM_TPM_LIMIT = max(0, _get_int("LLM_TPM_LIMIT", 0))
+
+# Retries of rate-limited or transient LLM failures, with jittered backoff
+LLM_MAX_RETRIES = max(0, _get_int("LLM_MAX_RETRIES", 3))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+
+# Short emails of one /process-email request packed into a single LLM call
+# (1 = one call per email), and the size in characters above which an email
+# always gets its own call
+LLM_BATCH_SIZE = max(1, _get_int("LLM_BATCH_SIZE", 1))
+LLM_BATCH_MAX_CHARS = max(1, _get_int("LLM_BATCH_MAX_CHARS", 1500))
+
+# Seconds a /process-email request may take before remaining emails get templates
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "25"))
+
+# Seconds one email's LLM step may take before it gets a template
+EMAIL_DEADLINE = float(os.getenv("EMAIL_DEADLINE", "15"))
+
+# Consecutive LLM failures that open the circuit breaker (0 = disabled),
+# and seconds it stays open before a trial call
+CIRCUIT_BREAKER_FAILURES = max(0, _get_int("CIRCUIT_BREAKER_FAILURES", 5))
+CIRCUIT_BREAKER_RESET = float(os.getenv("CIRCUIT_BREAKER_RESET", "30"))
+
+# Background job API (/jobs): SQLite store, workers and size limit
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "jobs.sqlite3")
+JOB_WORKERS = max(1, _get_int("JOB_WORKERS", 4))
+JOB_MAX_EMAILS = max(1, _get_int("JOB_MAX_EMAILS", 1000))
+
+# Seconds finished jobs and their results are kept
+JOB_RETENTION = _get_int("JOB_RETENTION", 24 * 60 * 60)
@@ -0,0 +1,171 @@
+"""Graceful degradation when the LLM is slow or failing.
+
+Emails whose LLM call misses its deadline, or that arrive while the circuit
+breaker is open, are answered right away with a response template. The
+category comes from a cheap heuristic on the cleaned text (the local
+classifier's best guess when a model is loaded, keyword matching
+otherwise), and the result is flagged ``degraded`` so clients can tell it
+apart from an LLM-written reply (see `services.degraded_response`).
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+from .config import CIRCUIT_BREAKER_FAILURES, CIRCUIT_BREAKER_RESET
+from .local_classifier import get_local_classifier
+
+logger = logging.getLogger(__name__)
+
+# Keyword stems per category, checked in order (matched as substrings of
+# the lowercased text, so lemmas and inflected forms both match)
+CATEGORY_KEYWORDS = {
+    "spam": ["promo", "desconto", "discount", "ganhe", "winner", "oferta", "offer"],
+    "payment_issue": ["pagamento", "pagar", "boleto", "fatura", "cobran", "payment", "pay", "invoice", "charge"],
+    "complaint": ["reclama", "insatisf", "absurd", "complaint", "unacceptable", "disappoint"],
+    "technical_support": ["erro", "bug", "falha", "acesso", "login", "senha", "error", "crash", "password"],
+    "information_request": ["informa", "dúvida", "duvida", "como", "information", "question", "how"],
+}
+
+
+def keyword_category(text: str) -> str:
+    """Category whose keywords appear first in `CATEGORY_KEYWORDS` order."""
+    text = text.lower()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        if any(keyword in text for keyword in keywords):
+            return category
+    return "greeting"
+
+
+def heuristic_category(cleaned_text: str, lang: str) -> str:
+    """Best category guess without the LLM.
+
+    Uses the local classifier's most likely class (whatever its confidence)
+    when a model is configured, keyword matching otherwise.
+    """
+    classifier = get_local_classifier()
+    if classifier is not None:
+        probabilities = classifier.predict_proba(cleaned_text, lang)
+        return max(probabilities.items(), key=lambda item: item[1])[0]
+    return keyword_category(cleaned_text)
+
+
+@dataclass(frozen=True)
+class BreakerTicket:
+    """Admission of one call by `CircuitBreaker.allow`.
+
+    Attributes:
+        epoch (int): Breaker epoch the call was admitted in; outcomes
+            reported after the breaker opened or closed since are ignored.
+        trial (bool): Whether the call is the half-open trial.
+    """
+    epoch: int
+    trial: bool = False
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for the LLM provider.
+
+    Closed: calls go through. After ``failure_threshold`` consecutive
+    failures it opens and calls are rejected for ``reset_timeout`` seconds;
+    then a single trial call is let through (half-open), which closes the
+    breaker on success or reopens it on failure.
+
+    Every admitted call gets a `BreakerTicket` to report its outcome with.
+    Opening or closing the breaker starts a new epoch, so a slow call
+    admitted before that can neither count against the new state nor
+    decide or release the trial of another call.
+
+    Attributes:
+        failure_threshold (int): Consecutive failures that open the breaker
+            (0 disables it).
+        reset_timeout (float): Seconds the breaker stays open.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.times_opened = 0
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> Optional[BreakerTicket]:
+        """Admit a call to the provider now, or return ``None`` if it must not go."""
+        with self._lock:
+            if self.failure_threshold <= 0:
+                return BreakerTicket(self._epoch)
+            state = self.state
+            if state == "closed":
+                return BreakerTicket(self._epoch)
+            if state == "half_open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return BreakerTicket(self._epoch, trial=True)
+            return None
+
+    def release_trial(self, ticket: BreakerTicket) -> None:
+        """Let another trial call through if ``ticket``'s trial ended without a verdict.
+
+        Callers of `allow` run this in a ``finally``: a trial that neither
+        succeeded nor failed (its deadline passed in the queue, the client
+        went away) would otherwise keep the breaker half-open forever. A
+        no-op for other calls and after `record_success`/`record_failure`.
+        """
+        with self._lock:
+            if ticket.trial and ticket.epoch == self._epoch:
+                self.trial_in_flight = False
+
+    def record_success(self, ticket: BreakerTicket) -> None:
+        with self._lock:
+            if ticket.epoch != self._epoch:
+                return
+            if self.opened_at is not None:
+                logger.info("LLM circuit breaker closed")
+                self.opened_at = None
+                self._epoch += 1
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self, ticket: BreakerTicket) -> None:
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            if ticket.epoch != self._epoch:
+                return
+            self.failures += 1
+            if ticket.trial or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+                self._epoch += 1
+                logger.warning(
+                    f"LLM circuit breaker opened after {self.failures} consecutive failures; "
+                    f"serving templates for {self.reset_timeout:.0f}s"
+                )
+            self.trial_in_flight = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_circuit_breaker() -> CircuitBreaker:
+    """Return the process-wide LLM circuit breaker."""
+    return CircuitBreaker(CIRCUIT_BREAKER_FAILURES, CIRCUIT_BREAKER_RESET)
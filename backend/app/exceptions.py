@@ -20,7 +20,7 @@ class AppError(Exception):
 
 
 class LLMServiceError(AppError):
-    """Raised when the LLM service (Groq API) fails to process a request.
+    """Raised when the LLM provider (Groq by default) fails to process a request.
 
     This error indicates temporary service unavailability, rate limiting,
     or other external API failures.
@@ -44,4 +44,14 @@ class NLPProcessingError(AppError):
     """
 
     def __init__(self, message: str = "Error during text preprocessing"):
-        super().__init__(message, status_code=422)
\ No newline at end of file
+        super().__init__(message, status_code=422)
+
+class JobNotFoundError(AppError):
+    """Raised when a background job ID is unknown or has expired.
+
+    Attributes:
+        status_code (int): Always 404 (Not Found).
+    """
+
+    def __init__(self, job_id: str):
+        super().__init__(f"Job {job_id} not found", status_code=404)
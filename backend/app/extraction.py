@@ -0,0 +1,209 @@
+"""Separation of the new message from quoted history and boilerplate.
+
+Customer emails are mostly reply chains, signatures and legal footers, none
+of which says anything about the new message. `extract_new_content` keeps
+the subject and the newly written part of the body, so only that reaches
+spaCy and the LLM prompt:
+
+    - quoted history: ``>`` lines, "On ... wrote:" / "Em ... escreveu:"
+      attributions, "Original Message" / "Mensagem original" and forwarded
+      message separators, and Outlook ``From:/Sent:`` (``De:/Enviado:``)
+      header blocks; everything after the first marker is history;
+    - signatures: the ``-- `` delimiter, "Sent from my ..." / "Enviado do
+      meu ..." lines, and whatever follows a sign-off line ("Regards,",
+      "Atenciosamente,"...) beyond the sign-off and the sender's name. A
+      sign-off only closes the message when nothing but signature-like lines
+      (names, roles, contact details) or boilerplate follows it, so a "Thanks!"
+      in the middle of the message keeps what comes after it;
+    - legal disclaimers and "consider the environment" footers, PT and EN.
+
+HTML bodies are converted to text first (see `app.html_text`). Forwarded
+emails whose new part is empty keep the forwarded content instead, without
+the quote markers. The result is capped at ``EMAIL_MAX_CHARS`` characters.
+
+Usage (from the ``backend`` directory), to print the extraction of a file:
+    python -m app.extraction email.txt
+"""
+
+import re
+import sys
+from .config import EMAIL_MAX_CHARS, EMAIL_STRIP_BOILERPLATE
+from .html_text import html_to_text, looks_like_html
+
+# Characters of text examined per character kept: the message is at the
+# start of the email, what follows only needs to show where it ends
+SCAN_FACTOR = 2
+
+# Lines after a sign-off kept as the sender's name and role
+SIGNATURE_NAME_LINES = 2
+
+# A sign-off only ends the message when at most this many lines follow it
+SIGNATURE_MAX_LINES = 8
+
+# Longest line that can pass for a name, role or address in a signature
+SIGNATURE_LINE_MAX_CHARS = 60
+
+# Outlook header blocks: "From:" followed by "Sent:"/"Date:" within this many lines
+HEADER_BLOCK_LINES = 4
+
+QUOTE_LINE = re.compile(r"^\s*>")
+
+ATTRIBUTION = re.compile(
+    r"^\s*(?:on\s.{1,200}\swrote|em\s.{1,200}\sescreveu)\s*:\s*$",
+    re.IGNORECASE,
+)
+
+SEPARATOR = re.compile(
+    r"^\s*-{2,}\s*(?:original message|forwarded message|mensagem original|mensagem encaminhada)"
+    r"\s*-{2,}\s*$|^\s*_{10,}\s*$",
+    re.IGNORECASE,
+)
+
+HEADER_FROM = re.compile(r"^\s*\*?(?:from|de)\s*:\*?\s", re.IGNORECASE)
+HEADER_SENT = re.compile(r"^\s*\*?(?:sent|date|enviado|enviada|data)\s*(?:em)?\s*:\*?\s", re.IGNORECASE)
+
+SIGNATURE_DELIMITER = re.compile(r"^--\s*$")
+
+MOBILE_FOOTER = re.compile(
+    r"^\s*(?:sent from my|sent from outlook|get outlook for|enviado do meu|enviado de meu"
+    r"|enviado do outlook|enviado pelo)\b",
+    re.IGNORECASE,
+)
+
+SIGN_OFF = re.compile(
+    r"^\s*(?:best regards|kind regards|warm regards|regards|best|cheers|sincerely|thanks|"
+    r"thank you|many thanks|atenciosamente|att|atte|cordialmente|abra[çc]os?|abs|"
+    r"obrigad[oa]|grat[oa]|sauda[çc][õo]es|um abra[çc]o)\s*[,.!]?\s*$",
+    re.IGNORECASE,
+)
+
+DISCLAIMER = re.compile(
+    r"^\s*(?:confidentiality notice|disclaimer|aviso de confidencialidade|aviso legal|"
+    r"this (?:e-?mail|message)\b.{0,80}\b(?:confidential|privileged|intended)|"
+    r"esta (?:mensagem|e-?mail)\b.{0,80}\b(?:confidencia|sigilos|destinad)|"
+    r"please consider the environment|antes de imprimir|pense no meio ambiente)",
+    re.IGNORECASE,
+)
+
+# Contact details of a signature: email address, URL or phone number
+CONTACT_INFO = re.compile(r"\S@\S|https?://|www\.|\+?\d[\d\s().-]{6,}\d")
+
+WORD = re.compile(r"[^\W\d_]+")
+
+HAS_WORDS = re.compile(r"\w{2,}")
+
+
+def _history_start(lines: list[str]) -> int:
+    """Index of the first line of quoted or forwarded history (``len(lines)`` if none)."""
+    for index, line in enumerate(lines):
+        if SEPARATOR.match(line) or QUOTE_LINE.match(line):
+            return index
+        # Attributions are often wrapped over two lines by the mail client
+        following = lines[index + 1] if index + 1 < len(lines) else ""
+        if ATTRIBUTION.match(line) or ATTRIBUTION.match(f"{line} {following}"):
+            return index
+        if HEADER_FROM.match(line) and any(
+            HEADER_SENT.match(next_line) for next_line in lines[index + 1:index + 1 + HEADER_BLOCK_LINES]
+        ):
+            return index
+    return len(lines)
+
+
+def _is_boilerplate(line: str) -> bool:
+    """Whether ``line`` starts a signature block, mobile footer or disclaimer."""
+    return bool(SIGNATURE_DELIMITER.match(line) or MOBILE_FOOTER.match(line) or DISCLAIMER.match(line))
+
+
+def _signature_like(line: str) -> bool:
+    """Whether ``line`` reads as a name, role, company, address or contact line.
+
+    Contact details always do. Otherwise the line must be short, not end like
+    a question or exclamation, and have at least half of its words (ignoring
+    connectors such as "de" or "of" when longer words exist) capitalized.
+    """
+    line = line.strip()
+    if CONTACT_INFO.search(line):
+        return True
+    if len(line) > SIGNATURE_LINE_MAX_CHARS or line.endswith(("?", "!")):
+        return False
+    words = WORD.findall(line)
+    words = [word for word in words if len(word) > 3] or words
+    return bool(words) and 2 * sum(word[0].isupper() for word in words) >= len(words)
+
+
+def _closes_message(following: list[str]) -> bool:
+    """Whether a sign-off followed by the non-blank lines ``following`` ends the message."""
+    for count, line in enumerate(following):
+        if _is_boilerplate(line):
+            return True
+        if count >= SIGNATURE_MAX_LINES or not _signature_like(line):
+            return False
+    return True
+
+
+def _boilerplate_start(lines: list[str]) -> int:
+    """Index where the signature or disclaimer of a message starts (``len(lines)`` if none)."""
+    for index, line in enumerate(lines):
+        if _is_boilerplate(line):
+            return index
+        if SIGN_OFF.match(line):
+            rest = [after for after in range(index + 1, len(lines)) if lines[after].strip()]
+            if _closes_message([lines[after] for after in rest]):
+                # Keep the sign-off and the sender's name for personalization
+                name = []
+                for after in rest[:SIGNATURE_NAME_LINES]:
+                    if _is_boilerplate(lines[after]):
+                        break
+                    name.append(after)
+                return name[-1] + 1 if name else index + 1
+    return len(lines)
+
+
+def _cap(text: str, max_chars: int) -> str:
+    """Cut ``text`` to ``max_chars`` characters at a whitespace boundary."""
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars + 1)
+    return text[:cut if cut > max_chars // 2 else max_chars].rstrip()
+
+
+def extract_new_content(text: str, max_chars: int = EMAIL_MAX_CHARS) -> str:
+    """Return the subject and new message of an email, without history or boilerplate.
+
+    Args:
+        text (str): Raw email text (typically "Subject: ...\\n\\nBody: ...").
+        max_chars (int): Maximum length of the result.
+
+    Returns:
+        str: The relevant part of ``text`` as plain text, at most
+        ``max_chars`` long. With ``EMAIL_STRIP_BOILERPLATE`` disabled only the
+        HTML conversion and the cap are applied.
+    """
+    if looks_like_html(text):
+        text = html_to_text(text, SCAN_FACTOR * max_chars)
+    else:
+        text = text[:SCAN_FACTOR * max_chars]
+    if not EMAIL_STRIP_BOILERPLATE:
+        return _cap(text, max_chars)
+
+    lines = text.splitlines()
+    history = _history_start(lines)
+    message = lines[:history]
+    message = message[:_boilerplate_start(message)]
+
+    body = [line for line in message if not line.startswith("Subject:")]
+    if history < len(lines) and not any(HAS_WORDS.search(line.removeprefix("Body:")) for line in body):
+        # Nothing new besides the subject: a forward, keep what was forwarded
+        forwarded = [QUOTE_LINE.sub("", line).strip() for line in lines[history:]]
+        forwarded = forwarded[:_boilerplate_start(forwarded)]
+        message += [line for line in forwarded if not SEPARATOR.match(line)]
+
+    return _cap("\n".join(message).strip(), max_chars)
+
+
+if __name__ == "__main__":
+    with open(sys.argv[1], encoding="utf-8") as f:
+        original = f.read()
+    extracted = extract_new_content(original)
+    print(extracted)
+    print(f"\n[{len(original)} -> {len(extracted)} chars]", file=sys.stderr)
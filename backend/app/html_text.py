@@ -0,0 +1,146 @@
+"""Streaming HTML-to-text conversion for HTML email bodies.
+
+Tags used to be removed by a single regex over the raw text, which left
+``<style>``/``<script>`` contents and HTML entities in the text spaCy and the
+prompt see. `html_to_text` walks the markup with precompiled patterns
+instead:
+
+    - the contents of ``style``, ``script``, ``head`` and similar elements
+      are skipped in one jump to their closing tag;
+    - entities and character references are decoded;
+    - block elements become line breaks and other whitespace collapses, so
+      the line-based extraction in `app.extraction` still finds signatures
+      and attributions; ``blockquote`` contents get ``>`` prefixes like
+      plain-text quotes.
+
+Every character is scanned a bounded number of times (a tag cannot contain
+``<``, so an unmatched ``<`` costs no more than the text up to the next
+one), and the scan stops once ``max_chars`` characters of text were
+produced, so time and memory are bounded by the output cap rather than by
+the size of the email.
+"""
+
+import html
+import re
+
+# Elements whose content is never message text, skipped up to their end tag
+SKIPPED_TAGS = frozenset({"style", "script", "head", "title", "noscript", "template", "svg"})
+
+# Elements that start a new line
+BLOCK_TAGS = frozenset({
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "footer",
+    "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol",
+    "p", "pre", "section", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+})
+
+# Start of an HTML tag, comment or doctype
+HTML_MARKUP = re.compile(r"<(?:[a-zA-Z][\w:-]*[\s/>]|/[a-zA-Z]|!--|![dD][oO][cC][tT][yY][pP][eE])")
+
+# One tag (group 1: "/" of end tags, group 2: name), a comment opening,
+# or a declaration/processing instruction
+TAG = re.compile(r"<(?:(/?)([a-zA-Z][\w:-]*)[^<>]*>|!--|[!?][^<>]*>)")
+
+END_TAGS = {tag: re.compile(rf"</{tag}\s*>", re.IGNORECASE) for tag in SKIPPED_TAGS}
+
+WHITESPACE = re.compile(r"\s+")
+
+
+class _TextWriter:
+    """Accumulates visible text, one line per block element."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.lines: list[str] = []
+        self.length = 0
+        self.quote_depth = 0
+        self._line: list[str] = []
+
+    @property
+    def full(self) -> bool:
+        return self.length >= self.max_chars
+
+    def data(self, data: str) -> None:
+        if "&" in data:
+            data = html.unescape(data)
+        data = WHITESPACE.sub(" ", data)
+        if data != " ":
+            self._line.append(data)
+            self.length += len(data)
+        elif self._line and not self._line[-1].endswith(" "):
+            self._line.append(data)
+
+    def break_line(self) -> None:
+        text = "".join(self._line).strip()
+        self._line = []
+        if text:
+            self.lines.append(f"{'>' * self.quote_depth} {text}" if self.quote_depth else text)
+            self.length += 1
+        elif self.lines and self.lines[-1]:
+            # Keep paragraph gaps (one blank line), they delimit signatures
+            self.lines.append("")
+
+    def text(self) -> str:
+        self.break_line()
+        return "\n".join(self.lines).strip()
+
+
+def looks_like_html(text: str) -> bool:
+    """Whether ``text`` contains HTML markup (a tag, comment or doctype)."""
+    return HTML_MARKUP.search(text) is not None
+
+
+def html_to_text(text: str, max_chars: int) -> str:
+    """Convert the HTML part of ``text`` to plain text.
+
+    Anything before the first tag (e.g. the ``Subject:`` line added by the
+    pipeline) is kept verbatim; plain text without markup is returned as is.
+
+    Args:
+        text (str): Email text possibly containing HTML.
+        max_chars (int): Characters of text after which the scan stops.
+
+    Returns:
+        str: The visible text, with decoded entities and one line per block
+        element, roughly ``max_chars`` long at most.
+    """
+    markup = HTML_MARKUP.search(text)
+    if markup is None:
+        return text
+
+    prefix = text[:markup.start()]
+    writer = _TextWriter(max(0, max_chars - len(prefix)))
+    position, end = markup.start(), len(text)
+    while position < end and not writer.full:
+        tag = TAG.search(text, position)
+        stop = end if tag is None else tag.start()
+        # Text is handed over in slices no longer than the remaining budget,
+        # so a huge run of text without tags is not decoded past the cap
+        while position < stop and not writer.full:
+            budget_end = min(stop, position + writer.max_chars - writer.length)
+            writer.data(text[position:budget_end])
+            position = budget_end
+        if tag is None or writer.full:
+            break
+        position = tag.end()
+
+        name = tag.group(2)
+        if name is None:
+            if tag.group(0) == "<!--":
+                close = text.find("-->", position)
+                position = end if close < 0 else close + 3
+            continue
+        name = name.lower()
+        if tag.group(1):
+            if name in BLOCK_TAGS:
+                writer.break_line()
+                if name == "blockquote":
+                    writer.quote_depth = max(0, writer.quote_depth - 1)
+        elif name in SKIPPED_TAGS:
+            if not tag.group(0).endswith("/>"):
+                close = END_TAGS[name].search(text, position)
+                position = end if close is None else close.end()
+        elif name in BLOCK_TAGS:
+            writer.break_line()
+            if name == "blockquote":
+                writer.quote_depth += 1
+    return prefix + writer.text()
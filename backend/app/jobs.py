@@ -0,0 +1,292 @@
+"""Background jobs for batches larger than `/process-email` accepts.
+
+`POST /jobs` stores the emails in a local SQLite database and returns a job
+ID at once. A pool of background workers runs each email through the same
+pipeline as the synchronous endpoint (`_process_single_email`, at bulk
+priority so interactive requests keep their LLM budget) and stores every
+`EmailResponse` as soon as it completes. Clients poll ``GET /jobs/{id}``
+for new results or follow ``GET /jobs/{id}/events`` (server-sent events).
+
+Preprocessing and LLM calls already run in the process and thread pools, so
+the event loop stays free to serve other requests while large jobs run.
+
+Each job is owned by the process that accepted it, identified by its PID
+and a random token drawn when the process starts (a restarted container
+reuses the PID, e.g. 1, but not the token). Jobs whose owner is no longer
+running are adopted and resumed on startup; emails that were in flight at
+that point are processed again.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+from .config import JOB_RETENTION, JOB_STORE_PATH, JOB_WORKERS
+from .pipeline import _process_single_email, build_email_response
+from .rate_limit import PRIORITY_BULK
+from .schemas import Email
+
+logger = logging.getLogger(__name__)
+
+JOB_COLUMNS = ("job_id", "status", "total", "completed", "failed", "created_at", "updated_at")
+
+
+_boot = (0, "")
+
+
+def _boot_token() -> str:
+    """Random token of the current process start, drawn again in forked children."""
+    global _boot
+    pid = os.getpid()
+    if _boot[0] != pid:
+        _boot = (pid, uuid.uuid4().hex)
+    return _boot[1]
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether a process with this PID is running on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """Jobs, their emails and results in a SQLite database.
+
+    Results are numbered in completion order (``seq``), so readers can ask
+    for the ones they have not seen yet. The database can be shared by
+    several worker processes on the same host.
+
+    Attributes:
+        path (str): Location of the SQLite database file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " total INTEGER NOT NULL,"
+            " completed INTEGER NOT NULL DEFAULT 0,"
+            " failed INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " owner_pid INTEGER NOT NULL,"
+            " owner_token TEXT);"
+            "CREATE TABLE IF NOT EXISTS job_items ("
+            " job_id TEXT NOT NULL,"
+            " item_index INTEGER NOT NULL,"
+            " email TEXT NOT NULL,"
+            " seq INTEGER,"
+            " result TEXT,"
+            " PRIMARY KEY (job_id, item_index));"
+            "CREATE INDEX IF NOT EXISTS idx_job_items_seq ON job_items (job_id, seq);"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "owner_token" not in columns:
+            # Databases created before owner tokens: their jobs count as orphaned
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner_token TEXT")
+        self._conn.commit()
+
+    def create(self, emails: List[Email]) -> dict:
+        """Store a new queued job owned by the current process."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, total, created_at, updated_at, owner_pid, owner_token)"
+                " VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, len(emails), now, now, os.getpid(), _boot_token()),
+            )
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, item_index, email) VALUES (?, ?, ?)",
+                [(job_id, index, email.model_dump_json()) for index, email in enumerate(emails)],
+            )
+            self._conn.commit()
+        return {
+            "job_id": job_id, "status": "queued", "total": len(emails),
+            "completed": 0, "failed": 0, "created_at": now, "updated_at": now,
+        }
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Job progress, or ``None`` if the ID is unknown."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return dict(zip(JOB_COLUMNS, row)) if row else None
+
+    def results(self, job_id: str, after: int = 0) -> List[dict]:
+        """Results with ``seq`` greater than ``after``, in completion order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT result FROM job_items WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def record_result(self, job_id: str, index: int, result: dict, failed: bool) -> dict:
+        """Store one email's result and return it numbered with its ``seq``."""
+        now = time.time()
+        with self._lock:
+            completed = self._conn.execute(
+                "UPDATE jobs SET completed = completed + 1, failed = failed + ?, updated_at = ?,"
+                " status = CASE WHEN completed + 1 >= total THEN 'completed' ELSE 'running' END"
+                " WHERE job_id = ? RETURNING completed",
+                (int(failed), now, job_id),
+            ).fetchone()[0]
+            result = {"index": index, "seq": completed, **result}
+            self._conn.execute(
+                "UPDATE job_items SET seq = ?, result = ? WHERE job_id = ? AND item_index = ?",
+                (completed, json.dumps(result, ensure_ascii=False), job_id, index),
+            )
+            self._conn.commit()
+        return result
+
+    def adopt_orphaned(self) -> List[tuple[str, int, Email]]:
+        """Take over unfinished jobs whose owner process is gone.
+
+        A job is orphaned when its owner token is not the current process's
+        and its owner PID is not running, or is the current PID (the owner
+        was an earlier process with the same PID, as after a container
+        restart). Jobs are claimed with a compare-and-set on the owner, so
+        sibling workers starting together do not both resume the same job.
+
+        Returns:
+            List[tuple[str, int, Email]]: ``(job_id, index, email)`` of every
+            email of the adopted jobs still without a result.
+        """
+        pid, token = os.getpid(), _boot_token()
+        with self._lock:
+            owners = self._conn.execute(
+                "SELECT job_id, owner_pid, owner_token FROM jobs WHERE status != 'completed'"
+            ).fetchall()
+            items = []
+            for job_id, owner_pid, owner_token in owners:
+                if owner_token == token or (owner_pid != pid and _pid_alive(owner_pid)):
+                    continue
+                claimed = self._conn.execute(
+                    "UPDATE jobs SET owner_pid = ?, owner_token = ?"
+                    " WHERE job_id = ? AND owner_pid = ? AND owner_token IS ?",
+                    (pid, token, job_id, owner_pid, owner_token),
+                ).rowcount
+                self._conn.commit()
+                if not claimed:
+                    continue
+                items.extend(
+                    (job_id, index, Email.model_validate_json(email))
+                    for index, email in self._conn.execute(
+                        "SELECT item_index, email FROM job_items"
+                        " WHERE job_id = ? AND seq IS NULL ORDER BY item_index",
+                        (job_id,),
+                    )
+                )
+        return items
+
+    def purge(self, max_age: float) -> int:
+        """Delete jobs finished more than ``max_age`` seconds ago."""
+        cutoff = time.time() - max_age
+        with self._lock:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'completed' AND updated_at < ?", (cutoff,)
+            )]
+            for job_id in expired:
+                self._conn.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+                self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            self._conn.commit()
+        return len(expired)
+
+
+class JobManager:
+    """Queue and asyncio workers processing the emails of stored jobs.
+
+    Args:
+        store (JobStore): Where jobs and results are kept.
+        workers (int): Emails processed concurrently.
+    """
+
+    def __init__(self, store: JobStore, workers: int):
+        self.store = store
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._progress: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Start the workers and resume jobs left unfinished by a previous run."""
+        self._queue = asyncio.Queue()
+        self._progress = asyncio.Condition()
+        await run_in_threadpool(self.store.purge, JOB_RETENTION)
+        resumed = await run_in_threadpool(self.store.adopt_orphaned)
+        for item in resumed:
+            self._queue.put_nowait(item)
+        if resumed:
+            logger.info(f"Resumed {len(resumed)} unfinished job emails")
+        semaphore = asyncio.Semaphore(self.workers)
+        self._tasks = [asyncio.create_task(self._worker(semaphore)) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, emails: List[Email]) -> dict:
+        """Store a job and queue its emails; returns the job's initial status."""
+        await run_in_threadpool(self.store.purge, JOB_RETENTION)
+        job = await run_in_threadpool(self.store.create, emails)
+        for index, email_item in enumerate(emails):
+            self._queue.put_nowait((job["job_id"], index, email_item))
+        return job
+
+    async def wait_for_progress(self, timeout: float) -> bool:
+        """Wait until any job records a result; ``False`` on timeout."""
+        async with self._progress:
+            try:
+                await asyncio.wait_for(self._progress.wait(), timeout)
+                return True
+            except asyncio.TimeoutError:
+                return False
+
+    async def _worker(self, semaphore: asyncio.Semaphore) -> None:
+        while True:
+            job_id, index, email_item = await self._queue.get()
+            try:
+                result_dict, error = await _process_single_email(
+                    email_item, semaphore, priority=PRIORITY_BULK
+                )
+                response = build_email_response(result_dict, email_item)
+                await run_in_threadpool(
+                    self.store.record_result, job_id, index,
+                    response.model_dump(mode="json", by_alias=True), error is not None,
+                )
+            except Exception:
+                logger.exception(f"Job {job_id} email {index} could not be stored")
+            finally:
+                self._queue.task_done()
+            async with self._progress:
+                self._progress.notify_all()
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "queued": self._queue.qsize() if self._queue else 0}
+
+
+@lru_cache(maxsize=1)
+def get_job_manager() -> JobManager:
+    """Return the process-wide job manager (started by the app lifespan)."""
+    return JobManager(JobStore(JOB_STORE_PATH), JOB_WORKERS)
@@ -0,0 +1,154 @@
+"""Language detection engines for the NLP pipeline.
+
+``langdetect`` is probabilistic and re-samples the whole text on every call,
+which is slow for a service that only distinguishes the languages in
+`SUPPORTED_MODELS`. `FastLanguageDetector` scores stop words and distinctive
+character n-grams of those languages on a bounded prefix of the text and
+only defers to ``langdetect`` when its own confidence is low.
+"""
+
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Iterable, Optional
+from langdetect import detect, DetectorFactory
+
+# Ensure language detection is consistent across runs
+DetectorFactory.seed = 0
+
+# Language assumed when detection fails
+DEFAULT_LANGUAGE = "pt"
+
+# Frequent function words that are (almost) exclusive to one language; words
+# common to both (e.g. "a", "as", "no", "do", "me") are deliberately left out
+STOPWORDS = {
+    "pt": frozenset({
+        "o", "os", "um", "uma", "de", "da", "dos", "das",
+        "em", "na", "nos", "nas", "que", "não", "nao", "para", "com",
+        "por", "mas", "meu", "minha", "seu", "sua", "você", "voce", "eu",
+        "ele", "ela", "foi", "está", "esta", "são", "ao", "à", "pelo", "pela",
+        "já", "ja", "mais", "muito", "também", "obrigado", "obrigada", "olá",
+        "ola", "boa", "bom", "dia", "hoje", "ontem", "gostaria", "saber",
+        "favor", "porque", "quando", "isso", "este", "essa", "esse", "tem",
+    }),
+    "en": frozenset({
+        "the", "and", "is", "are", "was", "were", "to", "of", "in", "on",
+        "for", "with", "it", "this", "that", "my", "your", "you", "i", "we",
+        "our", "can", "could", "would", "please", "not", "have", "has", "be",
+        "from", "at", "but", "if", "or", "an", "by", "will",
+        "after", "even", "thank", "thanks", "hi", "hello", "dear", "need",
+        "help", "there", "what", "why", "how", "which", "just", "been",
+    }),
+}
+
+# Character n-grams (matched inside words) that are typical of one language
+NGRAMS = {
+    "pt": ("ção", "ções", "ão", "õe", "nh", "lh", "ç", "ã", "õ", "ê", "á", "é", "ú"),
+    "en": ("th", "wh", "ing", "ght", "ck", "w", "y", "k"),
+}
+
+# Weight of one n-gram hit relative to one stop word hit
+NGRAM_WEIGHT = 0.25
+
+_WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+
+class LanguageDetector(ABC):
+    """Interface of a language detection engine."""
+
+    @abstractmethod
+    def detect(self, text: str) -> str:
+        """Return the ISO code of the language of ``text``."""
+
+
+class LangdetectDetector(LanguageDetector):
+    """The ``langdetect`` library, defaulting to `DEFAULT_LANGUAGE` on failure."""
+
+    def detect(self, text: str) -> str:
+        try:
+            return detect(text)
+        except Exception:
+            return DEFAULT_LANGUAGE
+
+
+class FastLanguageDetector(LanguageDetector):
+    """Stop word / character n-gram scorer limited to the supported languages.
+
+    Attributes:
+        languages (tuple[str, ...]): Languages the scorer can return.
+        prefix_chars (int): Only this many leading characters are scored.
+        min_confidence (float): Share of the evidence the winning language
+            must hold (0.5-1.0) to skip the fallback.
+        min_evidence (float): Minimum score of the winning language.
+        fallback (Optional[LanguageDetector]): Engine used for low-confidence
+            texts; when ``None`` the best guess is returned instead.
+        fast_hits (int): Texts decided by the scorer.
+        fallbacks (int): Texts deferred to the fallback engine.
+    """
+
+    def __init__(
+        self,
+        languages: Iterable[str],
+        prefix_chars: int = 1000,
+        min_confidence: float = 0.75,
+        min_evidence: float = 1.0,
+        fallback: Optional[LanguageDetector] = None,
+    ):
+        self.languages = tuple(lang for lang in languages if lang in STOPWORDS)
+        self.prefix_chars = prefix_chars
+        self.min_confidence = min_confidence
+        self.min_evidence = min_evidence
+        self.fallback = fallback
+        self.fast_hits = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def score(self, text: str) -> dict[str, float]:
+        """Score every supported language on the prefix of ``text``.
+
+        Args:
+            text (str): Text to score.
+
+        Returns:
+            dict[str, float]: Evidence per language; higher is more likely.
+        """
+        words = Counter(_WORD_PATTERN.findall(text[:self.prefix_chars].lower()))
+        scores = {}
+        for lang in self.languages:
+            stopwords = STOPWORDS[lang]
+            ngrams = NGRAMS[lang]
+            score = 0.0
+            for word, count in words.items():
+                if word in stopwords:
+                    score += count
+                score += NGRAM_WEIGHT * count * sum(1 for gram in ngrams if gram in word)
+            scores[lang] = score
+        return scores
+
+    def detect(self, text: str) -> str:
+        scores = self.score(text)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best_lang, best = ranked[0] if ranked else (DEFAULT_LANGUAGE, 0.0)
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        confidence = best / (best + runner_up) if best else 0.0
+
+        if self.fallback is None or (
+            best >= self.min_evidence and confidence >= self.min_confidence
+        ):
+            with self._lock:
+                self.fast_hits += 1
+            return best_lang if best else DEFAULT_LANGUAGE
+
+        with self._lock:
+            self.fallbacks += 1
+        return self.fallback.detect(text[:self.prefix_chars])
+
+    def stats(self) -> dict:
+        """Return how often the fast path decided versus the fallback."""
+        total = self.fast_hits + self.fallbacks
+        return {
+            "fast_hits": self.fast_hits,
+            "fallbacks": self.fallbacks,
+            "fast_hit_rate": round(self.fast_hits / total, 4) if total else 0.0,
+        }
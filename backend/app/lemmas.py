@@ -0,0 +1,112 @@
+"""Memoized lemmatization for the repetitive vocabulary of emails.
+
+With ``LEMMATIZER_MODE=memo`` `clean_email_text` does not run spaCy's
+tagger on every email. `LemmaMemo` tokenizes with the model's own tokenizer
+(stop word and punctuation flags are lexical, so they come for free) and
+looks the remaining tokens up in a per-language LRU of the lemmas spaCy
+produced for them before. Only emails with a token not seen yet go through
+the model, as a whole, so every lemma is learned in its sentence; their
+output is the model's own.
+
+A form that gets different lemmas in different sentences (homographs whose
+lemma depends on the part of speech) is marked ambiguous and sends every
+email containing it to the model, so the memo only answers for forms
+whose lemma has not depended on context so far; numbers are kept as they
+are. Hits and misses are counted per token lookup and reported by `stats`
+and the ``lemma_memo_lookups_total`` counter.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Optional
+from .metrics import LEMMA_MEMO_LOOKUPS, increment
+
+# Memo value of forms seen with more than one lemma
+AMBIGUOUS = None
+
+
+class LemmaMemo:
+    """Bounded LRU of token text -> lowercased lemma for one spaCy model.
+
+    Attributes:
+        lang (str): Language of the model, used as metric label.
+        max_entries (int): Tokens remembered before the least recently used
+            ones are evicted.
+        hits (int): Token lookups answered by the memo.
+        misses (int): Token lookups that needed the model.
+    """
+
+    def __init__(self, nlp, lang: str, max_entries: int):
+        self.nlp = nlp
+        self.lang = lang
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lemmas: OrderedDict[str, Optional[str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lemmatize(self, text: str) -> str:
+        """Join the lowercased lemmas of ``text``, skipping stop words and punctuation.
+
+        Same output format as `app.utils._lemmatize` on ``nlp(text)``.
+        """
+        doc = self.nlp.make_doc(text)
+        tokens = [t for t in doc if not t.is_stop and not t.is_punct and not t.is_space]
+        lemmas: list[str] = []
+        misses = 0
+        with self._lock:
+            for token in tokens:
+                if token.like_num:
+                    lemmas.append(token.lower_)
+                    continue
+                lemma = self._lemmas.get(token.text, AMBIGUOUS)
+                if lemma is not AMBIGUOUS:
+                    self._lemmas.move_to_end(token.text)
+                else:
+                    misses += 1
+                lemmas.append(lemma)
+            hits = len(lemmas) - misses - sum(token.like_num for token in tokens)
+            self.hits += hits
+            self.misses += misses
+        if hits:
+            increment(LEMMA_MEMO_LOOKUPS, hits, language=self.lang, result="hit")
+        if not misses:
+            return " ".join(lemmas)
+
+        # Run the model on the whole email so each lemma comes from its sentence
+        increment(LEMMA_MEMO_LOOKUPS, misses, language=self.lang, result="miss")
+        lemmas = []
+        learned: dict[str, Optional[str]] = {}
+        for token in self.nlp(doc):
+            if token.is_stop or token.is_punct or token.is_space:
+                continue
+            lemma = token.lemma_.lower()
+            lemmas.append(lemma)
+            if not token.like_num:
+                seen = learned.setdefault(token.text, lemma)
+                learned[token.text] = lemma if seen == lemma else AMBIGUOUS
+        with self._lock:
+            for word, lemma in learned.items():
+                if word in self._lemmas and self._lemmas[word] != lemma:
+                    lemma = AMBIGUOUS
+                self._lemmas[word] = lemma
+                self._lemmas.move_to_end(word)
+            while len(self._lemmas) > self.max_entries:
+                self._lemmas.popitem(last=False)
+        return " ".join(lemmas)
+
+    def clear(self) -> None:
+        """Forget every remembered lemma (counters are kept)."""
+        with self._lock:
+            self._lemmas.clear()
+
+    def stats(self) -> dict:
+        """Return counters and sizing information for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._lemmas),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
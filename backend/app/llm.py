@@ -0,0 +1,777 @@
+"""LLM providers behind `generate_response`.
+
+The provider is selected with ``LLM_PROVIDER``:
+    - ``groq``: Groq Cloud via the official SDK (default).
+    - ``openai``: any OpenAI-compatible ``/chat/completions`` endpoint
+      (OpenAI, vLLM, Ollama, LiteLLM, the mock server below...).
+    - ``stub``: deterministic in-process responses with configurable
+      latency, error rate and token usage, for offline load tests.
+
+The stub can also be served over HTTP, so the full network path of the
+``openai`` provider can be load-tested without quota:
+
+Usage (from the ``backend`` directory):
+    python -m app.llm serve --port 8001
+    LLM_PROVIDER=openai LLM_BASE_URL=http://localhost:8001/v1 uvicorn app.main:app
+"""
+
+import argparse
+import email.utils
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Generator, Iterator, Optional
+from .config import (
+    LLM_API_KEY,
+    LLM_BASE_URL,
+    LLM_CLASSIFIER_MODEL,
+    LLM_MODEL,
+    LLM_PROVIDER,
+    LLM_TIMEOUT,
+    STUB_LLM_BATCH_DROP_RATE,
+    STUB_LLM_CLASSIFIER_LATENCY_MS,
+    STUB_LLM_COMPLETION_TOKENS,
+    STUB_LLM_ERROR_RATE,
+    STUB_LLM_LATENCY_JITTER_MS,
+    STUB_LLM_LATENCY_MS,
+    STUB_LLM_RPM_LIMIT,
+    STUB_LLM_SEED,
+)
+from .degradation import keyword_category
+from .prompts import BATCH_INSTRUCTIONS, CLASSIFIER_PROMPT
+from .templates import RESPONSE_TEMPLATES
+
+class LLMProviderError(Exception):
+    """Normalized failure of a provider call.
+
+    Attributes:
+        status_code (Optional[int]): HTTP status, or ``None`` for transport
+            errors (connection reset, timeout...).
+        retry_after (Optional[float]): Seconds the backend asked callers to
+            wait, from ``retry-after``/``retry-after-ms`` headers.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def rate_limited(self) -> bool:
+        return self.status_code == 429
+
+    @property
+    def retryable(self) -> bool:
+        """Whether retrying the same call may succeed."""
+        return self.status_code is None or self.status_code in (408, 409, 429) or self.status_code >= 500
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """Seconds to wait according to ``retry-after-ms`` or ``retry-after`` headers."""
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+@dataclass
+class LLMCompletion:
+    """Text and token usage of one chat completion.
+
+    Attributes:
+        content (str): Message content returned by the model.
+        prompt_tokens (int): Input tokens billed.
+        completion_tokens (int): Output tokens billed.
+        model (str): Model that produced the completion.
+    """
+    content: str
+    prompt_tokens: int
+    completion_tokens: int
+    model: str
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class LLMStream:
+    """Content deltas of a streamed chat completion.
+
+    Iterate to receive the text as the model generates it; once exhausted,
+    `completion` holds the full content and token usage.
+
+    Attributes:
+        completion (Optional[LLMCompletion]): Set when the stream ends.
+    """
+
+    def __init__(self, deltas: Generator[str, None, LLMCompletion]):
+        self._deltas = deltas
+        self.completion: Optional[LLMCompletion] = None
+
+    def __iter__(self) -> Iterator[str]:
+        self.completion = yield from self._deltas
+
+    def close(self) -> None:
+        """Stop reading the stream and release the connection."""
+        self._deltas.close()
+
+
+def _single_delta(completion: LLMCompletion) -> Generator[str, None, LLMCompletion]:
+    yield completion.content
+    return completion
+
+
+class LLMProvider(ABC):
+    """A chat completion backend.
+
+    Attributes:
+        name (str): Provider name used in logs and stats.
+        model (str): Model requested from the backend.
+    """
+
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @abstractmethod
+    def complete(
+        self,
+        system_prompt: str,
+        user_message: str,
+        max_tokens: int,
+        temperature: float,
+        json_mode: bool = True,
+        timeout: Optional[float] = None,
+    ) -> LLMCompletion:
+        """Run one chat completion.
+
+        ``timeout`` bounds the call in seconds (``LLM_TIMEOUT`` when omitted),
+        so callers can keep it within their own deadline.
+
+        Raises:
+            LLMProviderError: On API or transport failures, so the scheduler
+                can tell rate limits and transient errors from permanent ones.
+        """
+
+    def stream(
+        self,
+        system_prompt: str,
+        user_message: str,
+        max_tokens: int,
+        temperature: float,
+        json_mode: bool = True,
+        timeout: Optional[float] = None,
+    ) -> LLMStream:
+        """Start a chat completion whose content is read as it is generated.
+
+        The request is sent before returning, so failures to start raise here
+        (and can be retried); failures while reading raise from the stream.
+        Providers without streaming support yield the whole content at once.
+        ``timeout`` bounds opening the stream and each read.
+
+        Raises:
+            LLMProviderError: On API or transport failures.
+        """
+        return LLMStream(_single_delta(
+            self.complete(system_prompt, user_message, max_tokens, temperature, json_mode, timeout)
+        ))
+
+
+def _request_options(json_mode: bool, timeout: Optional[float]) -> dict:
+    """Optional ``chat.completions.create`` arguments of the Groq SDK."""
+    options = {"response_format": {"type": "json_object"}} if json_mode else {}
+    if timeout is not None:
+        options["timeout"] = timeout
+    return options
+
+
+class GroqProvider(LLMProvider):
+    """Groq Cloud through the ``groq`` SDK."""
+
+    name = "groq"
+
+    def __init__(self, model: str, api_key: str, timeout: float):
+        super().__init__(model)
+        import groq
+        import httpx
+        self._errors = groq
+        # The SDK only wraps errors raised before the stream starts; reading
+        # it surfaces httpx's own
+        self._transport_errors = httpx.TransportError
+        # Retries are handled by the scheduler (see app.rate_limit)
+        self.client = groq.Groq(api_key=api_key, timeout=timeout, max_retries=0)
+
+    def complete(self, system_prompt, user_message, max_tokens, temperature, json_mode=True, timeout=None):
+        options = _request_options(json_mode, timeout)
+        try:
+            completion = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_message},
+                ],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                **options,
+            )
+        except self._errors.APIStatusError as e:
+            raise LLMProviderError(str(e), e.status_code, parse_retry_after(e.response.headers)) from e
+        except self._errors.APIConnectionError as e:
+            raise LLMProviderError(str(e)) from e
+        usage = completion.usage
+        return LLMCompletion(
+            content=completion.choices[0].message.content,
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0,
+            model=completion.model or self.model,
+        )
+
+    def stream(self, system_prompt, user_message, max_tokens, temperature, json_mode=True, timeout=None):
+        options = _request_options(json_mode, timeout)
+        try:
+            chunks = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_message},
+                ],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                **options,
+            )
+        except self._errors.APIStatusError as e:
+            raise LLMProviderError(str(e), e.status_code, parse_retry_after(e.response.headers)) from e
+        except self._errors.APIConnectionError as e:
+            raise LLMProviderError(str(e)) from e
+        return LLMStream(self._read_stream(chunks))
+
+    def _read_stream(self, chunks) -> Generator[str, None, LLMCompletion]:
+        parts, usage, model = [], None, self.model
+        try:
+            for chunk in chunks:
+                model = chunk.model or model
+                # Groq reports usage on the last chunk, under x_groq
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield parts[-1]
+        except self._errors.APIError as e:
+            raise LLMProviderError(str(e), getattr(e, "status_code", None)) from e
+        except self._transport_errors as e:
+            raise LLMProviderError(str(e)) from e
+        except json.JSONDecodeError as e:
+            raise LLMProviderError(f"Malformed stream chunk: {e}") from e
+        finally:
+            chunks.close()
+        return LLMCompletion(
+            content="".join(parts),
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0,
+            model=model,
+        )
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Any server implementing OpenAI's ``POST /chat/completions``.
+
+    Talks to the endpoint with ``httpx`` (already required by the Groq SDK)
+    so no vendor SDK is needed.
+    """
+
+    name = "openai"
+
+    def __init__(self, model: str, base_url: str, api_key: str, timeout: float):
+        super().__init__(model)
+        import httpx
+        self._errors = httpx
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.client = httpx.Client(base_url=base_url.rstrip("/"), headers=headers, timeout=timeout)
+
+    def _payload(self, system_prompt, user_message, max_tokens, temperature, json_mode) -> dict:
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message},
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+        return payload
+
+    def complete(self, system_prompt, user_message, max_tokens, temperature, json_mode=True, timeout=None):
+        payload = self._payload(system_prompt, user_message, max_tokens, temperature, json_mode)
+        # httpx reads an explicit None as "no timeout"
+        options = {} if timeout is None else {"timeout": timeout}
+        try:
+            response = self.client.post("/chat/completions", json=payload, **options)
+            response.raise_for_status()
+        except self._errors.HTTPStatusError as e:
+            raise LLMProviderError(
+                str(e), e.response.status_code, parse_retry_after(e.response.headers)
+            ) from e
+        except self._errors.TransportError as e:
+            raise LLMProviderError(str(e)) from e
+        try:
+            data = response.json()
+            content = data["choices"][0]["message"]["content"]
+        except (ValueError, LookupError, TypeError) as e:
+            # A truncated or garbled body is transient like a dropped connection
+            raise LLMProviderError(f"Malformed completion: {e!r}") from e
+        usage = data.get("usage") or {}
+        return LLMCompletion(
+            content=content,
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            model=data.get("model", self.model),
+        )
+
+    def stream(self, system_prompt, user_message, max_tokens, temperature, json_mode=True, timeout=None):
+        payload = self._payload(system_prompt, user_message, max_tokens, temperature, json_mode)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        options = {} if timeout is None else {"timeout": timeout}
+        request = self.client.build_request("POST", "/chat/completions", json=payload, **options)
+        try:
+            response = self.client.send(request, stream=True)
+        except self._errors.TransportError as e:
+            raise LLMProviderError(str(e)) from e
+        if response.is_error:
+            response.read()
+            response.close()
+            raise LLMProviderError(
+                f"{response.status_code} {response.text[:200]}",
+                response.status_code,
+                parse_retry_after(response.headers),
+            )
+        return LLMStream(self._read_stream(response))
+
+    def _read_stream(self, response) -> Generator[str, None, LLMCompletion]:
+        parts, usage, model = [], {}, self.model
+        try:
+            for line in response.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                model = chunk.get("model") or model
+                usage = chunk.get("usage") or usage
+                choices = chunk.get("choices") or []
+                content = choices[0].get("delta", {}).get("content") if choices else None
+                if content:
+                    parts.append(content)
+                    yield content
+        except self._errors.TransportError as e:
+            raise LLMProviderError(str(e)) from e
+        except json.JSONDecodeError as e:
+            raise LLMProviderError(f"Malformed stream chunk: {e}") from e
+        finally:
+            response.close()
+        return LLMCompletion(
+            content="".join(parts),
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            model=model,
+        )
+
+
+# Share of the stub's latency spent before the first streamed token
+STUB_FIRST_TOKEN_SHARE = 0.2
+
+# Messages whose failed attempts the stub remembers, oldest forgotten first
+STUB_MAX_TRACKED_MESSAGES = 10_000
+
+# Header of each email in a batch user message (see `app.prompts`)
+BATCH_EMAIL_HEADER = re.compile(r"^### Email (\d+)\n", re.MULTILINE)
+
+# Category stated by the first stage of the cascade (see `app.prompts`)
+CATEGORY_HINT_LINE = re.compile(r"^Category: (\w+)\n")
+
+
+class StubLLMError(LLMProviderError):
+    """Failure injected by `StubProvider` (error rate or simulated quota)."""
+
+
+class StubProvider(LLMProvider):
+    """Deterministic offline provider for load tests and benchmarks.
+
+    The same input always yields the same category, latency and failure
+    decision (seeded by ``seed``, the message content and how many times that
+    message failed in a row before), so benchmark runs are reproducible and
+    retries of a failed call can succeed. Replies are built from the response
+    templates and pass `_validate_response`.
+
+    Attributes:
+        latency_ms (float): Mean simulated latency per call.
+        jitter_ms (float): Maximum deviation added to or removed from the latency.
+        error_rate (float): Share of calls (0.0-1.0) that fail with a 503.
+        completion_tokens (int): Output tokens reported per call.
+        seed (int): Seed mixed into every per-call random generator.
+        rpm_limit (int): Calls accepted per rolling minute before answering
+            429 with ``retry_after`` (0 = unlimited), to simulate quota pressure.
+        batch_drop_rate (float): Share of the emails of a batch call left out
+            of the reply, to exercise per-email retries.
+        calls (int): Calls accepted so far (rejected 429s excluded).
+
+    Batch calls (multi-email system prompt) take the latency of one call
+    plus the generation time of every extra reply, and report
+    ``completion_tokens`` per reply. Calls with the cascade's classifier
+    prompt answer ``{"category": ...}`` only, and replies follow the
+    category stated in the user message when there is one.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        model: str = "stub",
+        latency_ms: float = 200.0,
+        jitter_ms: float = 50.0,
+        error_rate: float = 0.0,
+        completion_tokens: int = 250,
+        seed: int = 0,
+        rpm_limit: int = 0,
+        batch_drop_rate: float = 0.0,
+    ):
+        super().__init__(model)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.completion_tokens = completion_tokens
+        self.seed = seed
+        self.rpm_limit = rpm_limit
+        self.batch_drop_rate = batch_drop_rate
+        self.calls = 0
+        self._attempts: Counter = Counter()
+        self._accepted: deque = deque()
+        self._lock = threading.Lock()
+
+    def _digest(self, user_message: str) -> bytes:
+        return hashlib.sha256(f"{self.seed}\0{user_message}".encode("utf-8")).digest()
+
+    def _rng(self, digest: bytes) -> random.Random:
+        with self._lock:
+            self.calls += 1
+            attempt = self._attempts[digest]
+            self._attempts[digest] += 1
+            if len(self._attempts) > STUB_MAX_TRACKED_MESSAGES:
+                del self._attempts[next(iter(self._attempts))]
+        return random.Random(int.from_bytes(digest[:8], "big") + attempt)
+
+    def _succeeded(self, digest: bytes) -> None:
+        """Forget the failed attempts of a message once a call with it succeeds."""
+        with self._lock:
+            self._attempts.pop(digest, None)
+
+    def _check_quota(self) -> None:
+        """Reject the call with a 429 once ``rpm_limit`` calls ran in the last minute."""
+        if self.rpm_limit <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            while self._accepted and self._accepted[0] <= now - 60:
+                self._accepted.popleft()
+            if len(self._accepted) >= self.rpm_limit:
+                raise StubLLMError(
+                    "Stub LLM rate limit exceeded", 429, self._accepted[0] + 60 - now
+                )
+            self._accepted.append(now)
+
+    def _latency(self, rng: random.Random, replies: int = 1) -> float:
+        """Simulated seconds for the whole completion of ``replies`` replies."""
+        latency = max(0.0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        # Only the generation part grows with the number of replies
+        return latency * (STUB_FIRST_TOKEN_SHARE + (1 - STUB_FIRST_TOKEN_SHARE) * replies)
+
+    def complete(self, system_prompt, user_message, max_tokens, temperature, json_mode=True, timeout=None):
+        self._check_quota()
+        digest = self._digest(user_message)
+        rng = self._rng(digest)
+        batch = self._batch_emails(system_prompt, user_message)
+        self._wait(self._latency(rng, len(batch) if batch is not None else 1), timeout)
+        if rng.random() < self.error_rate:
+            raise StubLLMError("Injected stub LLM failure", 503)
+        self._succeeded(digest)
+        if batch is not None:
+            return self._batch_reply(system_prompt, batch, max_tokens, rng)
+        if system_prompt == CLASSIFIER_PROMPT:
+            return self._classification(user_message, max_tokens)
+        return self._reply(system_prompt, user_message, max_tokens)
+
+    def stream(self, system_prompt, user_message, max_tokens, temperature, json_mode=True, timeout=None):
+        self._check_quota()
+        digest = self._digest(user_message)
+        rng = self._rng(digest)
+        latency = self._latency(rng)
+        self._wait(latency * STUB_FIRST_TOKEN_SHARE, timeout)
+        if rng.random() < self.error_rate:
+            raise StubLLMError("Injected stub LLM failure", 503)
+        self._succeeded(digest)
+        completion = self._reply(system_prompt, user_message, max_tokens)
+        return LLMStream(self._stream_reply(completion, latency * (1 - STUB_FIRST_TOKEN_SHARE)))
+
+    @staticmethod
+    def _wait(latency: float, timeout: Optional[float]) -> None:
+        """Sleep ``latency`` seconds, or fail like a transport timeout after ``timeout``."""
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise StubLLMError(f"Stub LLM call timed out after {timeout:.2f}s")
+        time.sleep(latency)
+
+    @staticmethod
+    def _stream_reply(completion: LLMCompletion, duration: float) -> Generator[str, None, LLMCompletion]:
+        """Yield the content in one chunk per completion token, spread over ``duration``."""
+        content = completion.content
+        chunks = max(1, min(completion.completion_tokens, len(content)))
+        size = math.ceil(len(content) / chunks)
+        for start in range(0, len(content), size):
+            yield content[start:start + size]
+            time.sleep(duration / chunks)
+        return completion
+
+    @staticmethod
+    def _batch_emails(system_prompt: str, user_message: str) -> Optional[list[tuple[int, str]]]:
+        """``(index, message)`` of each email of a batch call, or ``None`` for a single email."""
+        if not system_prompt.endswith(BATCH_INSTRUCTIONS):
+            return None
+        parts = BATCH_EMAIL_HEADER.split(user_message)
+        return [(int(index), message) for index, message in zip(parts[1::2], parts[2::2])]
+
+    @staticmethod
+    def _answer(system_prompt: str, user_message: str) -> dict:
+        """Template-based reply for the stated or the message's keyword category."""
+        hint = CATEGORY_HINT_LINE.match(user_message)
+        category = hint.group(1) if hint else keyword_category(user_message)
+        # The few-shot examples quote the templates of the detected language
+        lang = next(
+            (lang for lang, templates in RESPONSE_TEMPLATES.items()
+             if templates["greeting"]["subject"] in system_prompt),
+            "pt",
+        )
+        template = RESPONSE_TEMPLATES[lang].get(category) or RESPONSE_TEMPLATES[lang]["technical_support"]
+        return {
+            "is_productive": category not in ["greeting", "spam"],
+            "category": category,
+            "suggested_subject": template["subject"],
+            "suggested_body": template["body"],
+        }
+
+    def _batch_reply(
+        self, system_prompt: str, emails: list[tuple[int, str]], max_tokens: int, rng: random.Random
+    ) -> LLMCompletion:
+        """``{"replies": [...]}`` completion, without the emails dropped by ``batch_drop_rate``."""
+        replies = [
+            {"index": index, **self._answer(system_prompt, message)}
+            for index, message in emails
+            if rng.random() >= self.batch_drop_rate
+        ]
+        return LLMCompletion(
+            content=json.dumps({"replies": replies}, ensure_ascii=False),
+            prompt_tokens=max(1, round((len(system_prompt) + sum(len(m) for _, m in emails)) / 4)),
+            completion_tokens=min(self.completion_tokens * len(replies), max_tokens),
+            model=self.model,
+        )
+
+    def _classification(self, user_message: str, max_tokens: int) -> LLMCompletion:
+        """``{"category": ...}`` completion for the cascade's classifier prompt."""
+        content = json.dumps({"category": keyword_category(user_message)})
+        return LLMCompletion(
+            content=content,
+            prompt_tokens=max(1, round((len(CLASSIFIER_PROMPT) + len(user_message)) / 4)),
+            completion_tokens=min(max(1, round(len(content) / 4)), max_tokens),
+            model=self.model,
+        )
+
+    def _reply(self, system_prompt: str, user_message: str, max_tokens: int) -> LLMCompletion:
+        """Template-based completion for the message's keyword category."""
+        content = json.dumps(self._answer(system_prompt, user_message), ensure_ascii=False)
+        return LLMCompletion(
+            content=content,
+            prompt_tokens=max(1, round((len(system_prompt) + len(user_message)) / 4)),
+            completion_tokens=min(self.completion_tokens, max_tokens),
+            model=self.model,
+        )
+
+
+def create_llm_provider(
+    name: str, model: str = LLM_MODEL, stub_latency_ms: float = STUB_LLM_LATENCY_MS
+) -> LLMProvider:
+    """Build the provider called ``name`` from the ``LLM_*`` settings.
+
+    Args:
+        name (str): ``groq``, ``openai`` or ``stub``.
+        model (str): Model requested from the backend (the stub ignores it).
+        stub_latency_ms (float): Mean latency of the stub, standing for the
+            speed of ``model``.
+
+    Raises:
+        ValueError: If ``name`` is not a known provider.
+    """
+    if name == "groq":
+        return GroqProvider(model, LLM_API_KEY or os.getenv("GROQ_API_KEY"), LLM_TIMEOUT)
+    if name == "openai":
+        return OpenAICompatibleProvider(model, LLM_BASE_URL, LLM_API_KEY, LLM_TIMEOUT)
+    if name == "stub":
+        return StubProvider(
+            latency_ms=stub_latency_ms,
+            jitter_ms=STUB_LLM_LATENCY_JITTER_MS,
+            error_rate=STUB_LLM_ERROR_RATE,
+            completion_tokens=STUB_LLM_COMPLETION_TOKENS,
+            seed=STUB_LLM_SEED,
+            rpm_limit=STUB_LLM_RPM_LIMIT,
+            batch_drop_rate=STUB_LLM_BATCH_DROP_RATE,
+        )
+    raise ValueError(f"Unknown LLM_PROVIDER: {name!r} (expected groq, openai or stub)")
+
+
+@lru_cache(maxsize=1)
+def get_llm_provider() -> LLMProvider:
+    """Return the shared provider selected by ``LLM_PROVIDER``.
+
+    Created eagerly by the startup warm-up; lazily otherwise.
+    """
+    return create_llm_provider(LLM_PROVIDER)
+
+
+@lru_cache(maxsize=1)
+def get_llm_classifier_provider() -> LLMProvider:
+    """Return the provider of the cascade's first stage (``LLM_CLASSIFIER_MODEL``)."""
+    return create_llm_provider(LLM_PROVIDER, LLM_CLASSIFIER_MODEL, STUB_LLM_CLASSIFIER_LATENCY_MS)
+
+
+def create_mock_server(provider: StubProvider):
+    """OpenAI-compatible FastAPI app answering with ``provider``."""
+    from fastapi import FastAPI, HTTPException
+    from fastapi.responses import StreamingResponse
+    from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+    mock = FastAPI(title="Stub LLM")
+
+    def sse_chunks(stream: LLMStream, completion_id: str, include_usage: bool):
+        for delta in stream:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "model": provider.model,
+                "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        completion = stream.completion
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "model": completion.model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        if include_usage:
+            final["usage"] = {
+                "prompt_tokens": completion.prompt_tokens,
+                "completion_tokens": completion.completion_tokens,
+                "total_tokens": completion.total_tokens,
+            }
+        yield f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n"
+
+    @mock.post("/v1/chat/completions")
+    async def chat_completions(payload: dict):
+        messages = {m["role"]: m["content"] for m in payload.get("messages", [])}
+        streamed = payload.get("stream", False)
+        try:
+            completion = await run_in_threadpool(
+                provider.stream if streamed else provider.complete,
+                messages.get("system", ""),
+                messages.get("user", ""),
+                payload.get("max_tokens", 600),
+                payload.get("temperature", 0.3),
+            )
+        except StubLLMError as e:
+            headers = None
+            if e.retry_after is not None:
+                headers = {
+                    "Retry-After": str(math.ceil(e.retry_after)),
+                    "retry-after-ms": str(round(e.retry_after * 1000)),
+                }
+            raise HTTPException(status_code=e.status_code, detail=str(e), headers=headers)
+        if streamed:
+            include_usage = (payload.get("stream_options") or {}).get("include_usage", False)
+            return StreamingResponse(
+                iterate_in_threadpool(sse_chunks(completion, f"stub-{uuid.uuid4().hex[:12]}", include_usage)),
+                media_type="text/event-stream",
+            )
+        return {
+            "id": f"stub-{hashlib.sha256(completion.content.encode('utf-8')).hexdigest()[:12]}",
+            "object": "chat.completion",
+            "model": completion.model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": completion.content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": completion.prompt_tokens,
+                "completion_tokens": completion.completion_tokens,
+                "total_tokens": completion.total_tokens,
+            },
+        }
+
+    return mock
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.llm",
+        description="Serve the stub LLM as an OpenAI-compatible mock server.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve = subparsers.add_parser("serve", help="Run the mock server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8001)
+    serve.add_argument("--latency-ms", type=float, default=STUB_LLM_LATENCY_MS)
+    serve.add_argument("--jitter-ms", type=float, default=STUB_LLM_LATENCY_JITTER_MS)
+    serve.add_argument("--error-rate", type=float, default=STUB_LLM_ERROR_RATE)
+    serve.add_argument("--completion-tokens", type=int, default=STUB_LLM_COMPLETION_TOKENS)
+    serve.add_argument("--seed", type=int, default=STUB_LLM_SEED)
+    serve.add_argument("--rpm-limit", type=int, default=STUB_LLM_RPM_LIMIT)
+    args = parser.parse_args()
+
+    import uvicorn
+    provider = StubProvider(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        completion_tokens=args.completion_tokens,
+        seed=args.seed,
+        rpm_limit=args.rpm_limit,
+    )
+    uvicorn.run(create_mock_server(provider), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
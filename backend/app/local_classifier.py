@@ -0,0 +1,240 @@
+"""Local email category classifier used to skip the LLM for confident cases.
+
+A TF-IDF + multinomial logistic regression model over the lemmatized output
+of `clean_email_text`, trained from categories the LLM assigned in
+production (see ``LLM_LABEL_LOG``). When its confidence reaches
+``LOCAL_CLASSIFIER_THRESHOLD`` the reply comes straight from the templates,
+so obvious spam and greetings no longer cost an LLM call.
+
+The model is plain Python and stored as JSON, so it adds no dependencies.
+
+Usage (from the ``backend`` directory):
+    python -m app.local_classifier train labels.jsonl -o local_classifier.json
+"""
+
+import argparse
+import json
+import logging
+import math
+import random
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+from .config import LLM_LABEL_LOG, LOCAL_CLASSIFIER_MODEL, LOCAL_CLASSIFIER_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+_label_log_lock = threading.Lock()
+
+
+def extract_features(cleaned_text: str, lang: str) -> Counter:
+    """Unigram and bigram counts of a cleaned email, plus a language feature."""
+    tokens = cleaned_text.split()
+    features = Counter(tokens)
+    features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    features[f"__lang_{lang}"] += 1
+    return features
+
+
+class LocalClassifier:
+    """TF-IDF + softmax regression classifier over cleaned email text.
+
+    Attributes:
+        classes (list[str]): Categories the model can predict.
+        idf (dict[str, float]): Inverse document frequency per feature.
+        weights (dict[str, dict[str, float]]): Sparse weights per class.
+        bias (dict[str, float]): Bias per class.
+        threshold (float): Minimum probability to accept a prediction.
+        decisions (int): Emails scored by `classify`.
+        local_hits (int): Emails whose prediction met the threshold.
+    """
+
+    def __init__(self, classes, idf, weights, bias, threshold: float = 0.9):
+        self.classes = list(classes)
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+        self.threshold = threshold
+        self.decisions = 0
+        self.local_hits = 0
+        self._lock = threading.Lock()
+
+    def vectorize(self, cleaned_text: str, lang: str) -> dict[str, float]:
+        """L2-normalized, sublinear TF-IDF vector of known features."""
+        vector = {
+            feature: (1 + math.log(count)) * self.idf[feature]
+            for feature, count in extract_features(cleaned_text, lang).items()
+            if feature in self.idf
+        }
+        norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+        return {feature: value / norm for feature, value in vector.items()}
+
+    def predict_proba(self, cleaned_text: str, lang: str) -> dict[str, float]:
+        """Probability of every class for a cleaned email."""
+        return self._softmax(self.vectorize(cleaned_text, lang))
+
+    def _softmax(self, vector: dict[str, float]) -> dict[str, float]:
+        logits = {
+            cls: self.bias[cls] + sum(
+                value * self.weights[cls].get(feature, 0.0)
+                for feature, value in vector.items()
+            )
+            for cls in self.classes
+        }
+        peak = max(logits.values())
+        exps = {cls: math.exp(logit - peak) for cls, logit in logits.items()}
+        total = sum(exps.values())
+        return {cls: value / total for cls, value in exps.items()}
+
+    def classify(self, cleaned_text: str, lang: str) -> Optional[str]:
+        """Return the predicted category if confident enough, else ``None``.
+
+        Updates the hit-rate counters.
+        """
+        probabilities = self.predict_proba(cleaned_text, lang)
+        category, probability = max(probabilities.items(), key=lambda item: item[1])
+        confident = probability >= self.threshold
+        with self._lock:
+            self.decisions += 1
+            self.local_hits += confident
+        return category if confident else None
+
+    def stats(self) -> dict:
+        """Return the threshold and how often the LLM was skipped."""
+        return {
+            "threshold": self.threshold,
+            "decisions": self.decisions,
+            "local_hits": self.local_hits,
+            "hit_rate": round(self.local_hits / self.decisions, 4) if self.decisions else 0.0,
+        }
+
+    @classmethod
+    def train(
+        cls,
+        samples: list[tuple[str, str, str]],
+        epochs: int = 30,
+        learning_rate: float = 0.5,
+        l2: float = 1e-4,
+        min_df: int = 1,
+        seed: int = 0,
+    ) -> "LocalClassifier":
+        """Fit a model with SGD on ``(cleaned_text, lang, category)`` samples."""
+        document_frequency = Counter()
+        for text, lang, _ in samples:
+            document_frequency.update(extract_features(text, lang).keys())
+        n_docs = len(samples)
+        idf = {
+            feature: math.log((1 + n_docs) / (1 + df)) + 1
+            for feature, df in document_frequency.items()
+            if df >= min_df
+        }
+
+        classes = sorted({category for _, _, category in samples})
+        model = cls(classes, idf, {c: defaultdict(float) for c in classes}, {c: 0.0 for c in classes})
+        vectors = [(model.vectorize(text, lang), category) for text, lang, category in samples]
+
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(vectors)
+            rate = learning_rate / (1 + epoch * 0.1)
+            for vector, category in vectors:
+                probabilities = model._softmax(vector)
+                for c in classes:
+                    gradient = probabilities[c] - (c == category)
+                    weights = model.weights[c]
+                    for feature, value in vector.items():
+                        weights[feature] -= rate * (gradient * value + l2 * weights[feature])
+                    model.bias[c] -= rate * gradient
+
+        model.weights = {
+            c: {f: w for f, w in weights.items() if abs(w) >= 1e-4}
+            for c, weights in model.weights.items()
+        }
+        return model
+
+    def save(self, path: Path) -> None:
+        """Write the model as JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": 1, "classes": self.classes, "idf": self.idf,
+                 "weights": self.weights, "bias": self.bias},
+                f, ensure_ascii=False,
+            )
+
+    @classmethod
+    def load(cls, path: Path, threshold: float = 0.9) -> "LocalClassifier":
+        """Read a model written by `save`."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["classes"], data["idf"], data["weights"], data["bias"], threshold)
+
+
+@lru_cache(maxsize=1)
+def get_local_classifier() -> Optional[LocalClassifier]:
+    """Return the model at ``LOCAL_CLASSIFIER_MODEL``, or ``None`` if disabled."""
+    if not LOCAL_CLASSIFIER_MODEL:
+        return None
+    model = LocalClassifier.load(Path(LOCAL_CLASSIFIER_MODEL), LOCAL_CLASSIFIER_THRESHOLD)
+    logger.info(f"Local classifier loaded ({len(model.idf)} features, threshold {model.threshold})")
+    return model
+
+
+def log_llm_label(cleaned_text: str, lang: str, category: str) -> None:
+    """Append an LLM-assigned category to ``LLM_LABEL_LOG`` as training data."""
+    if not LLM_LABEL_LOG:
+        return
+    record = json.dumps({"text": cleaned_text, "lang": lang, "category": category}, ensure_ascii=False)
+    with _label_log_lock, open(LLM_LABEL_LOG, "a", encoding="utf-8") as f:
+        f.write(record + "\n")
+
+
+def _load_samples(path: Path) -> list[tuple[str, str, str]]:
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [(r["text"], r["lang"], r["category"]) for r in records]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.local_classifier",
+        description="Train the local classifier from logged LLM labels.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    train = subparsers.add_parser("train", help="Train and save a model")
+    train.add_argument("labels", type=Path, help="JSONL written via LLM_LABEL_LOG")
+    train.add_argument("-o", "--output", type=Path, default=Path("local_classifier.json"))
+    train.add_argument("--epochs", type=int, default=30)
+    train.add_argument("--learning-rate", type=float, default=0.5)
+    train.add_argument("--l2", type=float, default=1e-4)
+    train.add_argument("--min-df", type=int, default=1)
+    train.add_argument("--holdout", type=float, default=0.2, help="Share kept for evaluation")
+    args = parser.parse_args()
+
+    samples = _load_samples(args.labels)
+    random.Random(0).shuffle(samples)
+    split = int(len(samples) * (1 - args.holdout))
+    train_set, test_set = samples[:split], samples[split:]
+    options = dict(epochs=args.epochs, learning_rate=args.learning_rate, l2=args.l2, min_df=args.min_df)
+
+    if test_set:
+        model = LocalClassifier.train(train_set, **options)
+        scored = []
+        for text, lang, category in test_set:
+            probabilities = model.predict_proba(text, lang)
+            predicted, probability = max(probabilities.items(), key=lambda item: item[1])
+            scored.append((probability, predicted == category))
+        print(f"Holdout: {len(test_set)} samples")
+        print(f"{'threshold':>10} {'hit_rate':>10} {'accuracy':>10}")
+        for threshold in (0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99):
+            accepted = [correct for probability, correct in scored if probability >= threshold]
+            accuracy = sum(accepted) / len(accepted) if accepted else float("nan")
+            print(f"{threshold:>10.2f} {len(accepted) / len(scored):>10.3f} {accuracy:>10.3f}")
+
+    LocalClassifier.train(samples, **options).save(args.output)
+    print(f"Model trained on {len(samples)} samples saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,22 +5,64 @@ processes them through an LLM-powered classification pipeline, and returns
 suggested responses for each email.
 """
 
+import asyncio
+import json
 import logging
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from typing import List
-from .schemas import EmailListRequest, EmailResponse
-from .services import classify_and_respond
-from .exceptions import AppError
+from .config import REQUEST_ID_HEADER
+from .schemas import Email, EmailListRequest, EmailResponse, JobRequest, JobStatus
+from .pipeline import (
+    iter_ndjson_lines,
+    open_email_event_stream,
+    process_email_batch,
+    process_email_stream,
+)
+from .preprocessing import shutdown_preprocessing_pool
+from .warmup import warm_up, warmup_state
+from .exceptions import AppError, JobNotFoundError
+from .jobs import get_job_manager
+from .cache import get_response_cache
+from .local_classifier import get_local_classifier
+from .near_duplicates import get_near_duplicate_index
+from .rate_limit import get_llm_scheduler
+from .degradation import get_circuit_breaker
+from .utils import lemma_memo_stats
+from .metrics import (
+    OPENMETRICS_CONTENT_TYPE,
+    PROMETHEUS_CONTENT_TYPE,
+    RequestContextMiddleware,
+    render_metrics,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up models in the background on startup; release resources on shutdown.
+
+    The warm-up runs as a task so the server accepts connections (and answers
+    `/health`) immediately, while `/ready` reports when it is done. The
+    background job workers start here too.
+    """
+    warmup_task = asyncio.create_task(warm_up())
+    await get_job_manager().start()
+    yield
+    await get_job_manager().stop()
+    warmup_task.cancel()
+    shutdown_preprocessing_pool()
+
 app = FastAPI(
     title="Email Classifier",
     description="High-performance email analysis using Llama 3 on Groq LPUs.",
-    version="1.1.0"
+    version="1.1.0",
+    lifespan=lifespan
 )
 
 # Enable CORS for frontend integration
@@ -30,8 +72,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[REQUEST_ID_HEADER],
 )
 
+# Request IDs and HTTP latency histograms (see app.metrics)
+app.add_middleware(RequestContextMiddleware)
+
 @app.get("/")
 async def root():
     """Root endpoint with API information."""
@@ -40,6 +86,7 @@ async def root():
         "version": "1.1.0",
         "docs": "/docs",
         "health": "/health",
+        "ready": "/ready",
         "status": "online"
     }
 
@@ -51,6 +98,77 @@ async def health_check():
         "service": "email-classifier"
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 200 once models are warmed up, 503 before that.
+
+    Unlike `/health` (liveness), this tells load balancers and autoscalers
+    whether the replica can serve requests without cold-start latency.
+    Includes the load time of each warmed-up resource.
+    """
+    if warmup_state.ready:
+        status = "ready"
+    else:
+        status = "failed" if warmup_state.error else "warming_up"
+
+    return JSONResponse(
+        status_code=200 if warmup_state.ready else 503,
+        content={
+            "status": status,
+            "warmup_seconds": warmup_state.duration,
+            "timings": warmup_state.timings,
+            "workers": warmup_state.workers,
+            "error": warmup_state.error,
+        }
+    )
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Response cache counters (hits, misses, size) for monitoring."""
+    cache = get_response_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@app.get("/near-duplicates/stats")
+async def near_duplicate_stats():
+    """Near-duplicate index size and hit rate (emails answered from a similar one)."""
+    index = get_near_duplicate_index()
+    if index is None:
+        return {"enabled": False}
+    return {"enabled": True, **index.stats()}
+
+@app.get("/classifier/stats")
+async def local_classifier_stats():
+    """Local classifier threshold and hit rate (share of emails that skipped the LLM)."""
+    classifier = get_local_classifier()
+    if classifier is None:
+        return {"enabled": False}
+    return {"enabled": True, **classifier.stats()}
+
+@app.get("/lemmas/stats")
+async def lemmas_stats():
+    """Lemma memo hit rate per language (LEMMATIZER_MODE=memo)."""
+    return lemma_memo_stats()
+
+@app.get("/llm/stats")
+async def llm_scheduler_stats():
+    """LLM scheduler queue length, rate budget, retry counters and circuit breaker state."""
+    return {**get_llm_scheduler().stats(), "circuit_breaker": get_circuit_breaker().stats()}
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    """Prometheus metrics: per-stage latency histograms and pipeline counters.
+
+    Served in the OpenMetrics format (with request ID exemplars when
+    ``METRICS_EXEMPLARS`` is enabled) if the scraper asks for it.
+    """
+    openmetrics = "application/openmetrics-text" in request.headers.get("accept", "")
+    return PlainTextResponse(
+        render_metrics(openmetrics),
+        media_type=OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE,
+    )
+
 @app.exception_handler(AppError)
 async def app_exception_handler(request: Request, exc: AppError):
     logger.warning(f"Handled exception: {exc.message} ({exc.__class__.__name__})")
@@ -79,7 +197,8 @@ async def process_email(request: EmailListRequest):
         HTTPException:
             - 422: Invalid request format or constraint violation (empty list,
               >10 emails, or missing required fields).
-            - 502: LLM service failure (see `LLMServiceError`).
+            - 502: LLM service failure for every email in the batch (see
+              `LLMServiceError`).
 
     Example Request:
         ```json
@@ -94,28 +213,191 @@ async def process_email(request: EmailListRequest):
     Notes:
         - Each email triggers an independent LLM API call; provider rate
           limits may apply.
+        - Emails are processed concurrently, up to ``EMAIL_CONCURRENCY`` at
+          a time; results keep the input order.
+        - A failing email receives a template fallback response instead of
+          failing the whole batch (unless every email fails).
         - Maximum batch size: 10 emails per request.
         - Responses are generated in the same language as the input.
     """
-    
-    # Process each email sequentially
-    results = []
-    for email_item in request.emails:
-        # Combine subject and body for processing
-        full_email_text = f"Subject: {email_item.subject}\n\nBody: {email_item.body}"
-        
-        result_dict = classify_and_respond(full_email_text)
-        
-        # Convert dict to EmailResponse model with original email
-        result = EmailResponse(
-            is_productive=result_dict.get("is_productive", True),
-            category=result_dict.get("category"),
-            suggested_subject=result_dict.get("suggested_subject", ""),
-            suggested_body=result_dict.get("suggested_body", ""),
-            detected_language=result_dict.get("detected_language"),
-            original_email=email_item  # Pass Email object directly
-        )
-        
-        results.append(result)
-    
-    return results
\ No newline at end of file
+    return await process_email_batch(request.emails)
+
+
+@app.post(
+    "/process-email/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def process_email_sse(email_item: Email):
+    """Process one email, streaming the reply as server-sent events.
+
+    Same pipeline as `/process-email`, but the reply is sent while the LLM
+    writes it instead of after the whole completion:
+
+        - ``category``: ``{"category", "isProductive"}`` as soon as known
+        - ``subject``: ``{"suggestedSubject"}``
+        - ``body``: ``{"delta"}``, successive pieces of the suggested body
+        - ``error``: ``{"error", "code"}`` if the LLM failed before replying
+        - ``result``: the final `EmailResponse`. It is validated like the
+          synchronous endpoint's, so when validation fails its
+          ``suggestedBody`` (a template) replaces what was streamed.
+
+    Raises:
+        HTTPException:
+            - 422: Invalid email or preprocessing failure (sent as a regular
+              JSON error before the stream starts).
+    """
+    events = await open_email_event_stream(email_item)
+
+    async def sse():
+        async for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """Streaming response whose content keeps reading the request body.
+
+    Starlette detects client disconnects by consuming ``receive`` while the
+    response streams, which would steal body chunks from ``request.stream()``.
+    Disconnect detection is deferred until the body has been fully read.
+    """
+
+    def __init__(self, content, body_consumed: asyncio.Event, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body_consumed = body_consumed
+
+    async def listen_for_disconnect(self, receive) -> None:
+        await self.body_consumed.wait()
+        await super().listen_for_disconnect(receive)
+
+@app.post(
+    "/process-email/bulk",
+    response_class=StreamingResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {
+                    "schema": {"$ref": "#/components/schemas/Email"}
+                }
+            },
+        }
+    },
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def process_email_bulk(request: Request):
+    """Process an NDJSON stream of emails of any length, streaming results back.
+
+    The request body holds one `Email` JSON object per line. Emails go through
+    the same pipeline as `/process-email` with at most ``BULK_CONCURRENCY`` in
+    flight, and each result is written as one NDJSON line as soon as it
+    completes, so memory use does not depend on the input size.
+
+    Each output line is an `EmailResponse` (camelCase) plus the zero-based
+    ``index`` of its input line; results are in completion order, not input
+    order. Lines that are not valid `Email` objects produce
+    ``{"index": ..., "error": ..., "code": "ValidationError"}``.
+
+    Example Request:
+        ```
+        {"subject": "Overdue Invoice", "body": "I cannot pay my invoice."}
+        {"subject": "Happy Holidays", "body": "Merry Christmas!"}
+        ```
+    """
+    body_consumed = asyncio.Event()
+
+    async def body_chunks():
+        async for chunk in request.stream():
+            yield chunk
+        body_consumed.set()
+
+    async def ndjson_lines():
+        async for record in process_email_stream(iter_ndjson_lines(body_chunks())):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+    return _DuplexStreamingResponse(
+        ndjson_lines(), body_consumed, media_type="application/x-ndjson"
+    )
+
+
+# Seconds between store checks for results of jobs run by other processes,
+# and between SSE keep-alive comments while a job makes no progress
+JOB_EVENTS_POLL = 1.0
+JOB_EVENTS_KEEPALIVE = 15.0
+
+async def _get_job(job_id: str) -> dict:
+    job = await run_in_threadpool(get_job_manager().store.get, job_id)
+    if job is None:
+        raise JobNotFoundError(job_id)
+    return job
+
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+async def submit_job(request: JobRequest):
+    """Queue a batch of up to ``JOB_MAX_EMAILS`` emails for background processing.
+
+    Returns at once with the job ID. Emails are processed by background
+    workers with the same pipeline as `/process-email`; follow the progress
+    with `GET /jobs/{job_id}` or `GET /jobs/{job_id}/events`.
+    """
+    return await get_job_manager().submit(request.emails)
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, after: int = 0):
+    """Job progress and the results completed so far.
+
+    Results are in completion order; pass the last ``seq`` seen as ``after``
+    to receive only newer ones when polling.
+
+    Raises:
+        HTTPException:
+            - 404: Unknown or expired job ID.
+    """
+    job = await _get_job(job_id)
+    results = await run_in_threadpool(get_job_manager().store.results, job_id, after)
+    return {**job, "results": results}
+
+@app.get("/jobs/{job_id}/events", response_class=StreamingResponse)
+async def job_events(job_id: str, request: Request):
+    """Server-sent events with each result of a job as it completes.
+
+    Every completed email is sent as a ``result`` event (a `JobResult`, with
+    ``seq`` as the event ID, so reconnecting clients resume after
+    ``Last-Event-ID``); a final ``done`` event carries the job status once
+    all emails are processed.
+    """
+    await _get_job(job_id)
+    manager = get_job_manager()
+    after = int(request.headers.get("last-event-id") or 0)
+
+    async def events():
+        nonlocal after
+        last_sent = time.monotonic()
+        while True:
+            results = await run_in_threadpool(manager.store.results, job_id, after)
+            for result in results:
+                after = result["seq"]
+                yield f"id: {after}\nevent: result\ndata: {json.dumps(result, ensure_ascii=False)}\n\n"
+                last_sent = time.monotonic()
+            job = await run_in_threadpool(manager.store.get, job_id)
+            if job is None or (job["status"] == "completed" and after >= job["completed"]):
+                status = JobStatus(**job).model_dump_json(by_alias=True) if job else "null"
+                yield f"event: done\ndata: {status}\n\n"
+                return
+            # Woken by local workers; the timeout also picks up jobs run by
+            # other processes sharing the store
+            await manager.wait_for_progress(JOB_EVENTS_POLL)
+            if time.monotonic() - last_sent >= JOB_EVENTS_KEEPALIVE:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,354 @@
+"""Latency spans, counters and the Prometheus ``/metrics`` exposition.
+
+Every pipeline stage (new-content extraction, regex cleaning, language
+detection, spaCy lemmatization, cache and near-duplicate lookups, local
+classifier, LLM queue wait and call, JSON parsing, validation, fallback) is
+timed with `timed` into the ``email_stage_duration_seconds`` histogram,
+alongside counters for cache hits, fallbacks and per-category/per-language
+volume. HTTP requests are
+timed by `RequestContextMiddleware`, which also assigns each request an ID
+(the client's ``X-Request-ID`` or a generated one) that is echoed in the
+response, written in log lines and, with ``METRICS_EXEMPLARS=1``, attached
+to histogram buckets as OpenMetrics exemplars.
+
+The registry is a small in-house implementation of the Prometheus text
+format, so no client library is required.
+
+Stages that run in preprocessing pool workers are not observable from the
+API process directly: workers run under `collect_stage_timings` and ship
+the recorded spans (and counter increments made with `increment`) back for
+`observe_stage_timings`.
+"""
+
+import bisect
+import math
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from .config import METRICS_EXEMPLARS, REQUEST_ID_HEADER
+
+# Latency buckets in seconds, from sub-millisecond regex work to LLM calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_stage_collector: ContextVar[Optional[list]] = ContextVar("stage_collector", default=None)
+
+
+def get_request_id() -> Optional[str]:
+    """ID of the HTTP request being handled, or ``None`` outside a request."""
+    return _request_id.get()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    """Base class of a labelled metric family.
+
+    Attributes:
+        name (str): Metric name (without the ``_total`` suffix for counters).
+        documentation (str): ``# HELP`` text.
+        labelnames (tuple[str, ...]): Label names, in exposition order.
+    """
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self, openmetrics: bool) -> list[str]:
+        """Exposition lines for every label set."""
+
+    def family_name(self, openmetrics: bool) -> str:
+        """Name used in the ``# HELP``/``# TYPE`` lines."""
+        return self.name
+
+    def render(self, openmetrics: bool = False) -> str:
+        family = self.family_name(openmetrics)
+        lines = [
+            f"# HELP {family} {self.documentation}",
+            f"# TYPE {family} {self.type_name}",
+            *self.samples(openmetrics),
+        ]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonic counter, exposed as ``<name>_total``."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def family_name(self, openmetrics):
+        # OpenMetrics names the family without the suffix; the classic text
+        # format expects it to match the sample name
+        return self.name if openmetrics else f"{self.name}_total"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self, openmetrics):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram with optional per-bucket exemplars."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [bucket counts, sum, exemplar per bucket]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, exemplar: Optional[str] = None, **labels) -> None:
+        """Record ``value``; ``exemplar`` is a request ID kept for its bucket."""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, [None] * len(self.buckets)]
+            series[0][index] += 1
+            series[1] += value
+            if exemplar is not None:
+                series[2][index] = (exemplar, value, time.time())
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def samples(self, openmetrics):
+        lines = []
+        with self._lock:
+            series_items = sorted(
+                (key, (list(counts), total, list(exemplars)))
+                for key, (counts, total, exemplars) in self._series.items()
+            )
+        for key, (counts, total, exemplars) in series_items:
+            cumulative = 0
+            for bound, count, exemplar in zip(self.buckets, counts, exemplars):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                line = f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                if openmetrics and exemplar is not None:
+                    request_id, value, timestamp = exemplar
+                    line += f' # {{request_id="{_escape(request_id)}"}} {_format_value(value)} {timestamp:.3f}'
+                lines.append(line)
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "email_stage_duration_seconds",
+    "Time spent in each email processing stage.",
+    ("stage",),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route and status code.",
+    ("method", "route", "status"),
+)
+CACHE_LOOKUPS = Counter(
+    "email_cache_lookups",
+    "Response cache lookups by result (hit or miss).",
+    ("result",),
+)
+FALLBACKS = Counter(
+    "email_fallbacks",
+    "Emails answered with a fallback template, by reason.",
+    ("reason",),
+)
+EMAILS_CLASSIFIED = Counter(
+    "emails_classified",
+    "Classified emails by category, language and source (llm, llm_classifier, cache, near_duplicate, local).",
+    ("category", "language", "source"),
+)
+LLM_TOKENS = Counter(
+    "llm_tokens",
+    "LLM tokens used, by kind (prompt or completion) and stage (classify or reply).",
+    ("kind", "stage"),
+)
+
+LLM_RETRIES = Counter(
+    "llm_retries",
+    "LLM call retries, by reason (rate_limit or transient).",
+    ("reason",),
+)
+
+BATCH_ITEMS = Counter(
+    "llm_batch_items",
+    "Emails sent in multi-email LLM calls, by result (answered or retried on their own).",
+    ("result",),
+)
+
+NEAR_DUPLICATE_LOOKUPS = Counter(
+    "email_near_duplicate_lookups",
+    "Near-duplicate index lookups by result (hit or miss).",
+    ("result",),
+)
+
+LEMMA_MEMO_LOOKUPS = Counter(
+    "lemma_memo_lookups",
+    "Token lookups in the lemma memo (LEMMATIZER_MODE=memo), by language and result (hit or miss).",
+    ("language", "result"),
+)
+
+REGISTRY: list[Metric] = [
+    STAGE_SECONDS, HTTP_REQUEST_SECONDS, CACHE_LOOKUPS, FALLBACKS, EMAILS_CLASSIFIED, LLM_TOKENS,
+    LLM_RETRIES, BATCH_ITEMS, LEMMA_MEMO_LOOKUPS, NEAR_DUPLICATE_LOOKUPS,
+]
+
+_METRICS_BY_NAME = {metric.name: metric for metric in REGISTRY}
+
+
+def render_metrics(openmetrics: bool = False) -> str:
+    """Render every registered metric in the Prometheus or OpenMetrics text format."""
+    body = "\n".join(metric.render(openmetrics) for metric in REGISTRY) + "\n"
+    return body + "# EOF\n" if openmetrics else body
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Record the duration of one stage for the current request."""
+    STAGE_SECONDS.observe(seconds, exemplar=get_request_id() if METRICS_EXEMPLARS else None, stage=stage)
+    collector = _stage_collector.get()
+    if collector is not None:
+        collector.append((stage, seconds))
+
+
+def increment(counter: Counter, amount: float = 1, **labels) -> None:
+    """Increment ``counter``, also from preprocessing pool workers (see `collect_stage_timings`)."""
+    counter.inc(amount, **labels)
+    collector = _stage_collector.get()
+    if collector is not None:
+        collector.append((counter.name, amount, labels))
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time the enclosed block as ``stage`` (recorded even if it raises)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def collect_stage_timings() -> Iterator[list]:
+    """Gather the ``(stage, seconds)`` spans recorded inside the block.
+
+    Counter increments made with `increment` are gathered too, as
+    ``(counter_name, amount, labels)``.
+    """
+    collected = []
+    token = _stage_collector.set(collected)
+    try:
+        yield collected
+    finally:
+        _stage_collector.reset(token)
+
+
+def observe_stage_timings(timings: list[tuple]) -> None:
+    """Record spans and increments gathered in another process by `collect_stage_timings`."""
+    for event in timings:
+        if len(event) == 3:
+            name, amount, labels = event
+            increment(_METRICS_BY_NAME[name], amount, **labels)
+        else:
+            observe_stage(*event)
+
+
+class RequestContextMiddleware:
+    """ASGI middleware assigning request IDs and timing HTTP requests.
+
+    Written as plain ASGI (rather than ``BaseHTTPMiddleware``) so streaming
+    endpoints are passed through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.header = REQUEST_ID_HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = next(
+            (value.decode("latin-1") for name, value in scope["headers"] if name == self.header),
+            None,
+        ) or uuid.uuid4().hex
+        token = _request_id.set(request_id)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (self.header, request_id.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                exemplar=request_id if METRICS_EXEMPLARS else None,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
+            _request_id.reset(token)
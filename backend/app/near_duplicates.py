@@ -0,0 +1,213 @@
+"""Near-duplicate index of classified emails (SimHash with LSH bands).
+
+Bulk campaigns and copy-pasted complaints differ only in names, dates or
+invoice numbers, so the exact-match response cache (`app.cache`) misses
+them. `NearDuplicateIndex` keeps a 64-bit SimHash fingerprint of the
+lemmatized text of every email the LLM classified; a new email whose
+fingerprint is within ``NEAR_DUPLICATE_MAX_DISTANCE`` bits (Hamming
+distance) of one of them, in the same language, reuses its result:
+
+    - ``NEAR_DUPLICATE_REUSE=category``: the category, answered with its
+      template (like the local classifier);
+    - ``NEAR_DUPLICATE_REUSE=reply``: the whole reply of the matched email,
+      which may mention the other sender's name or numbers.
+
+Fingerprints are built from the unigrams and bigrams of the cleaned text,
+with every token containing a digit folded into ``#`` so dates, amounts and
+invoice numbers do not count. The fingerprint is split into
+``max_distance + 1`` bands: two fingerprints at most ``max_distance`` bits
+apart agree on at least one whole band, so only the entries sharing a band
+with the new email are compared. The index holds at most
+``NEAR_DUPLICATE_MAX_ENTRIES`` entries, evicted in LRU order.
+
+Usage (from the ``backend`` directory), to print the fingerprint distance
+of two cleaned texts:
+    python -m app.near_duplicates "pagar boleto fatura 123 vencer ontem" "pagar boleto fatura 456 vencer hoje"
+"""
+
+import hashlib
+import sys
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from functools import lru_cache
+from typing import Optional
+from .cache import CACHED_FIELDS
+from .config import NEAR_DUPLICATE_MAX_DISTANCE, NEAR_DUPLICATE_MAX_ENTRIES, NEAR_DUPLICATE_REUSE
+
+FINGERPRINT_BITS = 64
+
+# Texts with fewer tokens are left to the exact cache: a few words are not
+# enough for distances to mean anything
+MIN_TOKENS = 5
+
+NUMBER_TOKEN = "#"
+
+
+@lru_cache(maxsize=65536)
+def _feature_hash(feature: str) -> int:
+    """64-bit hash of a feature, stable across processes (unlike ``hash``)."""
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(cleaned_text: str) -> Optional[int]:
+    """64-bit SimHash of a cleaned email, or ``None`` if it is too short.
+
+    Args:
+        cleaned_text (str): Output of `clean_email_text`.
+    """
+    tokens = [
+        NUMBER_TOKEN if any(char.isdigit() for char in token) else token
+        for token in cleaned_text.lower().split()
+    ]
+    if len(tokens) < MIN_TOKENS:
+        return None
+    features = Counter(tokens)
+    features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+
+    weights = [0] * FINGERPRINT_BITS
+    for feature, count in features.items():
+        value = _feature_hash(feature)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += count if value >> bit & 1 else -count
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints."""
+    return (a ^ b).bit_count()
+
+
+class NearDuplicateIndex:
+    """Bounded LSH index from SimHash fingerprints to classification results.
+
+    Attributes:
+        max_distance (int): Largest Hamming distance accepted as a match.
+        max_entries (int): Entries kept before least-recently-used eviction.
+        hits (int): Lookups that found a near duplicate.
+        misses (int): Lookups that did not (texts too short included).
+    """
+
+    def __init__(self, max_distance: int, max_entries: int):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        bands = max_distance + 1
+        width, extra = divmod(FINGERPRINT_BITS, bands)
+        # (shift, mask) of every band; the first ``extra`` bands get one more bit
+        self._bands = []
+        shift = 0
+        for band in range(bands):
+            bits = width + (band < extra)
+            self._bands.append((shift, (1 << bits) - 1))
+            shift += bits
+        self._entries: OrderedDict[int, tuple[str, int, dict]] = OrderedDict()
+        self._buckets: dict[tuple, set[int]] = defaultdict(set)
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _keys(self, lang: str, value: int) -> list[tuple]:
+        return [(lang, band, value >> shift & mask) for band, (shift, mask) in enumerate(self._bands)]
+
+    def _nearest(self, lang: str, value: int) -> Optional[tuple[int, int]]:
+        """``(entry_id, distance)`` of the closest match, under the lock."""
+        best = None
+        candidates = set().union(*(self._buckets.get(key, ()) for key in self._keys(lang, value)))
+        for entry_id in candidates:
+            distance = hamming_distance(value, self._entries[entry_id][1])
+            if distance <= self.max_distance and (best is None or distance < best[1]):
+                best = (entry_id, distance)
+        return best
+
+    def get(self, cleaned_text: str, lang: str) -> Optional[tuple[dict, int]]:
+        """Find the result of a near duplicate of a cleaned email.
+
+        Returns:
+            Optional[tuple[dict, int]]: A copy of the stored result and the
+            fingerprint distance, or ``None`` if there is no match.
+        """
+        value = fingerprint(cleaned_text)
+        with self._lock:
+            match = self._nearest(lang, value) if value is not None else None
+            if match is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry_id, distance = match
+            self._entries.move_to_end(entry_id)
+            return dict(self._entries[entry_id][2]), distance
+
+    def add(self, cleaned_text: str, lang: str, result: dict) -> None:
+        """Index the result of a classified email (short texts are skipped)."""
+        value = fingerprint(cleaned_text)
+        if value is None:
+            return
+        stored = {field: result[field] for field in CACHED_FIELDS if field in result}
+        with self._lock:
+            match = self._nearest(lang, value)
+            if match is not None and match[1] == 0:
+                # Same fingerprint: keep the latest result only
+                self._entries[match[0]] = (lang, value, stored)
+                self._entries.move_to_end(match[0])
+                return
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (lang, value, stored)
+            for key in self._keys(lang, value):
+                self._buckets[key].add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._evict()
+
+    def _evict(self) -> None:
+        entry_id, (lang, value, _) = self._entries.popitem(last=False)
+        for key in self._keys(lang, value):
+            bucket = self._buckets[key]
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._buckets[key]
+
+    def clear(self) -> None:
+        """Remove every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> dict:
+        """Return counters and sizing information for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "reuse": NEAR_DUPLICATE_REUSE,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "max_distance": self.max_distance,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_near_duplicate_index() -> Optional[NearDuplicateIndex]:
+    """Return the process-wide near-duplicate index configured via environment.
+
+    Returns:
+        Optional[NearDuplicateIndex]: The index, or ``None`` when
+        ``NEAR_DUPLICATE_REUSE`` is ``none``.
+
+    Raises:
+        ValueError: If ``NEAR_DUPLICATE_REUSE`` names an unknown mode.
+    """
+    if NEAR_DUPLICATE_REUSE == "none":
+        return None
+    if NEAR_DUPLICATE_REUSE not in ("category", "reply"):
+        raise ValueError(f"Unknown NEAR_DUPLICATE_REUSE: {NEAR_DUPLICATE_REUSE}")
+    return NearDuplicateIndex(NEAR_DUPLICATE_MAX_DISTANCE, NEAR_DUPLICATE_MAX_ENTRIES)
+
+
+if __name__ == "__main__":
+    first, second = fingerprint(sys.argv[1]), fingerprint(sys.argv[2])
+    if first is None or second is None:
+        print(f"Texts need at least {MIN_TOKENS} tokens")
+    else:
+        print(f"{first:016x}\n{second:016x}\ndistance {hamming_distance(first, second)}")
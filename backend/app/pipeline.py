@@ -0,0 +1,473 @@
+"""Async orchestration of the email processing pipeline.
+
+Runs the NLP preprocessing (in the dedicated preprocessing pool) and the
+blocking LLM step (in the thread pool) for every email of a batch
+concurrently, bounded by a per-request concurrency cap,
+while keeping results in input order and isolating failures to the email
+that caused them.
+
+With ``LLM_BATCH_SIZE`` above 1, short emails of the same language are also
+packed into shared LLM calls (see `services.generate_batch_responses`).
+"""
+
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, List, Optional
+from pydantic import ValidationError
+from pydantic.alias_generators import to_camel
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from .config import (
+    BULK_CONCURRENCY,
+    BULK_MAX_LINE_BYTES,
+    EMAIL_CONCURRENCY,
+    EMAIL_DEADLINE,
+    LLM_BATCH_MAX_CHARS,
+    LLM_BATCH_SIZE,
+    REQUEST_DEADLINE,
+)
+from .exceptions import AppError
+from .schemas import Email, EmailResponse
+from .preprocessing import clean_email_text_async, clean_email_texts_async
+from .rate_limit import PRIORITY_BULK, PRIORITY_INTERACTIVE
+from .services import degraded_response, generate_batch_responses, generate_response, stream_response
+
+logger = logging.getLogger(__name__)
+
+
+def format_email(email_item: Email) -> str:
+    """Combine subject and body into the text format used by the pipeline.
+
+    Args:
+        email_item (Email): Email to format.
+
+    Returns:
+        str: Text formatted as "Subject: ...\\n\\nBody: ...".
+    """
+    return f"Subject: {email_item.subject}\n\nBody: {email_item.body}"
+
+
+def build_email_response(result_dict: dict, email_item: Email) -> EmailResponse:
+    """Convert a pipeline result dict into an `EmailResponse` model.
+
+    Args:
+        result_dict (dict): Output of `classify_and_respond`/`generate_response`.
+        email_item (Email): Original email, echoed back in the response.
+
+    Returns:
+        EmailResponse: API response model for the email.
+    """
+    return EmailResponse(
+        is_productive=result_dict.get("is_productive", True),
+        category=result_dict.get("category"),
+        suggested_subject=result_dict.get("suggested_subject", ""),
+        suggested_body=result_dict.get("suggested_body", ""),
+        detected_language=result_dict.get("detected_language"),
+        original_email=email_item,  # Pass Email object directly
+        degraded=result_dict.get("degraded", False),
+    )
+
+
+async def _process_single_email(
+    email_item: Email,
+    semaphore: asyncio.Semaphore,
+    preprocessed: Optional[tuple[str, str, str]] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+    request_deadline: Optional[float] = None,
+) -> tuple[dict, Optional[AppError]]:
+    """Run the full pipeline for one email without letting errors escape.
+
+    The LLM step gets ``EMAIL_DEADLINE`` seconds (less if the request
+    deadline comes first); past it, or past ``request_deadline`` while still
+    queued or preprocessing, the email is answered with a degraded template
+    so slow providers cannot stretch the response time.
+
+    Args:
+        email_item (Email): Email to process.
+        semaphore (asyncio.Semaphore): Concurrency cap shared by the batch.
+        preprocessed (Optional[tuple[str, str, str]]): ``(cleaned_text,
+            lang, new_content)`` from batch preprocessing; the email is
+            preprocessed on its own when omitted.
+        priority (int): Queue priority of the email's LLM call.
+        request_deadline (Optional[float]): ``time.monotonic`` time by which
+            the whole request must be answered.
+
+    Returns:
+        tuple[dict, Optional[AppError]]: The result dict and ``None`` on
+        success (possibly a degraded template), or a degraded template and
+        the error that caused it (unexpected exceptions wrapped in an
+        `AppError`).
+    """
+    full_email_text = format_email(email_item)
+    cleaned_text = lang = None
+
+    async def run() -> dict:
+        nonlocal cleaned_text, lang
+        async with semaphore:
+            item_preprocessed = preprocessed
+            if item_preprocessed is None:
+                item_preprocessed = await clean_email_text_async(full_email_text)
+            cleaned_text, lang, new_content = item_preprocessed
+
+            deadline = time.monotonic() + EMAIL_DEADLINE
+            if request_deadline is not None:
+                deadline = min(deadline, request_deadline)
+            try:
+                return await asyncio.wait_for(
+                    run_in_threadpool(
+                        generate_response, full_email_text, cleaned_text, lang, priority, deadline, new_content
+                    ),
+                    timeout=max(0.0, deadline - time.monotonic()),
+                )
+            except asyncio.TimeoutError:
+                # The provider call itself overran. It is bounded by the same
+                # deadline (see `rate_limit.call_timeout`), so the worker
+                # thread ends shortly and reports the outcome to the breaker
+                logger.warning(f"Email '{email_item.subject}' hit its LLM deadline. Using degraded template.")
+                return degraded_response(cleaned_text, lang, "deadline")
+
+    timeout = None if request_deadline is None else max(0.0, request_deadline - time.monotonic())
+    try:
+        return await asyncio.wait_for(run(), timeout), None
+    except asyncio.TimeoutError:
+        logger.warning(f"Email '{email_item.subject}' hit the request deadline. Using degraded template.")
+        return degraded_response(cleaned_text, lang, "request_deadline"), None
+    except AppError as e:
+        logger.warning(
+            f"Email '{email_item.subject}' failed ({e.__class__.__name__}): "
+            f"{e.message}. Using fallback template."
+        )
+        return degraded_response(cleaned_text, lang, e.__class__.__name__), e
+    except Exception as e:
+        # A bug must not take the rest of the batch down with this email
+        logger.exception(f"Email '{email_item.subject}' failed unexpectedly. Using fallback template.")
+        return degraded_response(cleaned_text, lang, "unexpected_error"), AppError(f"Unexpected error: {e}")
+
+
+async def _process_email_group(
+    group: List[tuple[Email, tuple[str, str, str]]],
+    semaphore: asyncio.Semaphore,
+    request_deadline: Optional[float] = None,
+) -> List[tuple[dict, Optional[AppError]]]:
+    """Answer preprocessed emails of one language with a single LLM call.
+
+    Emails the batch call did not answer validly are then processed on
+    their own by `_process_single_email`, so only they pay for a retry.
+
+    Args:
+        group (List[tuple[Email, tuple[str, str, str]]]): Emails with their
+            ``(cleaned_text, lang, new_content)``, all in the same language.
+        semaphore (asyncio.Semaphore): Concurrency cap shared by the batch;
+            the group call takes one slot.
+        request_deadline (Optional[float]): ``time.monotonic`` time by which
+            the whole request must be answered.
+
+    Returns:
+        List[tuple[dict, Optional[AppError]]]: Same as `_process_single_email`,
+        per email in group order.
+    """
+    texts = [format_email(email_item) for email_item, _ in group]
+    lang = group[0][1][1]
+
+    async def run() -> List[Optional[dict]]:
+        async with semaphore:
+            deadline = time.monotonic() + EMAIL_DEADLINE
+            if request_deadline is not None:
+                deadline = min(deadline, request_deadline)
+            try:
+                return await asyncio.wait_for(
+                    run_in_threadpool(
+                        generate_batch_responses,
+                        [
+                            (text, cleaned_text, new_content)
+                            for text, (_, (cleaned_text, _, new_content)) in zip(texts, group)
+                        ],
+                        lang,
+                        PRIORITY_INTERACTIVE,
+                        deadline,
+                    ),
+                    timeout=max(0.0, deadline - time.monotonic()),
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Batch of {len(group)} emails hit its LLM deadline. Using degraded templates.")
+                return [degraded_response(cleaned_text, lang, "deadline") for _, (cleaned_text, _, _) in group]
+
+    timeout = None if request_deadline is None else max(0.0, request_deadline - time.monotonic())
+    try:
+        results = await asyncio.wait_for(run(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Batch of {len(group)} emails hit the request deadline. Using degraded templates.")
+        return [
+            (degraded_response(cleaned_text, lang, "request_deadline"), None)
+            for _, (cleaned_text, _, _) in group
+        ]
+    except AppError as e:
+        logger.warning(
+            f"Batch of {len(group)} emails failed ({e.__class__.__name__}): "
+            f"{e.message}. Using fallback templates."
+        )
+        return [
+            (degraded_response(cleaned_text, lang, e.__class__.__name__), e)
+            for _, (cleaned_text, _, _) in group
+        ]
+    except Exception as e:
+        logger.exception(f"Batch of {len(group)} emails failed unexpectedly. Using fallback templates.")
+        error = AppError(f"Unexpected error: {e}")
+        return [
+            (degraded_response(cleaned_text, lang, "unexpected_error"), error)
+            for _, (cleaned_text, _, _) in group
+        ]
+
+    retries = [
+        _process_single_email(email_item, semaphore, preprocessed, request_deadline=request_deadline)
+        for (email_item, preprocessed), result in zip(group, results)
+        if result is None
+    ]
+    retried = iter(await asyncio.gather(*retries))
+    return [(result, None) if result is not None else next(retried) for result in results]
+
+
+def plan_llm_batches(
+    emails: List[Email], preprocessed: List[Optional[tuple[str, str, str]]], batch_size: int
+) -> List[List[int]]:
+    """Group email indexes into LLM calls.
+
+    Preprocessed emails up to ``LLM_BATCH_MAX_CHARS`` long are grouped by
+    language, in input order, into groups of at most ``batch_size``; every
+    other email is a group of its own.
+    """
+    groups: List[List[int]] = []
+    open_groups: dict[str, List[int]] = {}
+    for index, (email_item, item_preprocessed) in enumerate(zip(emails, preprocessed)):
+        if batch_size < 2 or item_preprocessed is None or len(format_email(email_item)) > LLM_BATCH_MAX_CHARS:
+            groups.append([index])
+            continue
+        lang = item_preprocessed[1]
+        group = open_groups.get(lang)
+        if group is None or len(group) >= batch_size:
+            group = open_groups[lang] = []
+            groups.append(group)
+        group.append(index)
+    return groups
+
+
+async def preprocess_batch(emails: List[Email]) -> List[Optional[tuple[str, str, str]]]:
+    """Preprocess a batch of emails with spaCy batching.
+
+    Args:
+        emails (List[Email]): Emails to preprocess.
+
+    Returns:
+        List[Optional[tuple[str, str, str]]]: ``(cleaned_text, lang,
+        new_content)`` per email in input order, or all ``None`` if batch preprocessing failed so each
+        email is retried (and its failure isolated) individually.
+    """
+    try:
+        return await clean_email_texts_async([format_email(e) for e in emails])
+    except AppError as e:
+        logger.warning(f"Batch preprocessing failed: {e.message}. Retrying per email.")
+        return [None] * len(emails)
+
+
+async def process_email_batch(
+    emails: List[Email], concurrency: Optional[int] = None
+) -> List[EmailResponse]:
+    """Process a batch of emails concurrently.
+
+    All emails are preprocessed together first (grouped by language and run
+    through ``nlp.pipe``); the LLM calls are then fanned out concurrently,
+    with short emails sharing calls when ``LLM_BATCH_SIZE`` is above 1 (see
+    `plan_llm_batches`). The whole batch is answered within
+    ``REQUEST_DEADLINE`` seconds.
+
+    Args:
+        emails (List[Email]): Emails to process.
+        concurrency (Optional[int]): Maximum number of emails in flight at
+            once. Defaults to the ``EMAIL_CONCURRENCY`` setting.
+
+    Returns:
+        List[EmailResponse]: One response per email, in input order. Emails
+            whose processing failed receive a template fallback response.
+
+    Raises:
+        AppError: If every email in the batch failed, the first error is
+            re-raised so a full provider outage still surfaces as an error.
+            Emails answered with degraded templates because of the deadlines
+            or the circuit breaker do not count as failures.
+    """
+    request_deadline = time.monotonic() + REQUEST_DEADLINE
+    try:
+        preprocessed = await asyncio.wait_for(preprocess_batch(emails), REQUEST_DEADLINE)
+    except asyncio.TimeoutError:
+        preprocessed = [None] * len(emails)
+
+    semaphore = asyncio.Semaphore(concurrency or EMAIL_CONCURRENCY)
+    groups = plan_llm_batches(emails, preprocessed, LLM_BATCH_SIZE)
+
+    async def run_group(group: List[int]) -> List[tuple[dict, Optional[AppError]]]:
+        if len(group) == 1:
+            index = group[0]
+            return [await _process_single_email(
+                emails[index], semaphore, preprocessed[index], request_deadline=request_deadline
+            )]
+        return await _process_email_group(
+            [(emails[index], preprocessed[index]) for index in group], semaphore, request_deadline
+        )
+
+    outcomes: List[Optional[tuple[dict, Optional[AppError]]]] = [None] * len(emails)
+    for group, group_outcomes in zip(groups, await asyncio.gather(*(run_group(g) for g in groups))):
+        for index, outcome in zip(group, group_outcomes):
+            outcomes[index] = outcome
+
+    errors = [error for _, error in outcomes if error is not None]
+    if errors and len(errors) == len(outcomes):
+        raise errors[0]
+
+    return [
+        build_email_response(result_dict, email_item)
+        for email_item, (result_dict, _) in zip(emails, outcomes)
+    ]
+
+
+async def iter_ndjson_lines(
+    chunks: AsyncIterator[bytes], max_line_bytes: int = BULK_MAX_LINE_BYTES
+) -> AsyncIterator[bytes]:
+    """Split a byte stream into non-empty newline-delimited lines.
+
+    Only the current partial line is buffered, so memory stays bounded by
+    ``max_line_bytes`` regardless of the stream length.
+
+    Args:
+        chunks (AsyncIterator[bytes]): Raw body chunks (e.g. ``request.stream()``).
+        max_line_bytes (int): Maximum accepted line length.
+
+    Yields:
+        bytes: One line without its trailing newline.
+
+    Raises:
+        ValueError: If a line exceeds ``max_line_bytes``.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if len(line) > max_line_bytes:
+                raise ValueError(f"Line exceeds {max_line_bytes} bytes")
+            if line.strip():
+                yield line
+        if len(buffer) > max_line_bytes:
+            raise ValueError(f"Line exceeds {max_line_bytes} bytes")
+    if buffer.strip():
+        yield buffer
+
+
+async def process_email_stream(
+    lines: AsyncIterator[bytes], concurrency: Optional[int] = None
+) -> AsyncIterator[dict]:
+    """Process a stream of NDJSON `Email` objects with bounded concurrency.
+
+    At most ``concurrency`` emails are in flight; the input is only read
+    further once one of them completes, so memory does not grow with the
+    stream length. Results are yielded as soon as they complete, tagged with
+    the zero-based ``index`` of the input line.
+
+    Args:
+        lines (AsyncIterator[bytes]): NDJSON lines, one `Email` per line.
+        concurrency (Optional[int]): Maximum emails in flight. Defaults to
+            the ``BULK_CONCURRENCY`` setting.
+
+    Yields:
+        dict: Either ``{"index": ..., **EmailResponse}`` (camelCase keys) or
+        ``{"index": ..., "error": ..., "code": ...}`` for lines that could not
+        be processed. A final record with ``"index": null`` reports a stream
+        that could not be read to the end.
+    """
+    limit = concurrency or BULK_CONCURRENCY
+    semaphore = asyncio.Semaphore(limit)
+    pending: set[asyncio.Task] = set()
+
+    async def run(index: int, email_item: Email) -> dict:
+        try:
+            # Bulk streams yield the LLM budget to interactive requests
+            result_dict, _ = await _process_single_email(email_item, semaphore, priority=PRIORITY_BULK)
+            response = build_email_response(result_dict, email_item)
+        except Exception as e:
+            logger.exception(f"Bulk email {index} failed unexpectedly")
+            return {"index": index, "error": str(e), "code": e.__class__.__name__}
+        return {"index": index, **response.model_dump(mode="json", by_alias=True)}
+
+    try:
+        index = 0
+        try:
+            async for line in lines:
+                try:
+                    email_item = Email.model_validate_json(line)
+                except ValidationError as e:
+                    yield {"index": index, "error": str(e), "code": "ValidationError"}
+                else:
+                    pending.add(asyncio.create_task(run(index, email_item)))
+                index += 1
+
+                if len(pending) >= limit:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        yield task.result()
+        except ValueError as e:
+            yield {"index": None, "error": str(e), "code": "InvalidStream"}
+
+        for task in asyncio.as_completed(pending):
+            yield await task
+    finally:
+        # Client went away or the stream broke: stop the remaining work
+        for task in pending:
+            task.cancel()
+
+
+async def open_email_event_stream(email_item: Email) -> AsyncIterator[tuple[str, dict]]:
+    """Preprocess one email and return the events of its streamed reply.
+
+    Preprocessing runs before returning, so its errors surface as a regular
+    error response; the LLM part runs in the thread pool as the events are
+    consumed (see `services.stream_response`).
+
+    Args:
+        email_item (Email): Email to process.
+
+    Returns:
+        AsyncIterator[tuple[str, dict]]: ``(event, data)`` pairs with
+        camelCase keys: ``category``, ``subject``, ``body`` (``delta``
+        pieces), an ``error`` if the LLM failed before replying or the
+        stream broke unexpectedly, and a final ``result`` with the complete
+        `EmailResponse` (a degraded template after an ``error``).
+
+    Raises:
+        AppError: If preprocessing fails.
+    """
+    full_email_text = format_email(email_item)
+    cleaned_text, lang, new_content = await clean_email_text_async(full_email_text)
+    deadline = time.monotonic() + EMAIL_DEADLINE
+
+    async def events() -> AsyncIterator[tuple[str, dict]]:
+        try:
+            async for event, data in iterate_in_threadpool(
+                stream_response(full_email_text, cleaned_text, lang, deadline, new_content)
+            ):
+                if event == "result":
+                    break
+                yield event, {to_camel(key): value for key, value in data.items()}
+        except AppError as e:
+            logger.warning(f"Email '{email_item.subject}' failed ({e.__class__.__name__}): {e.message}")
+            yield "error", {"error": e.message, "code": e.__class__.__name__}
+            data = degraded_response(cleaned_text, lang, e.__class__.__name__)
+        except Exception as e:
+            # The client still gets a final result, like the batch endpoints
+            logger.exception(f"Email '{email_item.subject}' failed unexpectedly. Using fallback template.")
+            yield "error", {"error": f"Unexpected error: {e}", "code": e.__class__.__name__}
+            data = degraded_response(cleaned_text, lang, "unexpected_error")
+        response = build_email_response(data, email_item)
+        yield "result", response.model_dump(mode="json", by_alias=True)
+
+    return events()
@@ -0,0 +1,229 @@
+"""CPU-bound preprocessing stage fed through an async interface.
+
+spaCy inference and language detection in `clean_email_text` are CPU-bound
+and hold the GIL, so running them on the event loop (or in its thread pool)
+stalls every other connection of the worker, including `/health`. This module
+runs them in a dedicated process pool whose workers keep their own loaded
+`get_spacy_model` instances, and exposes coroutines the API can await.
+"""
+
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from .config import (
+    NLP_BATCH_SIZE,
+    PREPROCESS_START_METHOD,
+    PREPROCESS_WORKERS,
+    WARMUP_TIMEOUT,
+)
+from .exceptions import AppError, NLPProcessingError
+from .metrics import collect_stage_timings, observe_stage_timings
+from .utils import clean_email_text, clean_email_texts, preload_nlp_models
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+# Guards creating and replacing `_executor` across threads and coroutines
+_executor_lock = threading.Lock()
+
+# Model load timings (or failure) of the current pool worker, recorded by
+# its initializer
+_worker_timings: dict[str, float] = {}
+_worker_error: Optional[str] = None
+
+# Barrier shared by the pool workers so warm-up calls land on distinct workers
+_warmup_barrier = None
+
+
+def _init_worker(warmup_barrier) -> None:
+    """Load every supported spaCy model once when a pool worker starts."""
+    global _worker_error, _warmup_barrier
+    _warmup_barrier = warmup_barrier
+    try:
+        _worker_timings.update(preload_nlp_models())
+    except AppError as e:
+        # Keep the worker alive; the error resurfaces on the first call
+        _worker_error = e.message
+        logging.getLogger(__name__).error(f"Worker warm-up failed: {e.message}")
+
+
+def _get_worker_timings() -> dict:
+    """Return the load timings recorded in the pool worker running this call.
+
+    Blocks until every pool worker runs this call, so one call per worker
+    reports each of them exactly once.
+
+    Raises:
+        NLPProcessingError: If the worker failed to load its models.
+    """
+    _warmup_barrier.wait(timeout=WARMUP_TIMEOUT)
+    if _worker_error is not None:
+        raise NLPProcessingError(_worker_error)
+    return {"pid": os.getpid(), **_worker_timings}
+
+
+def _clean_email_text_timed(text: str) -> tuple[tuple[str, str, str], list]:
+    """`clean_email_text` in a pool worker, returning its stage timings too."""
+    with collect_stage_timings() as timings:
+        return clean_email_text(text), timings
+
+
+def _clean_email_texts_timed(texts: list[str], batch_size: int) -> tuple[list, list]:
+    """`clean_email_texts` in a pool worker, returning its stage timings too."""
+    with collect_stage_timings() as timings:
+        return clean_email_texts(texts, batch_size, 1), timings
+
+
+def start_preprocessing_pool() -> Optional[ProcessPoolExecutor]:
+    """Create the preprocessing process pool if it is enabled and not running.
+
+    Worker processes load their models as soon as they start; call
+    `warm_up_preprocessing_pool` to start them eagerly. With
+    ``PREPROCESS_WORKERS=0`` no pool is created and preprocessing runs in
+    the event loop's thread pool instead.
+
+    Returns:
+        Optional[ProcessPoolExecutor]: The running pool, or ``None`` when
+        the pool is disabled.
+    """
+    global _executor
+    if PREPROCESS_WORKERS <= 0:
+        return None
+
+    with _executor_lock:
+        if _executor is None:
+            mp_context = multiprocessing.get_context(PREPROCESS_START_METHOD)
+            _executor = ProcessPoolExecutor(
+                max_workers=PREPROCESS_WORKERS,
+                mp_context=mp_context,
+                initializer=_init_worker,
+                initargs=(mp_context.Barrier(PREPROCESS_WORKERS),),
+            )
+            logger.info(f"Preprocessing pool started with {PREPROCESS_WORKERS} worker(s)")
+        return _executor
+
+
+def shutdown_preprocessing_pool() -> None:
+    """Stop the preprocessing pool, if one is running."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+async def _replace_broken_pool(executor: ProcessPoolExecutor) -> None:
+    """Drop ``executor`` after a worker died, so the next call starts a new pool.
+
+    Concurrent callers that saw the same broken pool only drop it once, and
+    never a pool another caller already started in its place. The old pool is
+    shut down off the event loop.
+    """
+    global _executor
+    logger.error("Preprocessing worker died. Restarting the pool.")
+    with _executor_lock:
+        if _executor is not executor:
+            return
+        _executor = None
+    await run_in_threadpool(executor.shutdown, wait=True, cancel_futures=True)
+
+
+async def warm_up_preprocessing_pool() -> list[dict]:
+    """Start every pool worker and wait until their models are loaded.
+
+    Returns:
+        list[dict]: Per-worker model load timings (see `preload_nlp_models`),
+        or an empty list when the pool is disabled.
+
+    Raises:
+        NLPProcessingError: If a worker failed to load its models.
+    """
+    if PREPROCESS_WORKERS <= 0:
+        return []
+
+    executor = start_preprocessing_pool()
+    loop = asyncio.get_running_loop()
+    # Submitting one call per worker before any completes makes the
+    # executor spawn all of them; each runs its initializer first and the
+    # barrier keeps a single worker from answering several calls
+    futures = [
+        loop.run_in_executor(executor, _get_worker_timings)
+        for _ in range(PREPROCESS_WORKERS)
+    ]
+    return list(await asyncio.gather(*futures))
+
+
+async def clean_email_text_async(text: str) -> tuple[str, str, str]:
+    """Run `clean_email_text` without blocking the event loop.
+
+    Args:
+        text (str): Raw email text to process.
+
+    Returns:
+        tuple[str, str, str]: ``(cleaned_text, detected_language,
+        new_content)``, as returned by `clean_email_text`.
+
+    Raises:
+        NLPProcessingError: If preprocessing fails or a pool worker dies.
+    """
+    if PREPROCESS_WORKERS <= 0:
+        return await run_in_threadpool(clean_email_text, text)
+
+    executor = start_preprocessing_pool()
+    loop = asyncio.get_running_loop()
+    try:
+        result, timings = await loop.run_in_executor(executor, _clean_email_text_timed, text)
+    except BrokenProcessPool:
+        # A worker crashed (e.g. OOM on a huge email); replace the pool so
+        # subsequent requests are not affected
+        await _replace_broken_pool(executor)
+        raise NLPProcessingError("Preprocessing worker terminated unexpectedly")
+
+    # Stage metrics recorded in the worker process are reported here
+    observe_stage_timings(timings)
+    return result
+
+
+async def clean_email_texts_async(texts: list[str]) -> list[tuple[str, str, str]]:
+    """Run `clean_email_texts` on a batch without blocking the event loop.
+
+    With the pool enabled the batch is split into one contiguous chunk per
+    worker, so spaCy batching and process parallelism are combined.
+
+    Args:
+        texts (list[str]): Raw email texts to process.
+
+    Returns:
+        list[tuple[str, str, str]]: ``(cleaned_text, detected_language,
+        new_content)`` triples in input order.
+
+    Raises:
+        NLPProcessingError: If preprocessing fails or a pool worker dies.
+    """
+    if PREPROCESS_WORKERS <= 0:
+        return await run_in_threadpool(clean_email_texts, texts)
+
+    executor = start_preprocessing_pool()
+    loop = asyncio.get_running_loop()
+    chunk_size = math.ceil(len(texts) / PREPROCESS_WORKERS) or 1
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    try:
+        # Pool workers already provide the parallelism; keep spaCy in-process
+        chunk_results = await asyncio.gather(*(
+            loop.run_in_executor(executor, _clean_email_texts_timed, chunk, NLP_BATCH_SIZE)
+            for chunk in chunks
+        ))
+    except BrokenProcessPool:
+        await _replace_broken_pool(executor)
+        raise NLPProcessingError("Preprocessing worker terminated unexpectedly")
+
+    for _, timings in chunk_results:
+        observe_stage_timings(timings)
+    return [result for chunk, _ in chunk_results for result in chunk]
@@ -0,0 +1,185 @@
+"""Precomputed LLM prompts for email classification.
+
+The system prompt only depends on the detected language, so one variant per
+language in `RESPONSE_TEMPLATES` is built once at import time instead of on
+every call. The layout keeps a byte-identical static prefix (role,
+categories, instructions, output format) shared by every variant and puts
+the language-specific few-shot examples last, so provider-side prompt
+caching can reuse the prefix across languages and requests.
+
+Batch variants (``<lang>-batch``) append instructions for answering several
+emails in one call to the same text, so they share its cached prefix too.
+
+The ``classifier`` variant is the short, language-independent prompt of the
+first stage of the model cascade (``LLM_CASCADE=1``): it only asks for the
+category, and the reply stage then gets that category in the user message.
+
+Bump `PROMPT_VERSION` whenever the wording changes; `PROMPT_FINGERPRINTS`
+identifies the exact text of each variant in logs.
+
+Usage (from the ``backend`` directory), to print token counts per variant:
+    python -m app.prompts
+"""
+
+import hashlib
+from typing import Optional
+from .templates import RESPONSE_TEMPLATES
+
+PROMPT_VERSION = "3"
+
+# Variant used for languages without templates (no few-shot examples)
+DEFAULT_VARIANT = "default"
+
+# Categories shown as few-shot examples (3 representative ones only)
+EXAMPLE_CATEGORIES = ["payment_issue", "technical_support", "greeting"]
+
+STATIC_PREFIX = (
+    "You are a Customer Support AI. Analyze emails and draft professional responses.\n\n"
+
+    "CATEGORIES:\n"
+    "payment_issue | technical_support | information_request | "
+    "greeting | complaint | spam\n\n"
+
+    "INSTRUCTIONS:\n"
+    "1. Identify category from list above\n"
+    "2. Personalize with the names and numbers in the email\n"
+    "3. Response as appropriate team (Financial/Technical/Customer Service)\n"
+    "4. Tone: Professional and empathetic (adjust by category)\n"
+    "5. Structure: 3 paragraphs, 100-250 words\n"
+    "6. is_productive=true for: payment_issue, technical_support, information_request, complaint\n\n"
+
+    "Return JSON: is_productive (bool), category (string), suggested_subject, suggested_body.\n"
+)
+
+
+def _build_examples(lang: str) -> str:
+    """Few-shot examples for one language (empty for unsupported languages)."""
+    templates = RESPONSE_TEMPLATES.get(lang, {})
+    examples = ""
+    for category_name in EXAMPLE_CATEGORIES:
+        if category_name in templates:
+            is_prod = category_name not in ["greeting", "spam"]
+            examples += f"{category_name}: {{\"is_productive\": {str(is_prod).lower()}, "
+            examples += f"\"category\": \"{category_name}\", "
+            examples += f"\"suggested_subject\": \"{templates[category_name]['subject']}\"}}\n"
+    return f"\nEXAMPLES:\n{examples}" if examples else ""
+
+
+# Appended to a language's prompt for the multi-email variant
+BATCH_INSTRUCTIONS = (
+    "\nBATCH MODE:\n"
+    "The message contains several emails, each under a \"### Email <index>\" header. "
+    "Answer each one independently following the rules above.\n"
+    "Return JSON: {\"replies\": [{\"index\": <index>, \"is_productive\": ..., \"category\": ..., "
+    "\"suggested_subject\": ..., \"suggested_body\": ...}]} with one reply per email.\n"
+)
+
+BATCH_VARIANT_SUFFIX = "-batch"
+
+SYSTEM_PROMPTS = {
+    lang: STATIC_PREFIX + _build_examples(lang)
+    for lang in [*RESPONSE_TEMPLATES, DEFAULT_VARIANT]
+}
+SYSTEM_PROMPTS.update({
+    variant + BATCH_VARIANT_SUFFIX: prompt + BATCH_INSTRUCTIONS
+    for variant, prompt in list(SYSTEM_PROMPTS.items())
+})
+
+# First stage of the cascade: category only, for a small model
+CLASSIFIER_VARIANT = "classifier"
+CLASSIFIER_PROMPT = (
+    "You are a Customer Support AI. Classify the email into exactly one category.\n\n"
+
+    "CATEGORIES:\n"
+    "payment_issue | technical_support | information_request | "
+    "greeting | complaint | spam\n\n"
+
+    "Return JSON: {\"category\": \"<category>\"}\n"
+)
+SYSTEM_PROMPTS[CLASSIFIER_VARIANT] = CLASSIFIER_PROMPT
+
+# First line of the reply stage's user message once the category is known
+CATEGORY_HINT = "Category: {category}\n"
+
+PROMPT_FINGERPRINTS = {
+    variant: f"v{PROMPT_VERSION}-{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]}"
+    for variant, prompt in SYSTEM_PROMPTS.items()
+}
+
+
+def get_prompt_variant(lang: str) -> str:
+    """Name of the system prompt variant used for ``lang``."""
+    return lang if lang in SYSTEM_PROMPTS else DEFAULT_VARIANT
+
+
+def get_system_prompt(lang: str) -> str:
+    """Return the precomputed system prompt for a detected language."""
+    return SYSTEM_PROMPTS[get_prompt_variant(lang)]
+
+
+def get_batch_system_prompt(lang: str) -> str:
+    """Return the precomputed multi-email system prompt for a detected language."""
+    return SYSTEM_PROMPTS[get_prompt_variant(lang) + BATCH_VARIANT_SUFFIX]
+
+
+def build_user_message(new_content: str, category: Optional[str] = None) -> str:
+    """Build the per-email user message sent after the system prompt.
+
+    Only the new content of the email is sent, as extracted by
+    `clean_email_text` (see `app.extraction`); the lemmatized text used for
+    caching and the local classifier is not, since it would repeat the same
+    words. ``category``, set by the first stage of the cascade, is stated
+    before the email so the model keeps it.
+    """
+    hint = CATEGORY_HINT.format(category=category) if category else ""
+    return f"{hint}Email:\n{new_content}"
+
+
+def build_batch_user_message(emails: list[str]) -> str:
+    """Build the user message of a batch call from the new content of each email.
+
+    Each email is introduced by a ``### Email <index>`` header, its position
+    in ``emails``, which the model echoes back in its reply.
+    """
+    return "\n\n".join(
+        f"### Email {index}\n{build_user_message(new_content)}"
+        for index, new_content in enumerate(emails)
+    )
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens of ``text``.
+
+    Uses ``tiktoken``'s ``cl100k_base`` encoding when installed (a close
+    proxy for Llama 3's BPE tokenizer); otherwise estimates ~4 characters per
+    token.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return max(1, round(len(text) / 4))
+    return len(tiktoken.get_encoding("cl100k_base").encode(text))
+
+
+def prompt_token_report() -> list[dict]:
+    """Size of every system prompt variant, for tracking input-token cost."""
+    prefix_tokens = count_tokens(STATIC_PREFIX)
+    return [
+        {
+            "variant": variant,
+            "fingerprint": PROMPT_FINGERPRINTS[variant],
+            "chars": len(prompt),
+            "tokens": count_tokens(prompt),
+            "static_prefix_tokens": prefix_tokens,
+        }
+        for variant, prompt in SYSTEM_PROMPTS.items()
+    ]
+
+
+if __name__ == "__main__":
+    print(f"{'variant':>13} {'fingerprint':>14} {'chars':>7} {'tokens':>7} {'prefix':>7}")
+    for row in prompt_token_report():
+        print(
+            f"{row['variant']:>13} {row['fingerprint']:>14} {row['chars']:>7} "
+            f"{row['tokens']:>7} {row['static_prefix_tokens']:>7}"
+        )
@@ -0,0 +1,318 @@
+"""Process-wide pacing and retries of LLM calls.
+
+Concurrent requests used to hit the provider independently and fail the
+whole request on the first 429. Every LLM call now goes through one
+`LLMScheduler`, which:
+
+    - paces calls with token buckets for requests and tokens per minute
+      (``LLM_RPM_LIMIT`` / ``LLM_TPM_LIMIT``);
+    - admits waiting callers in priority order (interactive requests before
+      bulk streams), FIFO within a priority;
+    - retries rate-limited and transient failures with jittered exponential
+      backoff, honouring ``retry-after`` when the provider sends it;
+    - on a 429, pauses every caller until the provider's window reopens and
+      halves the request rate, then recovers it gradually as calls succeed
+      (additive increase, multiplicative decrease).
+
+Under quota pressure requests therefore queue and slow down instead of
+failing.
+"""
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Optional, TypeVar
+from .config import (
+    LLM_BACKOFF_BASE,
+    LLM_BACKOFF_MAX,
+    LLM_MAX_RETRIES,
+    LLM_RPM_LIMIT,
+    LLM_TIMEOUT,
+    LLM_TPM_LIMIT,
+)
+from .llm import LLMCompletion, LLMProviderError, LLMStream
+from .metrics import LLM_RETRIES, observe_stage, timed
+
+logger = logging.getLogger(__name__)
+
+# Priorities of `LLMScheduler.run` callers (lower runs first)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+T = TypeVar("T", LLMCompletion, LLMStream)
+
+# Shortest timeout given to a call that starts right before its deadline
+MIN_CALL_TIMEOUT = 0.05
+
+# Floor and recovery step of the adaptive request rate (share of the limit)
+MIN_RATE_FACTOR = 0.1
+RATE_RECOVERY_STEP = 0.05
+
+
+class LLMDeadlineExceeded(Exception):
+    """The caller's deadline passed while queued or between retries."""
+
+
+class TokenBucket:
+    """Budget refilled continuously up to ``capacity``.
+
+    The level may go negative when a caller's actual usage exceeds what it
+    reserved, which delays the next callers accordingly.
+
+    Attributes:
+        capacity (float): Maximum budget (one minute worth of the limit).
+        rate (float): Budget refilled per second.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` (capped at the capacity) is available."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate) if self.rate > 0 else 0.0
+
+    def consume(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= amount
+
+
+class LLMScheduler:
+    """Priority queue, rate budget and retry policy shared by all LLM calls.
+
+    Args:
+        rpm (int): Requests per minute (0 = unlimited).
+        tpm (int): Tokens per minute (0 = unlimited).
+        max_retries (int): Retries of a retryable failure before giving up.
+        backoff_base (float): First backoff ceiling in seconds.
+        backoff_max (float): Maximum backoff in seconds.
+    """
+
+    def __init__(
+        self,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0,
+    ):
+        self.rpm = rpm
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.requests = TokenBucket(rpm, rpm / 60) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm, tpm / 60) if tpm > 0 else None
+        self.rate_factor = 1.0
+        self.paused_until = 0.0
+        self._queue: list[tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._random = random.Random()
+        self._counters = {"calls": 0, "retries": 0, "rate_limited": 0, "failures": 0}
+
+    def _budget_wait(self, tokens: int, now: float) -> float:
+        wait = self.paused_until - now
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens, now))
+        return wait
+
+    def _acquire(self, priority: int, sequence: int, tokens: int, deadline: Optional[float] = None) -> float:
+        """Block until this caller is first in line and the budget allows it.
+
+        Returns:
+            float: Seconds spent waiting.
+
+        Raises:
+            LLMDeadlineExceeded: If ``deadline`` (``time.monotonic``) passes first.
+        """
+        start = time.monotonic()
+        entry = (priority, sequence)
+        with self._condition:
+            heapq.heappush(self._queue, entry)
+            try:
+                while True:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise LLMDeadlineExceeded("Deadline passed while waiting for the LLM budget")
+                    timeout = None if deadline is None else deadline - time.monotonic()
+                    if self._queue[0] == entry:
+                        now = time.monotonic()
+                        wait = self._budget_wait(tokens, now)
+                        if wait <= 0:
+                            heapq.heappop(self._queue)
+                            if self.requests is not None:
+                                self.requests.consume(1, now)
+                            if self.tokens is not None:
+                                self.tokens.consume(tokens, now)
+                            self._condition.notify_all()
+                            return now - start
+                        self._condition.wait(wait if timeout is None else min(wait, timeout))
+                    else:
+                        self._condition.wait(timeout)
+            except BaseException:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    self._condition.notify_all()
+                raise
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt."""
+        return self._random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _on_rate_limited(self, delay: float) -> None:
+        with self._condition:
+            self._counters["rate_limited"] += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            if self.requests is not None:
+                self.rate_factor = max(MIN_RATE_FACTOR, self.rate_factor / 2)
+                self.requests.rate = self.rpm / 60 * self.rate_factor
+            self._condition.notify_all()
+
+    def record_usage(self, reserved_tokens: int, used_tokens: int) -> None:
+        """Charge the token budget the difference between reserved and actual usage.
+
+        Done by `run` for plain completions; callers of a streamed completion
+        report its usage once the stream is consumed.
+        """
+        if self.tokens is not None and used_tokens != reserved_tokens:
+            with self._condition:
+                self.tokens.consume(used_tokens - reserved_tokens, time.monotonic())
+
+    def _on_success(self) -> None:
+        with self._condition:
+            if self.requests is not None and self.rate_factor < 1.0:
+                self.rate_factor = min(1.0, self.rate_factor + RATE_RECOVERY_STEP)
+                self.requests.rate = self.rpm / 60 * self.rate_factor
+
+    def run(
+        self,
+        call: Callable[[], T],
+        estimated_tokens: int,
+        priority: int = PRIORITY_INTERACTIVE,
+        deadline: Optional[float] = None,
+        stage: str = "llm",
+    ) -> T:
+        """Run ``call`` once the budget allows it, retrying retryable failures.
+
+        Args:
+            call: Provider call to run (e.g. a bound `LLMProvider.complete`,
+                or `LLMProvider.stream`, which is retried only until the
+                stream is open).
+            estimated_tokens (int): Tokens reserved from the per-minute budget;
+                reconciled with the actual usage after a completion (streams
+                report it with `record_usage`).
+            priority (int): Queue priority, lower first.
+            deadline (Optional[float]): ``time.monotonic`` time after which
+                the caller stops waiting for budget or retries.
+            stage (str): Stage name the call is timed as.
+
+        Returns:
+            The result of the first successful attempt.
+
+        Raises:
+            LLMProviderError: When the failure is not retryable or retries
+                are exhausted.
+            LLMDeadlineExceeded: When ``deadline`` passes before a call could
+                run or be retried.
+        """
+        # Retries keep their original place in the queue
+        sequence = next(self._sequence)
+        attempt = 0
+        while True:
+            observe_stage("llm_queue", self._acquire(priority, sequence, estimated_tokens, deadline))
+            try:
+                with timed(stage):
+                    result = call()
+            except LLMProviderError as e:
+                if not e.retryable or attempt >= self.max_retries:
+                    with self._condition:
+                        self._counters["failures"] += 1
+                    raise
+                delay = self._backoff(attempt)
+                if e.retry_after is not None:
+                    # Spread callers released by the same retry-after
+                    delay = e.retry_after + self._random.uniform(0, self.backoff_base)
+                if e.rate_limited:
+                    # Everyone waits: the quota is shared by the whole process
+                    self._on_rate_limited(delay)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    with self._condition:
+                        self._counters["failures"] += 1
+                    raise LLMDeadlineExceeded("Deadline passes before the next retry") from e
+
+                LLM_RETRIES.inc(reason="rate_limit" if e.rate_limited else "transient")
+                with self._condition:
+                    self._counters["retries"] += 1
+                logger.warning(
+                    f"LLM call failed ({e.status_code or 'connection'}), "
+                    f"retry {attempt + 1}/{self.max_retries} in {delay:.2f}s"
+                )
+                if not e.rate_limited:
+                    time.sleep(delay)
+                attempt += 1
+                continue
+
+            with self._condition:
+                self._counters["calls"] += 1
+            self._on_success()
+            if isinstance(result, LLMCompletion):
+                self.record_usage(estimated_tokens, result.total_tokens)
+            return result
+
+    def stats(self) -> dict:
+        """Queue length, budget levels and retry counters for monitoring."""
+        with self._condition:
+            now = time.monotonic()
+            if self.tokens is not None:
+                self.tokens.wait_time(0, now)  # Refill before reporting the level
+            return {
+                **self._counters,
+                "waiting": len(self._queue),
+                "paused_for": round(max(0.0, self.paused_until - now), 3),
+                "rate_factor": round(self.rate_factor, 3),
+                "rpm_limit": self.rpm,
+                "tpm_limit": self.tokens.capacity if self.tokens is not None else 0,
+                "tokens_available": round(self.tokens.level, 1) if self.tokens is not None else None,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_llm_scheduler() -> LLMScheduler:
+    """Return the process-wide scheduler configured by the ``LLM_*`` settings."""
+    return LLMScheduler(
+        rpm=LLM_RPM_LIMIT,
+        tpm=LLM_TPM_LIMIT,
+        max_retries=LLM_MAX_RETRIES,
+        backoff_base=LLM_BACKOFF_BASE,
+        backoff_max=LLM_BACKOFF_MAX,
+    )
+
+
+def call_timeout(deadline: Optional[float]) -> float:
+    """Seconds an LLM call started now may take: ``LLM_TIMEOUT``, cut to what is left of ``deadline``.
+
+    Keeps a provider call from outliving the email it answers, so worker
+    threads are not held by calls nobody waits for anymore.
+    """
+    if deadline is None:
+        return LLM_TIMEOUT
+    return max(MIN_CALL_TIMEOUT, min(LLM_TIMEOUT, deadline - time.monotonic()))
+
+
+def estimate_tokens(system_prompt: str, user_message: str, max_tokens: int) -> int:
+    """Tokens to reserve for a call: prompt size (~4 chars/token) plus the output cap."""
+    return round((len(system_prompt) + len(user_message)) / 4) + max_tokens
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, ConfigDict, conlist
 from pydantic.alias_generators import to_camel
 from typing import Optional, List
+from .config import JOB_MAX_EMAILS
 
 class Email(BaseModel):
     """Represents an email with subject and body.
@@ -32,6 +33,11 @@ class EmailResponse(BaseModel):
     suggested_body: str
     detected_language: Optional[str] = None
     original_email: Email
+    degraded: bool = Field(
+        False,
+        description="True when the reply is a template served because the LLM "
+                    "missed its deadline or was unavailable.",
+    )
 
     # Pydantic configuration for naming conventions and documentation
     model_config = ConfigDict(
@@ -47,7 +53,40 @@ class EmailResponse(BaseModel):
                 "originalEmail": {
                     "subject": "Help with system",
                     "body": "I need assistance with the login process."
-                }
+                },
+                "degraded": False
             }
         }
-    )
\ No newline at end of file
+    )
+
+class JobRequest(BaseModel):
+    """Request model for a background processing job.
+
+    Accepts up to ``JOB_MAX_EMAILS`` emails (1000 by default).
+    """
+    emails: conlist(Email, min_length=1, max_length=JOB_MAX_EMAILS) = Field(
+        ...,
+        description=f"List of 1-{JOB_MAX_EMAILS} emails to process"
+    )
+
+class JobResult(EmailResponse):
+    """Result of one email of a job.
+
+    `index` is the email's position in the submitted list and `seq` the
+    order in which results completed (1-based), used to fetch only new ones.
+    """
+    index: int
+    seq: int
+
+class JobStatus(BaseModel):
+    """Progress of a background job, with the results completed so far."""
+    job_id: str
+    status: str = Field(..., description="queued, running or completed")
+    total: int
+    completed: int
+    failed: int = Field(..., description="Emails answered with a fallback template after an error")
+    created_at: float
+    updated_at: float
+    results: List[JobResult] = []
+
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
@@ -1,37 +1,91 @@
 """Business logic for email classification and response generation.
 
 This module orchestrates the NLP preprocessing pipeline and LLM interaction
-to analyze emails and generate suggested responses using the Groq API.
+to analyze emails and generate suggested responses using the configured LLM
+provider (Groq by default, see `app.llm`).
 """
 
-import os
 import json
 import logging
-from groq import Groq
+from typing import Iterator, List, Optional
 from dotenv import load_dotenv
 from .utils import clean_email_text
+from .extraction import extract_new_content
+from .cache import get_response_cache
+from .config import (
+    LLM_CASCADE,
+    LLM_CLASSIFIER_MAX_TOKENS,
+    LLM_CLASSIFIER_MODEL,
+    LLM_REPLY_MAX_TOKENS,
+    NEAR_DUPLICATE_REUSE,
+)
+from .llm import LLMProviderError, get_llm_classifier_provider, get_llm_provider
+from .local_classifier import get_local_classifier, log_llm_label
+from .near_duplicates import get_near_duplicate_index
+from .metrics import (
+    BATCH_ITEMS,
+    CACHE_LOOKUPS,
+    EMAILS_CLASSIFIED,
+    FALLBACKS,
+    LLM_TOKENS,
+    NEAR_DUPLICATE_LOOKUPS,
+    get_request_id,
+    timed,
+)
+from .rate_limit import (
+    PRIORITY_INTERACTIVE,
+    LLMDeadlineExceeded,
+    call_timeout,
+    estimate_tokens,
+    get_llm_scheduler,
+)
+from .degradation import BreakerTicket, get_circuit_breaker, heuristic_category
 from .exceptions import LLMServiceError
+from .streaming import JSONFieldStream
+from .prompts import (
+    BATCH_VARIANT_SUFFIX,
+    CLASSIFIER_PROMPT,
+    CLASSIFIER_VARIANT,
+    PROMPT_FINGERPRINTS,
+    build_batch_user_message,
+    build_user_message,
+    get_batch_system_prompt,
+    get_prompt_variant,
+    get_system_prompt,
+)
 from .templates import RESPONSE_TEMPLATES, CATEGORY_DESCRIPTIONS, get_all_categories
 
 load_dotenv()
 
-# Initialize the Groq client
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 logger = logging.getLogger(__name__)
 
+# Categories that need no action from the team
+NON_PRODUCTIVE_CATEGORIES = ("greeting", "spam")
+
+# Reply budget of a single-stage call, and of categories without an
+# LLM_REPLY_MAX_TOKENS entry
+DEFAULT_MAX_TOKENS = 600
+
 def classify_and_respond(email_content: str) -> dict:
     """Classify an email and generate a suggested response.
 
     Orchestrates the complete processing pipeline: NLP cleaning, language
-    detection, LLM classification via Groq API, response generation, and
+    detection, LLM classification, response generation, and
     validation with fallback to templates when needed.
 
     Token Optimization Strategy:
+        - System prompts are precomputed per language with a shared static
+          prefix, enabling provider-side prompt caching (see `app.prompts`)
+        - Sends only the new content of the email once: no quoted history,
+          signature or disclaimer, and no lemmatized copy (see `app.extraction`)
         - Sends only few-shot examples for detected language (not both PT/EN)
         - Uses simplified category descriptions (6 categories listed inline)
         - Includes only 3 representative examples instead of all 12
         - Condensed instructions reduce input tokens by ~60%
         - Expected token usage: ~400-700 tokens/request (input + output)
+        - With ``LLM_CASCADE=1`` a small model classifies first; greeting and
+          spam never reach the large model, and productive categories get
+          their own ``max_tokens`` budget
 
     Args:
         email_content (str): Raw email text (typically formatted as
@@ -47,100 +101,630 @@ def classify_and_respond(email_content: str) -> dict:
             - original_email (str): Original input email for reference.
 
     Raises:
-        LLMServiceError: If the Groq API service is unavailable or fails
+        LLMServiceError: If the LLM provider is unavailable or fails
             after retries.
 
     Notes:
         - Falls back to predefined templates if LLM response validation fails.
+        - Validated results are cached by cleaned content and language, so
+          repeated emails skip the LLM call.
+        - When a local classifier model is configured and confident, the
+          reply comes from the category template without calling the LLM.
         - Logs classification metrics (productivity, category, language, token usage).
     """
-    original_email = email_content
-        
     # Step 1: Pre-process text using our NLP pipeline
-    cleaned_text, lang = clean_email_text(email_content)
-
-    # Step 2: Optimized prompt with minimal examples (only detected language)
-    # Simplified category list
-    categories_info = (
-        "CATEGORIES:\n"
-        "payment_issue | technical_support | information_request | "
-        "greeting | complaint | spam"
-    )
-    
-    # Build few-shot examples ONLY for detected language (reduces tokens by ~50%)
-    examples_text = "\nEXAMPLES:\n"
-    if lang in RESPONSE_TEMPLATES:
-        # Select 3 representative categories only
-        key_categories = ["payment_issue", "technical_support", "greeting"]
-        for category_name in key_categories:
-            if category_name in RESPONSE_TEMPLATES[lang]:
-                template = RESPONSE_TEMPLATES[lang][category_name]
-                is_prod = category_name not in ["greeting", "spam"]
-                examples_text += f"{category_name}: {{\"is_productive\": {str(is_prod).lower()}, "
-                examples_text += f"\"category\": \"{category_name}\", "
-                examples_text += f"\"suggested_subject\": \"{template['subject']}\"}}\n"
-    
-    system_prompt = (
-    "You are a Customer Support AI. Analyze emails and draft professional responses.\n\n"
-    
-    f"{categories_info}\n\n"
-    
-    "INSTRUCTIONS:\n"
-    "1. Identify category from list above\n"
-    "2. Use CLEANED text for analysis, ORIGINAL for personalization (names, numbers)\n"
-    "3. Response as appropriate team (Financial/Technical/Customer Service)\n"
-    "4. Tone: Professional and empathetic (adjust by category)\n"
-    "5. Structure: 3 paragraphs, 100-250 words\n"
-    "6. is_productive=true for: payment_issue, technical_support, information_request, complaint\n\n"
-    
-    f"{examples_text}\n"
-    "Return JSON: is_productive (bool), category (string), suggested_subject, suggested_body."
-)
+    cleaned_text, lang, new_content = clean_email_text(email_content)
+
+    return generate_response(email_content, cleaned_text, lang, new_content=new_content)
+
+
+def generate_response(
+    email_content: str,
+    cleaned_text: str,
+    lang: str,
+    priority: int = PRIORITY_INTERACTIVE,
+    deadline: Optional[float] = None,
+    new_content: Optional[str] = None,
+) -> dict:
+    """Classify an already preprocessed email and generate a suggested response.
+
+    This is the LLM half of `classify_and_respond`, split out so callers that
+    run the NLP preprocessing elsewhere (e.g. concurrently for a whole batch)
+    can reuse it.
+
+    Args:
+        email_content (str): Raw email text, used for personalization.
+        cleaned_text (str): Output of `clean_email_text` for the same email.
+        lang (str): Language detected by `clean_email_text`.
+        priority (int): Queue priority of the LLM call in the process-wide
+            scheduler (see `app.rate_limit`); lower runs first.
+        deadline (Optional[float]): ``time.monotonic`` time after which the
+            email stops waiting for the LLM and gets a degraded template.
+        new_content (Optional[str]): New content of the email as returned
+            by `clean_email_text`, the LLM's input; extracted again from
+            ``email_content`` when not given.
+
+    Returns:
+        dict: Same structure as `classify_and_respond`, plus ``degraded=True``
+        when a template was served because the LLM was skipped (circuit
+        breaker open, deadline passed).
+
+    Raises:
+        LLMServiceError: If the LLM provider is unavailable or fails after
+            the scheduler's retries.
+    """
+    original_email = email_content
+
+    known = _known_response(cleaned_text, lang)
+    if known is not None:
+        known["original_email"] = original_email
+        return known
+
+    # Step 2: Precomputed prompt with few-shot examples for the detected language only
+    system_prompt = get_system_prompt(lang)
+    prompt_fingerprint = PROMPT_FINGERPRINTS[get_prompt_variant(lang)]
+
+    provider = get_llm_provider()
+
+    # Answer from the templates while the provider is known to be failing
+    breaker = get_circuit_breaker()
+    ticket = breaker.allow()
+    if ticket is None:
+        logger.warning(f"Circuit breaker open - serving template (Lang: {lang})")
+        degraded = degraded_response(cleaned_text, lang, "circuit_open")
+        degraded["original_email"] = original_email
+        return degraded
+
+    if new_content is None:
+        new_content = extract_new_content(email_content)
 
     try:
-        # Step 3: Call Groq Cloud API with optimized parameters
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Original email:\n{email_content}\n\nCleaned text for analysis:\n{cleaned_text}"}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.3,  # Balance between creativity and consistency
-            max_tokens=600    # Optimized limit (reduced from 800)
-        )
+        # Cascade: the small model decides whether the large one is needed
+        category = _classify_with_llm(new_content, lang, priority, deadline) if LLM_CASCADE else None
+        if category in NON_PRODUCTIVE_CATEGORIES:
+            breaker.record_success(ticket)
+            result = _answer_from_classification(cleaned_text, lang, category)
+            result["original_email"] = original_email
+            return result
 
-        ai_data = json.loads(completion.choices[0].message.content)
+        user_message = build_user_message(new_content, category)
+        max_tokens = _reply_max_tokens(category)
 
-        # Validate response quality; if invalid, use fallback template
-        if not _validate_response(ai_data):
-            logger.warning("Validation failed. Using fallback template.")
-            category = ai_data.get("category", "technical_support" if ai_data.get("is_productive", True) else "greeting")
-            ai_data = _get_fallback_response(lang, category)
+        # Step 3: Call the LLM provider through the rate-limiting scheduler
+        completion = get_llm_scheduler().run(
+            lambda: provider.complete(
+                system_prompt,
+                user_message,
+                max_tokens=max_tokens,
+                temperature=0.3,  # Balance between creativity and consistency
+                timeout=call_timeout(deadline),
+            ),
+            estimate_tokens(system_prompt, user_message, max_tokens),
+            priority,
+            deadline,
+        )
+        breaker.record_success(ticket)
+        LLM_TOKENS.inc(completion.prompt_tokens, kind="prompt", stage="reply")
+        LLM_TOKENS.inc(completion.completion_tokens, kind="completion", stage="reply")
+
+        with timed("parse"):
+            ai_data = json.loads(completion.content)
+        ai_data = _accept_llm_response(ai_data, cleaned_text, lang)
 
         # Add metadata
         ai_data["detected_language"] = lang
         ai_data["original_email"] = original_email
+        EMAILS_CLASSIFIED.inc(category=ai_data.get("category"), language=lang, source="llm")
 
         # Log for monitoring and improvements
         logger.info(
             f"Classification complete - Productive: {ai_data.get('is_productive')}, "
             f"Category: {ai_data.get('category', 'N/A')}, "
             f"Lang: {lang}, "
-            f"Tokens: {completion.usage.total_tokens if hasattr(completion, 'usage') else 'N/A'}"
+            f"Provider: {provider.name}, "
+            f"Model: {completion.model}, "
+            f"Prompt: {prompt_fingerprint}, "
+            f"Prompt tokens: {completion.prompt_tokens}, "
+            f"Tokens: {completion.total_tokens}, "
+            f"Request: {get_request_id() or 'N/A'}"
         )
 
         return ai_data
 
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error: {e}")
-        fallback = _get_fallback_response(lang, "technical_support")
+        FALLBACKS.inc(reason="json_decode")
+        with timed("fallback"):
+            fallback = _get_fallback_response(lang, "technical_support")
         fallback["original_email"] = original_email
         return fallback
 
+    except LLMDeadlineExceeded as e:
+        # Only a failing provider counts against the breaker, not our own queue
+        if e.__cause__ is not None:
+            breaker.record_failure(ticket)
+        logger.warning(f"LLM deadline exceeded - serving template: {e}")
+        degraded = degraded_response(cleaned_text, lang, "deadline")
+        degraded["original_email"] = original_email
+        return degraded
+
+    except Exception as e:
+        breaker.record_failure(ticket)
+        logger.error(f"LLM service failure ({provider.name}): {e}")
+        raise LLMServiceError(f"The AI service is currently unavailable via {provider.name}.")
+
+    finally:
+        # A half-open trial that ended without a verdict must not block the next one
+        breaker.release_trial(ticket)
+
+
+def generate_batch_responses(
+    emails: List[tuple[str, str, str]],
+    lang: str,
+    priority: int = PRIORITY_INTERACTIVE,
+    deadline: Optional[float] = None,
+) -> List[Optional[dict]]:
+    """Classify several preprocessed emails of one language in a single LLM call.
+
+    The emails share one system prompt (the ``-batch`` variant, see
+    `app.prompts`) and the model answers ``{"replies": [...]}`` with one
+    reply per email, keyed by its position in ``emails``. Every reply is
+    validated on its own; emails whose reply is missing or invalid come back
+    as ``None`` so the caller can retry just those with `generate_response`.
+    Emails answered from the cache, a near duplicate or the local classifier
+    are left out of the call. Batch calls are single-stage: ``LLM_CASCADE``
+    applies to the emails retried on their own only.
+
+    Args:
+        emails (List[tuple[str, str, str]]): ``(email_content, cleaned_text,
+            new_content)`` triples (see `generate_response`), all detected as
+            ``lang``.
+        lang (str): Language shared by the emails.
+        priority (int): Queue priority of the LLM call.
+        deadline (Optional[float]): ``time.monotonic`` time after which the
+            emails stop waiting for the LLM and get degraded templates.
+
+    Returns:
+        List[Optional[dict]]: Per email, in input order, the same structure
+        as `generate_response`, or ``None`` when it needs its own call.
+
+    Raises:
+        LLMServiceError: If the LLM provider is unavailable or fails after
+            the scheduler's retries.
+    """
+    results: List[Optional[dict]] = [_known_response(cleaned_text, lang) for _, cleaned_text, _ in emails]
+    pending = [index for index, result in enumerate(results) if result is None]
+
+    breaker = get_circuit_breaker()
+    ticket = breaker.allow() if len(pending) > 1 else None
+    if len(pending) > 1 and ticket is None:
+        logger.warning(f"Circuit breaker open - serving templates (Lang: {lang})")
+        for index in pending:
+            results[index] = degraded_response(emails[index][1], lang, "circuit_open")
+        pending = []
+
+    if len(pending) > 1:
+        # The call may be the breaker's half-open trial
+        try:
+            system_prompt = get_batch_system_prompt(lang)
+            user_message = build_batch_user_message([emails[index][2] for index in pending])
+            max_tokens = DEFAULT_MAX_TOKENS * len(pending)
+            provider = get_llm_provider()
+            try:
+                completion = get_llm_scheduler().run(
+                    lambda: provider.complete(
+                        system_prompt, user_message, max_tokens=max_tokens, temperature=0.3,
+                        timeout=call_timeout(deadline),
+                    ),
+                    estimate_tokens(system_prompt, user_message, max_tokens),
+                    priority,
+                    deadline,
+                    stage="llm_batch",
+                )
+            except LLMDeadlineExceeded as e:
+                if e.__cause__ is not None:
+                    breaker.record_failure(ticket)
+                logger.warning(f"LLM deadline exceeded - serving templates: {e}")
+                for index in pending:
+                    results[index] = degraded_response(emails[index][1], lang, "deadline")
+                pending = []
+            except Exception as e:
+                breaker.record_failure(ticket)
+                logger.error(f"LLM service failure ({provider.name}): {e}")
+                raise LLMServiceError(f"The AI service is currently unavailable via {provider.name}.")
+            else:
+                breaker.record_success(ticket)
+                LLM_TOKENS.inc(completion.prompt_tokens, kind="prompt", stage="reply")
+                LLM_TOKENS.inc(completion.completion_tokens, kind="completion", stage="reply")
+                replies = _parse_batch_replies(completion.content, len(pending))
+
+                answered = 0
+                for position, index in enumerate(pending):
+                    reply = replies.get(position)
+                    with timed("validate"):
+                        valid = reply is not None and _validate_response(reply)
+                    if not valid:
+                        continue
+                    cleaned_text = emails[index][1]
+                    log_llm_label(cleaned_text, lang, reply["category"])
+                    _remember_response(cleaned_text, lang, reply)
+                    reply["detected_language"] = lang
+                    EMAILS_CLASSIFIED.inc(category=reply["category"], language=lang, source="llm")
+                    results[index] = reply
+                    answered += 1
+
+                BATCH_ITEMS.inc(answered, result="answered")
+                BATCH_ITEMS.inc(len(pending) - answered, result="retried")
+                logger.info(
+                    f"Batch classification complete - Answered: {answered}/{len(pending)}, "
+                    f"Lang: {lang}, "
+                    f"Provider: {provider.name}, "
+                    f"Prompt: {PROMPT_FINGERPRINTS[get_prompt_variant(lang) + BATCH_VARIANT_SUFFIX]}, "
+                    f"Prompt tokens: {completion.prompt_tokens}, "
+                    f"Tokens: {completion.total_tokens}, "
+                    f"Request: {get_request_id() or 'N/A'}"
+                )
+        finally:
+            breaker.release_trial(ticket)
+
+    for (email_content, _, _), result in zip(emails, results):
+        if result is not None:
+            result["original_email"] = email_content
+    return results
+
+
+def _parse_batch_replies(content: str, count: int) -> dict[int, dict]:
+    """Replies of a batch completion by email index, skipping malformed entries."""
+    try:
+        with timed("parse"):
+            data = json.loads(content)
+    except json.JSONDecodeError as e:
+        logger.error(f"Batch JSON decode error: {e}")
+        return {}
+    replies = data.get("replies") if isinstance(data, dict) else data
+    if not isinstance(replies, list):
+        return {}
+    by_index = {}
+    for reply in replies:
+        if not isinstance(reply, dict):
+            continue
+        index = reply.pop("index", None)
+        if isinstance(index, int) and 0 <= index < count and index not in by_index:
+            by_index[index] = reply
+    return by_index
+
+
+def _known_response(cleaned_text: str, lang: str) -> Optional[dict]:
+    """Answer without the LLM from the cache, a near duplicate or a confident local classifier.
+
+    Returns:
+        Optional[dict]: The result (without ``original_email``), or ``None``
+        when the LLM is needed.
+    """
+    # Skip the LLM entirely for content we have already classified
+    cache = get_response_cache()
+    if cache is not None:
+        with timed("cache"):
+            cached = cache.get(cleaned_text, lang)
+        CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+        if cached is not None:
+            logger.info(f"Cache hit - Category: {cached.get('category', 'N/A')}, Lang: {lang}")
+            EMAILS_CLASSIFIED.inc(category=cached.get("category"), language=lang, source="cache")
+            cached["detected_language"] = lang
+            return cached
+
+    # Reuse the result of an almost identical email (same campaign or template)
+    index = get_near_duplicate_index()
+    if index is not None:
+        with timed("near_duplicate"):
+            match = index.get(cleaned_text, lang)
+        NEAR_DUPLICATE_LOOKUPS.inc(result="miss" if match is None else "hit")
+        if match is not None:
+            similar, distance = match
+            category = similar.get("category")
+            logger.info(f"Near-duplicate hit - Category: {category}, Distance: {distance}, Lang: {lang}")
+            EMAILS_CLASSIFIED.inc(category=category, language=lang, source="near_duplicate")
+            if NEAR_DUPLICATE_REUSE == "reply":
+                similar["detected_language"] = lang
+                return similar
+            return _get_fallback_response(lang, category)
+
+    # Decide obvious categories on-box and answer straight from the templates
+    classifier = get_local_classifier()
+    if classifier is not None:
+        with timed("local_classifier"):
+            category = classifier.classify(cleaned_text, lang)
+        if category is not None:
+            logger.info(f"Local classifier hit - Category: {category}, Lang: {lang}")
+            EMAILS_CLASSIFIED.inc(category=category, language=lang, source="local")
+            return _get_fallback_response(lang, category)
+
+    return None
+
+
+def _classify_with_llm(
+    new_content: str, lang: str, priority: int, deadline: Optional[float]
+) -> Optional[str]:
+    """First stage of the cascade: the category according to ``LLM_CLASSIFIER_MODEL``.
+
+    ``new_content`` is the extracted email, as given to `generate_response`.
+
+    Returns:
+        Optional[str]: The category, or ``None`` when the model did not name
+        a known one (the large model then classifies the email as well).
+
+    Raises:
+        LLMProviderError: If the call fails after the scheduler's retries.
+        LLMDeadlineExceeded: If ``deadline`` passes first.
+    """
+    provider = get_llm_classifier_provider()
+    user_message = build_user_message(new_content)
+    completion = get_llm_scheduler().run(
+        lambda: provider.complete(
+            CLASSIFIER_PROMPT, user_message, max_tokens=LLM_CLASSIFIER_MAX_TOKENS, temperature=0.0,
+            timeout=call_timeout(deadline),
+        ),
+        estimate_tokens(CLASSIFIER_PROMPT, user_message, LLM_CLASSIFIER_MAX_TOKENS),
+        priority,
+        deadline,
+        stage="llm_classify",
+    )
+    LLM_TOKENS.inc(completion.prompt_tokens, kind="prompt", stage="classify")
+    LLM_TOKENS.inc(completion.completion_tokens, kind="completion", stage="classify")
+
+    try:
+        with timed("parse"):
+            category = json.loads(completion.content).get("category")
+    except (json.JSONDecodeError, AttributeError):
+        category = None
+    if category not in get_all_categories():
+        logger.warning(
+            f"Classifier stage ({LLM_CLASSIFIER_MODEL}) named no known category: {completion.content[:100]!r}"
+        )
+        return None
+    logger.info(
+        f"Classifier stage - Category: {category}, Lang: {lang}, "
+        f"Model: {completion.model}, "
+        f"Prompt: {PROMPT_FINGERPRINTS[CLASSIFIER_VARIANT]}, "
+        f"Tokens: {completion.total_tokens}, "
+        f"Request: {get_request_id() or 'N/A'}"
+    )
+    return category
+
+
+def _answer_from_classification(cleaned_text: str, lang: str, category: str) -> dict:
+    """Template reply for a non-productive email classified by the cascade's first stage.
+
+    The category is logged as a training label and the reply remembered
+    like an LLM reply, so repeats skip the classifier call too.
+    """
+    log_llm_label(cleaned_text, lang, category)
+    result = _get_fallback_response(lang, category)
+    _remember_response(cleaned_text, lang, result)
+    EMAILS_CLASSIFIED.inc(category=category, language=lang, source="llm_classifier")
+    return result
+
+
+def _reply_max_tokens(category: Optional[str]) -> int:
+    """``max_tokens`` of the reply stage for a category chosen by the classifier."""
+    return LLM_REPLY_MAX_TOKENS.get(category, DEFAULT_MAX_TOKENS)
+
+
+def _accept_llm_response(ai_data: dict, cleaned_text: str, lang: str) -> dict:
+    """Validate a parsed LLM reply, swapping in a template if it fails.
+
+    Valid replies are logged as training labels and cached.
+    """
+    # Validate response quality; if invalid, use fallback template
+    with timed("validate"):
+        valid = _validate_response(ai_data)
+    if not valid:
+        logger.warning("Validation failed. Using fallback template.")
+        FALLBACKS.inc(reason="validation")
+        with timed("fallback"):
+            category = ai_data.get("category", "technical_support" if ai_data.get("is_productive", True) else "greeting")
+            return _get_fallback_response(lang, category)
+
+    log_llm_label(cleaned_text, lang, ai_data["category"])
+    _remember_response(cleaned_text, lang, ai_data)
+    return ai_data
+
+
+def _remember_response(cleaned_text: str, lang: str, ai_data: dict) -> None:
+    """Store a validated LLM reply in the response cache and near-duplicate index."""
+    cache = get_response_cache()
+    if cache is not None:
+        cache.set(cleaned_text, lang, ai_data)
+    index = get_near_duplicate_index()
+    if index is not None:
+        index.add(cleaned_text, lang, ai_data)
+
+
+def stream_response(
+    email_content: str,
+    cleaned_text: str,
+    lang: str,
+    deadline: Optional[float] = None,
+    new_content: Optional[str] = None,
+) -> Iterator[tuple[str, dict]]:
+    """Streaming variant of `generate_response`.
+
+    The LLM reply is parsed while it is generated (see `app.streaming`), so
+    the category reaches the client as soon as the model has written it and
+    the body follows token by token. The complete reply is still validated
+    at the end; when it fails validation the final result carries a
+    template instead.
+
+    Args:
+        email_content (str): Raw email text, used for personalization.
+        cleaned_text (str): Output of `clean_email_text` for the same email.
+        lang (str): Language detected by `clean_email_text`.
+        deadline (Optional[float]): ``time.monotonic`` time after which the
+            email stops waiting for the first token and gets a degraded
+            template.
+        new_content (Optional[str]): New content of the email as returned
+            by `clean_email_text`, the LLM's input; extracted again from
+            ``email_content`` when not given.
+
+    Yields:
+        tuple[str, dict]: ``(event, data)`` pairs, in order:
+            - ``("category", {"category", "is_productive"})``
+            - ``("subject", {"suggested_subject"})``
+            - ``("body", {"delta"})``, one or more pieces of the body
+            - ``("result", dict)``: the final result, same structure as
+              `generate_response`; its ``suggested_body`` replaces the
+              streamed one.
+        Answers that do not need the LLM (cache, near duplicate, local
+        classifier, degraded templates) or only its classifier stage
+        (``LLM_CASCADE``) go through the same events at once.
+
+    Raises:
+        LLMServiceError: If the LLM provider fails before the reply starts.
+    """
+    original_email = email_content
+
+    result = _known_response(cleaned_text, lang)
+    breaker = get_circuit_breaker()
+    ticket = breaker.allow() if result is None else None
+    if result is None and ticket is None:
+        logger.warning(f"Circuit breaker open - serving template (Lang: {lang})")
+        result = degraded_response(cleaned_text, lang, "circuit_open")
+    if result is not None:
+        result["original_email"] = original_email
+        yield from _replay_response(result)
+        return
+
+    if new_content is None:
+        new_content = extract_new_content(email_content)
+    try:
+        yield from _stream_llm_response(email_content, cleaned_text, lang, deadline, new_content, ticket)
+    finally:
+        # The half-open trial also ends when the client goes away mid-stream
+        breaker.release_trial(ticket)
+
+
+def _stream_llm_response(
+    email_content: str,
+    cleaned_text: str,
+    lang: str,
+    deadline: Optional[float],
+    new_content: str,
+    ticket: BreakerTicket,
+) -> Iterator[tuple[str, dict]]:
+    """The LLM part of `stream_response`, once the circuit breaker let the email through with ``ticket``."""
+    original_email = email_content
+    breaker = get_circuit_breaker()
+    system_prompt = get_system_prompt(lang)
+    scheduler = get_llm_scheduler()
+    provider = get_llm_provider()
+    try:
+        category = _classify_with_llm(new_content, lang, PRIORITY_INTERACTIVE, deadline) if LLM_CASCADE else None
+        if category in NON_PRODUCTIVE_CATEGORIES:
+            breaker.record_success(ticket)
+            result = _answer_from_classification(cleaned_text, lang, category)
+            result["original_email"] = original_email
+            yield from _replay_response(result)
+            return
+        user_message = build_user_message(new_content, category)
+        max_tokens = _reply_max_tokens(category)
+        estimated_tokens = estimate_tokens(system_prompt, user_message, max_tokens)
+        stream = scheduler.run(
+            lambda: provider.stream(
+                system_prompt, user_message, max_tokens=max_tokens, temperature=0.3,
+                timeout=call_timeout(deadline),
+            ),
+            estimated_tokens,
+            PRIORITY_INTERACTIVE,
+            deadline,
+            stage="llm_first_token",
+        )
+    except LLMDeadlineExceeded as e:
+        if e.__cause__ is not None:
+            breaker.record_failure(ticket)
+        logger.warning(f"LLM deadline exceeded - serving template: {e}")
+        result = degraded_response(cleaned_text, lang, "deadline")
+        result["original_email"] = original_email
+        yield from _replay_response(result)
+        return
     except Exception as e:
-        logger.error(f"Groq service failure: {e}")
-        raise LLMServiceError("The AI service is currently unavailable via Groq.")
+        breaker.record_failure(ticket)
+        logger.error(f"LLM service failure ({provider.name}): {e}")
+        raise LLMServiceError(f"The AI service is currently unavailable via {provider.name}.")
+
+    parser = JSONFieldStream(["suggested_body"])
+    try:
+        with timed("llm_stream"):
+            for delta in stream:
+                for kind, key, value in parser.feed(delta):
+                    if kind == "delta":
+                        yield "body", {"delta": value}
+                    elif key == "category":
+                        yield "category", {"category": value, "is_productive": value not in NON_PRODUCTIVE_CATEGORIES}
+                    elif key == "suggested_subject":
+                        yield "subject", {"suggested_subject": value}
+    except LLMProviderError as e:
+        breaker.record_failure(ticket)
+        logger.warning(f"LLM stream interrupted ({provider.name}) - serving template: {e}")
+        result = degraded_response(cleaned_text, lang, "stream_error")
+        result["original_email"] = original_email
+        yield "result", result
+        return
+    finally:
+        stream.close()
+
+    breaker.record_success(ticket)
+    completion = stream.completion
+    scheduler.record_usage(estimated_tokens, completion.total_tokens)
+    LLM_TOKENS.inc(completion.prompt_tokens, kind="prompt", stage="reply")
+    LLM_TOKENS.inc(completion.completion_tokens, kind="completion", stage="reply")
+
+    try:
+        with timed("parse"):
+            ai_data = json.loads(completion.content)
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON decode error: {e}")
+        FALLBACKS.inc(reason="json_decode")
+        ai_data = _get_fallback_response(lang, "technical_support")
+    else:
+        ai_data = _accept_llm_response(ai_data, cleaned_text, lang)
+
+    ai_data["detected_language"] = lang
+    ai_data["original_email"] = original_email
+    EMAILS_CLASSIFIED.inc(category=ai_data.get("category"), language=lang, source="llm")
+    logger.info(
+        f"Streamed classification complete - Category: {ai_data.get('category', 'N/A')}, "
+        f"Lang: {lang}, Provider: {provider.name}, Tokens: {completion.total_tokens}, "
+        f"Request: {get_request_id() or 'N/A'}"
+    )
+    yield "result", ai_data
+
+
+def _replay_response(result: dict) -> Iterator[tuple[str, dict]]:
+    """`stream_response` events for a result that is already complete."""
+    yield "category", {"category": result.get("category"), "is_productive": result.get("is_productive")}
+    yield "subject", {"suggested_subject": result.get("suggested_subject", "")}
+    yield "body", {"delta": result.get("suggested_body", "")}
+    yield "result", result
+
+
+def degraded_response(cleaned_text: Optional[str], lang: Optional[str], reason: str) -> dict:
+    """Template response for an email the LLM could not answer in time.
+
+    Args:
+        cleaned_text (Optional[str]): Cleaned email text, if preprocessing ran.
+        lang (Optional[str]): Detected language, if known.
+        reason (str): Why the LLM was skipped (``deadline``, ``circuit_open``...),
+            counted in ``email_fallbacks_total``.
+
+    Returns:
+        dict: `_get_fallback_response` output for a heuristically chosen
+        category (see `app.degradation`), with ``degraded=True``.
+    """
+    category = heuristic_category(cleaned_text, lang) if cleaned_text else "technical_support"
+    FALLBACKS.inc(reason=reason)
+    result = _get_fallback_response(lang, category)
+    result["degraded"] = True
+    return result
 
 
 def _validate_response(ai_data: dict) -> bool:
@@ -202,7 +786,7 @@ def _get_fallback_response(lang: str, category: str) -> dict:
     template = RESPONSE_TEMPLATES[template_lang][category]
     
     # Determine if category is productive
-    is_productive = category not in ["greeting", "spam"]
+    is_productive = category not in NON_PRODUCTIVE_CATEGORIES
     
     return {
         "is_productive": is_productive,
@@ -0,0 +1,168 @@
+"""Incremental reading of the JSON object streamed by the LLM.
+
+`/process-email/stream` forwards the reply while the model is still writing
+it. The model answers with one flat JSON object
+(``is_productive``, ``category``, ``suggested_subject``, ``suggested_body``),
+so `JSONFieldStream` parses it character by character as deltas arrive:
+each top-level value is reported as soon as it is complete, and string
+values of selected keys (the body) are also reported piece by piece while
+they are being generated.
+"""
+
+import json
+from typing import Iterable, List, Optional, Tuple
+
+_WHITESPACE = " \t\r\n"
+_SIMPLE_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+# (kind, key, value): ("value", key, parsed value) or ("delta", key, text)
+FieldEvent = Tuple[str, str, object]
+
+
+class JSONFieldStream:
+    """Push parser for a streamed JSON object.
+
+    Nested objects and arrays are parsed whole and reported as values;
+    malformed input is not rejected here (the complete text is still parsed
+    with ``json.loads`` once the stream ends).
+
+    Args:
+        stream_keys (Iterable[str]): Keys whose string values are also
+            reported as ``delta`` events while they stream.
+    """
+
+    def __init__(self, stream_keys: Iterable[str] = ()):
+        self.stream_keys = frozenset(stream_keys)
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._buffer: List[str] = []  # Decoded string or raw scalar/nested text
+        self._escape: Optional[str] = None  # Pending escape sequence after "\"
+        self._high_surrogate = ""
+        self._depth = 0
+        self._nested_in_string = False
+        self._nested_escape = False
+
+    def feed(self, text: str) -> List[FieldEvent]:
+        """Consume the next chunk and return the events it completes."""
+        events: List[FieldEvent] = []
+        streamed_from = len(self._buffer) if self._state == "string" else None
+        for char in text:
+            state = self._state
+            if state == "string":
+                if self._string_char(char):
+                    if self._streaming() and len(self._buffer) > (streamed_from or 0):
+                        events.append(("delta", self._key, "".join(self._buffer[streamed_from or 0:])))
+                    events.append(("value", self._key, "".join(self._buffer)))
+                    self._state = "after_value"
+                    streamed_from = None
+            elif state == "value":
+                if char in _WHITESPACE:
+                    continue
+                self._buffer = []
+                if char == '"':
+                    self._state = "string"
+                    streamed_from = 0
+                elif char in "{[":
+                    self._buffer.append(char)
+                    self._depth, self._nested_in_string, self._nested_escape = 1, False, False
+                    self._state = "nested"
+                else:
+                    self._buffer.append(char)
+                    self._state = "scalar"
+            elif state == "scalar":
+                if char in _WHITESPACE or char in ",}":
+                    events.append(("value", self._key, self._load("".join(self._buffer))))
+                    self._state = "after_value"
+                    self._after_value(char)
+                else:
+                    self._buffer.append(char)
+            elif state == "nested":
+                self._buffer.append(char)
+                if self._nested_char(char):
+                    events.append(("value", self._key, self._load("".join(self._buffer))))
+                    self._state = "after_value"
+            elif state == "key":
+                if self._string_char(char):
+                    self._key = "".join(self._buffer)
+                    self._state = "colon"
+            elif state == "colon":
+                if char == ":":
+                    self._state = "value"
+            elif state == "start":
+                if char == "{":
+                    self._state = "key_or_end"
+            elif state == "key_or_end":
+                if char == '"':
+                    self._buffer = []
+                    self._state = "key"
+                elif char == "}":
+                    self._state = "done"
+            elif state == "after_value":
+                self._after_value(char)
+
+        if self._state == "string" and self._streaming() and len(self._buffer) > (streamed_from or 0):
+            events.append(("delta", self._key, "".join(self._buffer[streamed_from or 0:])))
+        return events
+
+    def _streaming(self) -> bool:
+        return self._key in self.stream_keys
+
+    def _after_value(self, char: str) -> None:
+        if char == ",":
+            self._state = "key_or_end"
+        elif char == "}":
+            self._state = "done"
+
+    def _string_char(self, char: str) -> bool:
+        """Decode one character of a string; ``True`` on its closing quote."""
+        if self._escape is not None:
+            self._escape += char
+            if self._escape[0] != "u":
+                self._buffer.append(_SIMPLE_ESCAPES.get(char, char))
+                self._escape = None
+            elif len(self._escape) == 5:
+                self._append_code_unit(int(self._escape[1:], 16))
+                self._escape = None
+            return False
+        if char == "\\":
+            self._escape = ""
+            return False
+        if char == '"':
+            return True
+        self._buffer.append(char)
+        return False
+
+    def _append_code_unit(self, unit: int) -> None:
+        # Characters outside the BMP arrive as a pair of \u escapes
+        if 0xD800 <= unit <= 0xDBFF:
+            self._high_surrogate = chr(unit)
+            return
+        char = chr(unit)
+        if self._high_surrogate and 0xDC00 <= unit <= 0xDFFF:
+            char = (self._high_surrogate + char).encode("utf-16", "surrogatepass").decode("utf-16")
+        self._high_surrogate = ""
+        self._buffer.append(char)
+
+    def _nested_char(self, char: str) -> bool:
+        """Track nesting inside an object/array value; ``True`` once it closes."""
+        if self._nested_in_string:
+            if self._nested_escape:
+                self._nested_escape = False
+            elif char == "\\":
+                self._nested_escape = True
+            elif char == '"':
+                self._nested_in_string = False
+        elif char == '"':
+            self._nested_in_string = True
+        elif char in "{[":
+            self._depth += 1
+        elif char in "}]":
+            self._depth -= 1
+        return self._depth == 0
+
+    @staticmethod
+    def _load(raw: str) -> object:
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return raw
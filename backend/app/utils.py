@@ -6,12 +6,26 @@ lemmatize email text using spaCy.
 
 import spacy
 import re
+import time
+from collections import defaultdict
 from functools import lru_cache
-from langdetect import detect, DetectorFactory
+from typing import Optional
+from langdetect.detector_factory import init_factory
+from .config import (
+    LANG_DETECT_ENGINE,
+    LANG_DETECT_MIN_CONFIDENCE,
+    LANG_DETECT_PREFIX_CHARS,
+    LEMMA_MEMO_MAX_ENTRIES,
+    LEMMATIZER_MODE,
+    NLP_BATCH_SIZE,
+    NLP_N_PROCESS,
+    SPACY_PIPELINE,
+)
 from .exceptions import NLPProcessingError
-
-# Ensure language detection is consistent across runs
-DetectorFactory.seed = 0
+from .extraction import extract_new_content
+from .language import FastLanguageDetector, LangdetectDetector, LanguageDetector
+from .lemmas import LemmaMemo
+from .metrics import LEMMA_MEMO_LOOKUPS, observe_stage, timed
 
 # Module-level constant for supported language models
 SUPPORTED_MODELS = {
@@ -19,10 +33,25 @@ SUPPORTED_MODELS = {
     "en": "en_core_web_sm"
 }
 
+# Tags left after HTML conversion (e.g. "<name@example.com>"), URLs and
+# email addresses; a tag cannot span lines or contain "<", so matching stays
+# linear on text full of unmatched "<"
+NOISE_PATTERN = re.compile(r'<[^<>\n]*>|http\S+|\S+@\S+')
+
+# Components `clean_email_text` never uses. Lemmas only need the lemmatizer
+# and the tagger/morphologizer + attribute_ruler feeding it POS tags, while
+# stop word, punctuation and space flags are lexical attributes.
+UNUSED_COMPONENTS = ["parser", "ner", "senter"]
+
 @lru_cache(maxsize=2)
 def get_spacy_model(lang: str):
     """Load a spaCy model for the requested language.
 
+    With ``SPACY_PIPELINE=minimal`` (default) the components listed in
+    `UNUSED_COMPONENTS` are excluded, which yields the same lemmas at a
+    fraction of the CPU and memory cost. ``SPACY_PIPELINE=full`` loads the
+    complete pipeline.
+
     Args:
         lang (str): ISO language code (e.g. 'pt' or 'en').
 
@@ -38,57 +67,241 @@ def get_spacy_model(lang: str):
     if not model_name:
         return None
 
+    exclude = UNUSED_COMPONENTS if SPACY_PIPELINE == "minimal" else []
     try:
-        return spacy.load(model_name)
+        return spacy.load(model_name, exclude=exclude)
     except OSError:
         raise NLPProcessingError(
             f"Model {model_name} not found in the container. Check Dockerfile."
         )
 
-def clean_email_text(text: str) -> tuple[str, str]:
+@lru_cache(maxsize=2)
+def get_lemma_memo(lang: str) -> Optional[LemmaMemo]:
+    """Return the lemma memo of a language when ``LEMMATIZER_MODE=memo``.
+
+    Returns:
+        Optional[LemmaMemo]: The memo, or ``None`` in ``model`` mode or for
+        languages without a spaCy model.
+
+    Raises:
+        NLPProcessingError: If the spaCy model of the language cannot be loaded.
+    """
+    if LEMMATIZER_MODE != "memo":
+        return None
+    nlp = get_spacy_model(lang)
+    return LemmaMemo(nlp, lang, LEMMA_MEMO_MAX_ENTRIES) if nlp else None
+
+def lemma_memo_stats() -> dict:
+    """Lemma memo hit rate per language, counting lookups made in pool workers.
+
+    Returns:
+        dict: ``{"enabled": False}`` in ``model`` mode, otherwise the memo
+        size limit and hits, misses and hit rate per supported language.
+    """
+    if LEMMATIZER_MODE != "memo":
+        return {"enabled": False}
+    languages = {}
+    for lang in SUPPORTED_MODELS:
+        hits = LEMMA_MEMO_LOOKUPS.value(language=lang, result="hit")
+        misses = LEMMA_MEMO_LOOKUPS.value(language=lang, result="miss")
+        languages[lang] = {
+            "hits": int(hits),
+            "misses": int(misses),
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
+    return {"enabled": True, "max_entries": LEMMA_MEMO_MAX_ENTRIES, "languages": languages}
+
+@lru_cache(maxsize=1)
+def get_language_detector() -> LanguageDetector:
+    """Return the language detection engine selected by ``LANG_DETECT_ENGINE``.
+
+    ``fast`` (default) scores the `SUPPORTED_MODELS` languages on a bounded
+    prefix and falls back to langdetect only when unsure; ``langdetect``
+    always uses the langdetect library.
+
+    Raises:
+        ValueError: If ``LANG_DETECT_ENGINE`` names an unknown engine.
+    """
+    if LANG_DETECT_ENGINE == "langdetect":
+        return LangdetectDetector()
+    if LANG_DETECT_ENGINE == "fast":
+        return FastLanguageDetector(
+            SUPPORTED_MODELS,
+            prefix_chars=LANG_DETECT_PREFIX_CHARS,
+            min_confidence=LANG_DETECT_MIN_CONFIDENCE,
+            fallback=LangdetectDetector(),
+        )
+    raise ValueError(f"Unknown LANG_DETECT_ENGINE: {LANG_DETECT_ENGINE}")
+
+def preload_nlp_models() -> dict[str, float]:
+    """Eagerly load langdetect profiles and every supported spaCy model.
+
+    Avoids paying the multi-second ``spacy.load`` on the first request of
+    each language.
+
+    Returns:
+        dict[str, float]: Load time in seconds per resource (``langdetect``
+        and ``spacy_<lang>``).
+
+    Raises:
+        NLPProcessingError: If a supported spaCy model cannot be loaded.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    init_factory()
+    get_language_detector()
+    timings["langdetect"] = time.perf_counter() - start
+
+    for lang in SUPPORTED_MODELS:
+        start = time.perf_counter()
+        get_spacy_model(lang)
+        get_lemma_memo(lang)
+        timings[f"spacy_{lang}"] = time.perf_counter() - start
+
+    return timings
+
+def clean_email_text(text: str) -> tuple[str, str, str]:
     """Clean and lemmatize email text.
 
-    The pipeline performs regex-based noise removal (HTML tags, URLs,
-    and email addresses), attempts to detect the text language, and when a
+    The pipeline keeps only the new content of the email as plain text (HTML
+    converted, no quoted history, signature or disclaimer, see
+    `app.extraction`), performs regex-based noise removal (URLs and email
+    addresses), attempts to detect the text language, and when a
     corresponding spaCy model is available, lemmatizes and filters tokens
-    (removing stop words, punctuation and spaces).
+    (removing stop words, punctuation and spaces). With
+    ``LEMMATIZER_MODE=memo`` the lemmas come from the language's `LemmaMemo`,
+    which only runs the model on tokens it has not seen yet.
 
     Args:
         text (str): Raw email text to process.
 
     Returns:
-        tuple[str, str]: A pair ``(cleaned_text, detected_language)`` where
-        ``cleaned_text`` is the processed, lowercased, token-joined string and
-        ``detected_language`` is the ISO code detected (e.g. 'pt' or 'en').
+        tuple[str, str, str]: ``(cleaned_text, detected_language, new_content)``
+        where ``cleaned_text`` is the processed, lowercased, token-joined
+        string, ``detected_language`` is the ISO code detected (e.g. 'pt' or
+        'en') and ``new_content`` is the extracted text the LLM prompt is
+        built from (see `app.prompts.build_user_message`).
 
     Raises:
         NLPProcessingError: For unexpected errors during processing.
     """
     try:
-        # 1. Regex Cleaning
-        text = re.sub(r'<.*?>|http\S+|\S+@\S+', '', text)
+        # 1. New content only, then Regex Cleaning
+        with timed("extract"):
+            new_content = extract_new_content(text)
+        with timed("regex"):
+            text = _remove_noise(new_content)
         
         # 2. Language Detection
-        try:
-            lang = detect(text)
-        except:
-            lang = "pt" # Default to Portuguese if detection fails
+        with timed("detect"):
+            lang = _detect_language(text)
 
         # 3. NLP Lemmatization
         nlp = get_spacy_model(lang)
-        if nlp:
-            doc = nlp(text)
-            # Filter stop words, punctuation and extract lemmas
-            tokens = [
-                t.lemma_.lower() 
-                for t in doc 
-                if not t.is_stop and not t.is_punct and not t.is_space
-            ]
-            return " ".join(tokens), lang
+        memo = get_lemma_memo(lang)
+        with timed("lemmatize"):
+            if memo:
+                return memo.lemmatize(text), lang, new_content
+            if nlp:
+                return _lemmatize(nlp(text)), lang, new_content
             
-        # Fallback if no specific model is available
-        return " ".join(text.lower().split()), lang
+            # Fallback if no specific model is available
+            return " ".join(text.lower().split()), lang, new_content
         
     except Exception as e:
         # Wrap any unexpected errors into our custom NLPProcessingError
         raise NLPProcessingError(str(e))
+
+def clean_email_texts(
+    texts: list[str],
+    batch_size: int = NLP_BATCH_SIZE,
+    n_process: int = NLP_N_PROCESS,
+) -> list[tuple[str, str, str]]:
+    """Clean and lemmatize a batch of email texts.
+
+    Batch counterpart of `clean_email_text`: detects the language of every
+    text first, groups the texts by language and runs each group through
+    ``nlp.pipe`` so spaCy can batch the inference.
+
+    Args:
+        texts (list[str]): Raw email texts to process.
+        batch_size (int): Number of texts spaCy buffers per batch.
+        n_process (int): Number of processes spaCy uses for each group.
+
+    Returns:
+        list[tuple[str, str, str]]: One ``(cleaned_text, detected_language,
+        new_content)`` triple per input text, in input order.
+
+    Raises:
+        NLPProcessingError: For unexpected errors during processing.
+    """
+    try:
+        # 1. Extraction and Regex Cleaning and 2. Language Detection, for every text
+        extracted, stripped = [], []
+        for text in texts:
+            with timed("extract"):
+                extracted.append(extract_new_content(text))
+            with timed("regex"):
+                stripped.append(_remove_noise(extracted[-1]))
+        langs = []
+        for text in stripped:
+            with timed("detect"):
+                langs.append(_detect_language(text))
+
+        groups = defaultdict(list)
+        for index, lang in enumerate(langs):
+            groups[lang].append(index)
+
+        # 3. NLP Lemmatization, one nlp.pipe run per language
+        results = [None] * len(texts)
+        for lang, indices in groups.items():
+            nlp = get_spacy_model(lang)
+            if not nlp:
+                for index in indices:
+                    results[index] = (" ".join(stripped[index].lower().split()), lang, extracted[index])
+                continue
+
+            memo = get_lemma_memo(lang)
+            if memo:
+                # Unseen tokens are few, batching them across texts gains little
+                for index in indices:
+                    with timed("lemmatize"):
+                        results[index] = (memo.lemmatize(stripped[index]), lang, extracted[index])
+                continue
+
+            docs = nlp.pipe(
+                (stripped[index] for index in indices),
+                batch_size=batch_size,
+                n_process=n_process,
+            )
+            # Time from one doc to the next, so each email is charged its
+            # share of the batched inference
+            start = time.perf_counter()
+            for index, doc in zip(indices, docs):
+                results[index] = (_lemmatize(doc), lang, extracted[index])
+                now = time.perf_counter()
+                observe_stage("lemmatize", now - start)
+                start = now
+
+        return results
+
+    except Exception as e:
+        raise NLPProcessingError(str(e))
+
+def _remove_noise(text: str) -> str:
+    """Remove leftover tags, URLs and email addresses from extracted text."""
+    return NOISE_PATTERN.sub('', text)
+
+def _detect_language(text: str) -> str:
+    """Detect the language of ``text``, defaulting to Portuguese on failure."""
+    return get_language_detector().detect(text)
+
+def _lemmatize(doc) -> str:
+    """Join the lowercased lemmas of a doc, skipping stop words and punctuation."""
+    tokens = [
+        t.lemma_.lower() 
+        for t in doc 
+        if not t.is_stop and not t.is_punct and not t.is_space
+    ]
+    return " ".join(tokens)
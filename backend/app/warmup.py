@@ -0,0 +1,118 @@
+"""Startup warm-up of NLP models and the LLM client.
+
+Loading spaCy models takes seconds, so without warm-up the first request of
+each language on every new replica is slow. `warm_up` preloads everything the
+request path needs and records timings in `warmup_state`, which backs the
+`/ready` endpoint.
+
+In the multi-process mode (``gunicorn -c gunicorn.conf.py``),
+`preload_for_fork` loads the models once in the master process instead, so
+the forked workers share those pages copy-on-write and their own `warm_up`
+finds the models already loaded.
+"""
+
+import gc
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from .config import LLM_CASCADE, PREPROCESS_WORKERS
+from .llm import get_llm_classifier_provider, get_llm_provider
+from .local_classifier import get_local_classifier
+from .preprocessing import warm_up_preprocessing_pool
+from .utils import preload_nlp_models
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmupState:
+    """Progress and timings of the startup warm-up.
+
+    Attributes:
+        ready (bool): True once every resource loaded successfully.
+        started_at (Optional[float]): Unix time the warm-up started.
+        duration (Optional[float]): Total warm-up time in seconds.
+        timings (dict): Load time in seconds per resource.
+        workers (list): Per-worker timings of the preprocessing pool.
+        error (Optional[str]): Failure message, if the warm-up failed.
+    """
+    ready: bool = False
+    started_at: Optional[float] = None
+    duration: Optional[float] = None
+    timings: dict = field(default_factory=dict)
+    workers: list = field(default_factory=list)
+    error: Optional[str] = None
+
+
+warmup_state = WarmupState()
+
+
+async def warm_up() -> None:
+    """Preload NLP models, the local classifier and the LLM client.
+
+    Progress and timings are recorded in `warmup_state`.
+
+    spaCy models and langdetect profiles are loaded where preprocessing runs:
+    in every preprocessing pool worker, or in this process when the pool is
+    disabled. Errors are recorded rather than raised so the service keeps
+    answering `/health` while reporting not ready.
+    """
+    warmup_state.started_at = time.time()
+    start = time.perf_counter()
+
+    try:
+        if PREPROCESS_WORKERS > 0:
+            warmup_state.workers = await warm_up_preprocessing_pool()
+        else:
+            warmup_state.timings.update(await run_in_threadpool(preload_nlp_models))
+
+        classifier_start = time.perf_counter()
+        await run_in_threadpool(get_local_classifier)
+        warmup_state.timings["local_classifier"] = time.perf_counter() - classifier_start
+
+        client_start = time.perf_counter()
+        await run_in_threadpool(get_llm_provider)
+        if LLM_CASCADE:
+            await run_in_threadpool(get_llm_classifier_provider)
+        warmup_state.timings["llm_client"] = time.perf_counter() - client_start
+    except Exception as e:
+        warmup_state.error = str(e)
+        logger.error(f"Warm-up failed: {e}")
+        return
+    finally:
+        warmup_state.duration = time.perf_counter() - start
+
+    warmup_state.ready = True
+    logger.info(f"Warm-up complete in {warmup_state.duration:.2f}s")
+
+
+def preload_for_fork() -> dict[str, float]:
+    """Load read-only resources in a pre-fork master process.
+
+    Loads langdetect profiles, the spaCy models and the local classifier
+    (templates and prompts are built at import time), then moves every
+    object to the permanent generation with ``gc.freeze`` so garbage
+    collections in the workers do not write to, and thereby copy, the
+    shared pages.
+
+    Network clients, pools and databases are not created here: they must
+    not be shared across ``fork`` and are set up by each worker's lifespan.
+
+    Returns:
+        dict[str, float]: Load time in seconds per resource.
+    """
+    timings = preload_nlp_models()
+
+    start = time.perf_counter()
+    get_local_classifier()
+    timings["local_classifier"] = time.perf_counter() - start
+
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        f"Preloaded models before fork in {sum(timings.values()):.2f}s "
+        f"({gc.get_freeze_count()} objects frozen)"
+    )
+    return timings
@@ -0,0 +1,172 @@
+"""Input size and CPU saved by stripping quoted history and boilerplate.
+
+Builds reply-chain versions of the synthetic emails (new message, sign-off
+and signature block, optional legal disclaimer, then 1-3 quoted earlier
+messages, in PT and EN) and compares, per email, the preprocessing and
+prompt input before and after `extract_new_content`:
+
+    - characters reaching spaCy;
+    - user message tokens: the previous prompt (whole original email plus
+      its lemmatized copy) against `build_user_message`;
+    - CPU time of regex cleaning, language detection and spaCy lemmatization;
+    - for the reply chains, how often the keyword category of the email (see
+      `app.degradation`) still matches the one of the message alone, a
+      rough check that the history was what got removed.
+
+``emailsTest.json`` (short emails without history) is measured too, to show
+the overhead of the extraction where there is nothing to strip.
+
+Usage (from the ``backend`` directory):
+    python -m benchmarks.email_extraction --emails 200 --repeat 3
+"""
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+from benchmarks.pipeline import BACKEND_DIR, SYNTHETIC_PHRASES, synthetic_corpus
+
+# Pieces of reply chains: sign-offs, signature lines, disclaimers, attributions
+THREAD_PARTS = {
+    "pt": {
+        "sign_offs": ["Atenciosamente,", "Abraços,", "Obrigado,", "Att."],
+        "signature": ["Maria Souza", "Analista Financeira | Empresa X", "Tel: (11) 3333-4444",
+                      "Av. Paulista, 1000 - São Paulo/SP", "www.empresax.com.br"],
+        "disclaimer": ("Esta mensagem e seus anexos são confidenciais e destinados exclusivamente "
+                       "ao destinatário. Se você a recebeu por engano, apague-a e avise o remetente. "
+                       "Antes de imprimir, pense no meio ambiente."),
+        "attribution": "Em seg., 3 de jun. de 2024 às 10:{minute:02d}, Suporte <suporte@empresa.com> escreveu:",
+        "mobile": "Enviado do meu iPhone",
+    },
+    "en": {
+        "sign_offs": ["Best regards,", "Thanks,", "Kind regards,", "Cheers,"],
+        "signature": ["John Smith", "Finance Analyst | Company X", "Phone: +1 555 0100",
+                      "500 Market St, San Francisco, CA", "www.companyx.com"],
+        "disclaimer": ("CONFIDENTIALITY NOTICE: This email and any attachments are confidential and "
+                       "intended solely for the addressee. If you received it in error, please delete "
+                       "it and notify the sender. Please consider the environment before printing."),
+        "attribution": "On Mon, Jun 3, 2024 at 10:{minute:02d} AM Support <support@company.com> wrote:",
+        "mobile": "Sent from my iPhone",
+    },
+}
+
+# Previous prompt format: the whole email plus its lemmatized copy
+LEGACY_USER_MESSAGE = "Original email:\n{email}\n\nCleaned text for analysis:\n{cleaned}"
+
+
+def thread_corpus(size: int, pt_share: float, seed: int = 0) -> list[dict]:
+    """Synthetic emails turned into replies with signatures and quoted history."""
+    rng = random.Random(seed)
+    emails = []
+    for email in synthetic_corpus(size, pt_share, seed):
+        lang = "pt" if email["subject"] in SYNTHETIC_PHRASES["pt"]["subjects"] else "en"
+        parts = THREAD_PARTS[lang]
+
+        def message(body: str) -> list[str]:
+            lines = [body, "", rng.choice(parts["sign_offs"]),
+                     *parts["signature"][:rng.randint(1, len(parts["signature"]))]]
+            if rng.random() < 0.5:
+                lines += ["", parts["disclaimer"]]
+            elif rng.random() < 0.3:
+                lines += ["", parts["mobile"]]
+            return lines
+
+        lines = message(email["body"])
+        for depth in range(rng.randint(1, 3)):
+            earlier = " ".join(rng.choices(SYNTHETIC_PHRASES[lang]["sentences"], k=rng.randint(3, 8)))
+            lines += ["", parts["attribution"].format(minute=depth)]
+            lines += [f"{'>' * (depth + 1)} {line}" for line in message(earlier)]
+        emails.append({"subject": f"Re: {email['subject']}", "body": "\n".join(lines)})
+    return emails
+
+
+def measure(texts: list[str], repeat: int) -> dict:
+    """Per-email averages with and without the extraction stage."""
+    from app.extraction import extract_new_content
+    from app.prompts import build_user_message, count_tokens
+    from app.utils import _detect_language, _lemmatize, _remove_noise, get_spacy_model
+
+    def preprocess(text: str) -> str:
+        stripped = _remove_noise(text)
+        nlp = get_spacy_model(_detect_language(stripped))
+        return _lemmatize(nlp(stripped)) if nlp else " ".join(stripped.lower().split())
+
+    extracted = [extract_new_content(text) for text in texts]
+    for text in texts:  # Untimed pass: detector and tokenizer caches
+        preprocess(text)
+    cpu = {}
+    for name, inputs, extract in (("full", texts, False), ("extracted", texts, True)):
+        start = time.process_time()
+        for _ in range(repeat):
+            for text in inputs:
+                preprocess(extract_new_content(text) if extract else text)
+        cpu[name] = (time.process_time() - start) * 1000 / (repeat * len(texts))
+
+    legacy_tokens = [
+        count_tokens(LEGACY_USER_MESSAGE.format(email=text, cleaned=preprocess(text))) for text in texts
+    ]
+    new_tokens = [count_tokens(build_user_message(text)) for text in extracted]
+    count = len(texts)
+    return {
+        "emails": count,
+        "chars_full": round(sum(map(len, texts)) / count, 1),
+        "chars_extracted": round(sum(map(len, extracted)) / count, 1),
+        "prompt_tokens_legacy": round(sum(legacy_tokens) / count, 1),
+        "prompt_tokens_extracted": round(sum(new_tokens) / count, 1),
+        "cpu_ms_full": round(cpu["full"], 3),
+        "cpu_ms_extracted": round(cpu["extracted"], 3),
+    }
+
+
+def print_report(results: dict) -> None:
+    header = (f"{'corpus':<16} {'emails':>6} {'chars':>7} {'->':>7} {'tokens':>7} {'->':>7} "
+              f"{'saved':>6} {'cpu_ms':>8} {'->':>8} {'saved':>6}")
+    print(header)
+    print("-" * len(header))
+    for name, row in results.items():
+        tokens_saved = 1 - row["prompt_tokens_extracted"] / row["prompt_tokens_legacy"]
+        cpu_saved = 1 - row["cpu_ms_extracted"] / row["cpu_ms_full"] if row["cpu_ms_full"] else 0.0
+        print(f"{name:<16} {row['emails']:>6} {row['chars_full']:>7} {row['chars_extracted']:>7} "
+              f"{row['prompt_tokens_legacy']:>7} {row['prompt_tokens_extracted']:>7} {tokens_saved:>6.0%} "
+              f"{row['cpu_ms_full']:>8} {row['cpu_ms_extracted']:>8} {cpu_saved:>6.0%}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=BACKEND_DIR / "emailsTest.json")
+    parser.add_argument("--emails", type=int, default=200, help="Synthetic reply-chain emails")
+    parser.add_argument("--pt-share", type=float, default=0.5, help="Share of Portuguese emails")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over each corpus for CPU timings")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    from app.pipeline import format_email
+    from app.schemas import Email
+    from app.utils import preload_nlp_models
+
+    preload_nlp_models()
+    with open(args.corpus, encoding="utf-8") as f:
+        corpora = {args.corpus.stem: json.load(f), "reply-chains": thread_corpus(args.emails, args.pt_share)}
+    results = {
+        name: measure([format_email(Email(**email)) for email in emails], args.repeat)
+        for name, emails in corpora.items()
+    }
+    print_report(results)
+
+    from app.degradation import keyword_category
+    from app.extraction import extract_new_content
+
+    alone = [format_email(Email(**email)) for email in synthetic_corpus(args.emails, args.pt_share)]
+    threads = [format_email(Email(**email)) for email in corpora["reply-chains"]]
+    print()
+    for name, inputs in (("full", threads), ("extracted", [extract_new_content(t) for t in threads])):
+        matches = sum(keyword_category(text) == keyword_category(message) for text, message in zip(inputs, alone))
+        results["reply-chains"][f"keyword_category_match_{name}"] = round(matches / len(alone), 3)
+        print(f"reply-chains keyword category matching the message alone ({name}): {matches / len(alone):.0%}")
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark the HTML-to-text cleaner against the former regex pass.
+
+Generates marketing-style HTML emails of the requested sizes (a large
+``<style>`` block, a tracking ``<script>``, nested layout tables, entities,
+links and pixels) plus a plain-text email full of unmatched ``<``, and
+measures for each cleaner:
+
+    - ``legacy``: the former ``re.sub(r'<.*?>|http\\S+|\\S+@\\S+', '', text)``
+      over the whole text;
+    - ``html-full``: `html_to_text` without an output cap, then the noise
+      regex, i.e. a full-document conversion;
+    - ``pipeline``: what `clean_email_text` now runs before language
+      detection (`extract_new_content` then `_remove_noise`), which stops
+      parsing once enough text was produced.
+
+Reported per sample and cleaner: time, throughput, peak Python memory
+(``tracemalloc``), output size, and the CSS/JS and undecoded entities left
+in the output.
+
+Usage (from the ``backend`` directory):
+    python -m benchmarks.html_cleaning --sizes 10000,100000,1000000,5000000
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+import tracemalloc
+from pathlib import Path
+
+LEGACY_PATTERN = r'<.*?>|http\S+|\S+@\S+'
+
+# Leftovers that should not reach spaCy: CSS/JS fragments and raw entities
+CODE_LEFTOVERS = re.compile(r"font-family|\{|\}|function\s*\(|var\s+\w+\s*=")
+ENTITY_LEFTOVERS = re.compile(r"&(?:#\d+|#x[0-9a-fA-F]+|[a-zA-Z]+);")
+
+CSS_RULE = ".c{n} td {{ font-family: Arial, sans-serif; color: #{n:06x}; padding: {p}px; }}\n"
+ROW = (
+    '<tr><td class="c{n}" style="padding:8px;font-size:14px">'
+    "Oferta exclusiva n&ordm; {n}: at&eacute; {p}% de desconto &mdash; "
+    '<a href="https://example.com/promo/{n}?utm_source=email">clique aqui</a> &amp; aproveite!'
+    '<img src="https://example.com/pixel/{n}.gif" width="1" height="1" alt=""></td></tr>\n'
+)
+
+
+def marketing_html(size: int, seed: int = 0) -> str:
+    """A marketing email of roughly ``size`` characters."""
+    rng = random.Random(seed)
+    style = "".join(CSS_RULE.format(n=n, p=rng.randint(1, 30)) for n in range(max(1, size // 400)))
+    rows = []
+    length = len(style)
+    n = 0
+    while length < size:
+        row = ROW.format(n=n, p=rng.randint(5, 70))
+        rows.append(row)
+        length += len(row)
+        n += 1
+    return (
+        "Subject: Ofertas da semana\n\nBody: <!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+        f"<title>Ofertas</title><style>\n{style}</style>"
+        "<script>var tracking = function(id) { return '<img src=\"x\">' + id; };</script></head>"
+        "<body><table><tr><td><table>\n" + "".join(rows) + "</table></td></tr></table>"
+        "<p>Para cancelar a inscri&ccedil;&atilde;o, responda a contato@example.com.</p></body></html>"
+    )
+
+
+def angle_bracket_text(size: int) -> str:
+    """Plain text of roughly ``size`` characters with many unmatched ``<``."""
+    return "Subject: Comparativo\n\nBody: " + "valor < limite " * (size // 15)
+
+
+def measure(clean, text: str, repeat: int) -> dict:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        output = clean(text)
+    elapsed = (time.perf_counter() - start) / repeat
+    # Separate pass: tracing allocations slows the cleaners down
+    tracemalloc.start()
+    clean(text)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "ms": round(elapsed * 1000, 3),
+        "mb_per_s": round(len(text) / elapsed / 1e6, 1) if elapsed else None,
+        "peak_mib": round(peak / 2 ** 20, 2),
+        "output_chars": len(output),
+        "code_leftovers": len(CODE_LEFTOVERS.findall(output)),
+        "entity_leftovers": len(ENTITY_LEFTOVERS.findall(output)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000,5000000",
+                        help="Comma-separated sizes (characters) of the HTML samples")
+    parser.add_argument("--angle-size", type=int, default=60000,
+                        help="Size of the plain-text sample with unmatched '<' (0 = skip)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    from app.extraction import extract_new_content
+    from app.html_text import html_to_text
+    from app.utils import _remove_noise
+
+    cleaners = {
+        "legacy": lambda text: re.sub(LEGACY_PATTERN, "", text),
+        "html-full": lambda text: _remove_noise(html_to_text(text, len(text))),
+        "pipeline": lambda text: _remove_noise(extract_new_content(text)),
+    }
+    samples = {f"html-{size}": marketing_html(size) for size in (int(s) for s in args.sizes.split(",") if s)}
+    if args.angle_size:
+        samples[f"angles-{args.angle_size}"] = angle_bracket_text(args.angle_size)
+
+    results = {}
+    header = (f"{'sample':<16} {'cleaner':<10} {'ms':>10} {'MB/s':>8} {'peak MiB':>9} "
+              f"{'out chars':>10} {'css/js':>7} {'entities':>9}")
+    print(header)
+    print("-" * len(header))
+    for sample, text in samples.items():
+        results[sample] = {"chars": len(text)}
+        for name, clean in cleaners.items():
+            row = results[sample][name] = measure(clean, text, args.repeat)
+            print(f"{sample:<16} {name:<10} {row['ms']:>10} {row['mb_per_s']:>8} {row['peak_mib']:>9} "
+                  f"{row['output_chars']:>10} {row['code_leftovers']:>7} {row['entity_leftovers']:>9}")
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Compare language detection engines on ``emailsTest.json``-style data.
+
+Engines:
+    - ``langdetect``: the langdetect library on the full text.
+    - ``fast``: stop word / n-gram scorer with langdetect fallback (default).
+    - ``fast-only``: the scorer alone, without the fallback.
+
+Accuracy is measured against the ``language`` field of each corpus item when
+present, otherwise against langdetect on the full text. Besides the corpus
+as-is, truncated variants (subject only / first words of the body) are
+scored, since short emails are where detectors disagree most.
+
+Usage (from the ``backend`` directory):
+    python -m benchmarks.language_detection [--corpus emailsTest.json] [--repeat 50]
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from app.config import LANG_DETECT_MIN_CONFIDENCE, LANG_DETECT_PREFIX_CHARS
+from app.language import FastLanguageDetector, LangdetectDetector
+from app.utils import SUPPORTED_MODELS
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def build_samples(corpus: Path) -> list[tuple[str, str, str]]:
+    """Return ``(variant, text, expected_language)`` samples for the corpus."""
+    with open(corpus, encoding="utf-8") as f:
+        emails = json.load(f)
+
+    reference = LangdetectDetector()
+    samples = []
+    for email in emails:
+        full_text = f"Subject: {email['subject']}\n\nBody: {email['body']}"
+        expected = email.get("language") or reference.detect(full_text)
+        samples.append(("full", full_text, expected))
+        samples.append(("subject", f"Subject: {email['subject']}", expected))
+        short_body = " ".join(email["body"].split()[:6])
+        samples.append(("short_body", short_body, expected))
+    return samples
+
+
+def evaluate(name: str, detector, samples: list, repeat: int) -> dict:
+    """Measure accuracy per variant and throughput of one engine."""
+    correct = {}
+    totals = {}
+    for variant, text, expected in samples:
+        totals[variant] = totals.get(variant, 0) + 1
+        correct[variant] = correct.get(variant, 0) + (detector.detect(text) == expected)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, text, _ in samples:
+            detector.detect(text)
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "engine": name,
+        "accuracy": round(sum(correct.values()) / len(samples), 4),
+        **{f"acc_{v}": round(correct[v] / totals[v], 4) for v in totals},
+        "texts_per_sec": round(repeat * len(samples) / elapsed, 1),
+    }
+    if isinstance(detector, FastLanguageDetector) and detector.fallback is not None:
+        result["fast_hit_rate"] = detector.stats()["fast_hit_rate"]
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=BACKEND_DIR / "emailsTest.json")
+    parser.add_argument("--repeat", type=int, default=50, help="Passes for throughput")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    samples = build_samples(args.corpus)
+    fast_options = {
+        "prefix_chars": LANG_DETECT_PREFIX_CHARS,
+        "min_confidence": LANG_DETECT_MIN_CONFIDENCE,
+    }
+    engines = {
+        "langdetect": LangdetectDetector(),
+        "fast": FastLanguageDetector(
+            SUPPORTED_MODELS, fallback=LangdetectDetector(), **fast_options
+        ),
+        "fast-only": FastLanguageDetector(SUPPORTED_MODELS, **fast_options),
+    }
+    results = [evaluate(name, engine, samples, args.repeat) for name, engine in engines.items()]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    columns = sorted({c for row in results for c in row}, key=lambda c: (c != "engine", c))
+    print("  ".join(f"{c:>15}" for c in columns))
+    for row in results:
+        print("  ".join(f"{str(row.get(c, '-')):>15}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Lemmatization cost and accuracy of the lemma memo against spaCy inference.
+
+Lemmatizes a synthetic PT/EN corpus, after the usual extraction, noise
+removal and language detection (untimed), twice: with the model on every
+email (``LEMMATIZER_MODE=model``) and through a `LemmaMemo` per language
+(``LEMMATIZER_MODE=memo``), for every memo size in ``--max-entries``.
+Every email gets a customer name, a city and an order number drawn from
+large pools, so part of the vocabulary keeps being new. Reported per mode:
+
+    - lemmatization CPU time per email, overall and over the second half of
+      the corpus (a warm memo);
+    - memo hit rate, overall and over the second half, and entries kept;
+    - memory held by the memo (``tracemalloc``, in a separate pass);
+    - share of tokens whose lemma matches the model's, in context.
+
+Usage (from the ``backend`` directory):
+    python -m benchmarks.lemma_memo --emails 2000 --max-entries 500,50000
+"""
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from pathlib import Path
+from benchmarks.pipeline import SYNTHETIC_PHRASES, synthetic_corpus
+
+SYLLABLES = ["ba", "ce", "di", "fo", "gu", "la", "me", "ni", "po", "ra", "se", "ti", "va", "zo"]
+
+VARIABLE_SENTENCES = {
+    "pt": "Meu nome é {name}, de {city}, e o pedido {order} ainda não chegou.",
+    "en": "My name is {name}, from {city}, and order {order} has not arrived yet.",
+}
+
+
+def varied_corpus(size: int, pt_share: float, names: int, seed: int = 0) -> list[dict]:
+    """Synthetic emails with a name, city and order number from large pools."""
+    rng = random.Random(seed)
+
+    def word() -> str:
+        return "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))).capitalize()
+
+    people = [f"{word()} {word()}" for _ in range(names)]
+    cities = [word() for _ in range(max(1, names // 5))]
+    emails = []
+    for email in synthetic_corpus(size, pt_share, seed):
+        lang = "pt" if email["subject"] in SYNTHETIC_PHRASES["pt"]["subjects"] else "en"
+        sentence = VARIABLE_SENTENCES[lang].format(
+            name=rng.choice(people), city=rng.choice(cities), order=rng.randint(10000, 99999)
+        )
+        emails.append({"subject": email["subject"], "body": f"{sentence} {email['body']}"})
+    return emails
+
+
+def measure_model(texts: list[tuple[str, str]]) -> tuple[dict, list[str]]:
+    from app.utils import _lemmatize, get_spacy_model
+
+    outputs, cpu = [], []
+    for text, lang in texts:
+        start = time.process_time()
+        outputs.append(_lemmatize(get_spacy_model(lang)(text)))
+        cpu.append(time.process_time() - start)
+    return summarize(cpu), outputs
+
+
+def measure_memo(texts: list[tuple[str, str]], max_entries: int, reference: list[str]) -> dict:
+    from app.lemmas import LemmaMemo
+    from app.utils import SUPPORTED_MODELS, get_spacy_model
+
+    memos = {lang: LemmaMemo(get_spacy_model(lang), lang, max_entries) for lang in SUPPORTED_MODELS}
+    outputs, cpu, warm_hits, warm_lookups = [], [], 0, 0
+    for index, (text, lang) in enumerate(texts):
+        memo = memos[lang]
+        before = memo.hits, memo.misses
+        start = time.process_time()
+        outputs.append(memo.lemmatize(text))
+        cpu.append(time.process_time() - start)
+        if index >= len(texts) // 2:
+            warm_hits += memo.hits - before[0]
+            warm_lookups += memo.hits + memo.misses - sum(before)
+
+    # Separate pass: tracing allocations slows the memo down
+    tracemalloc.start()
+    fresh = {lang: LemmaMemo(get_spacy_model(lang), lang, max_entries) for lang in SUPPORTED_MODELS}
+    for text, lang in texts:
+        fresh[lang].lemmatize(text)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    hits = sum(memo.hits for memo in memos.values())
+    lookups = hits + sum(memo.misses for memo in memos.values())
+    tokens = matching = 0
+    for output, expected in zip(outputs, reference):
+        pairs = list(zip(output.split(), expected.split()))
+        tokens += len(pairs)
+        matching += sum(a == b for a, b in pairs)
+    return {
+        **summarize(cpu),
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "hit_rate_warm": round(warm_hits / warm_lookups, 4) if warm_lookups else 0.0,
+        "entries": sum(memo.stats()["entries"] for memo in memos.values()),
+        "memory_kib": round(memory / 1024, 1),
+        "lemma_agreement": round(matching / tokens, 4) if tokens else 1.0,
+    }
+
+
+def summarize(cpu: list[float]) -> dict:
+    warm = cpu[len(cpu) // 2:]
+    return {
+        "cpu_ms_per_email": round(sum(cpu) * 1000 / len(cpu), 4),
+        "cpu_ms_per_email_warm": round(sum(warm) * 1000 / len(warm), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--pt-share", type=float, default=0.5, help="Share of Portuguese emails")
+    parser.add_argument("--names", type=int, default=1000, help="Size of the customer name pool")
+    parser.add_argument("--max-entries", default="500,50000", help="Comma-separated memo sizes")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    from app.extraction import extract_new_content
+    from app.pipeline import format_email
+    from app.schemas import Email
+    from app.utils import _detect_language, _remove_noise, preload_nlp_models
+
+    preload_nlp_models()
+    texts = []
+    for email in varied_corpus(args.emails, args.pt_share, args.names):
+        text = _remove_noise(extract_new_content(format_email(Email(**email))))
+        texts.append((text, _detect_language(text)))
+
+    model, reference = measure_model(texts)
+    results = {"emails": len(texts), "model": model}
+    for size in (int(s) for s in args.max_entries.split(",") if s):
+        results[f"memo-{size}"] = measure_memo(texts, size, reference)
+
+    header = (f"{'mode':<12} {'cpu_ms':>8} {'warm':>8} {'hit_rate':>9} {'warm':>6} "
+              f"{'entries':>8} {'mem_KiB':>8} {'agreement':>9}")
+    print(header)
+    print("-" * len(header))
+    for name, row in results.items():
+        if name == "emails":
+            continue
+        print(f"{name:<12} {row['cpu_ms_per_email']:>8} {row['cpu_ms_per_email_warm']:>8} "
+              f"{row.get('hit_rate', '-'):>9} {row.get('hit_rate_warm', '-'):>6} {row.get('entries', '-'):>8} "
+              f"{row.get('memory_kib', '-'):>8} {row.get('lemma_agreement', '-'):>9}")
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
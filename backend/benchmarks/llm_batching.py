@@ -0,0 +1,175 @@
+"""Tokens and latency of multi-email LLM calls against one call per email.
+
+Runs ``process_email_batch`` over a synthetic corpus, split into requests
+of ``--request-size`` emails, once per ``LLM_BATCH_SIZE`` value. Every value
+runs in a fresh subprocess with the stub LLM (``LLM_PROVIDER=stub``) and the
+response cache disabled. For each value it reports:
+
+    - LLM calls, prompt and completion tokens per email;
+    - the share of emails the batch reply left out or got wrong, which were
+      retried on their own (``--drop-rate`` makes the stub leave some out);
+    - the share of emails answered with degraded templates;
+    - request latency (every email of a request is answered together) and
+      emails/sec.
+
+The stub's latency grows with the number of replies it generates, like a
+real model's decoding time, so the latency gain shown is the saved
+per-call overhead only; under a requests-per-minute quota (``--rpm-limit``)
+fewer calls also means less time queued for the budget, and fewer emails
+degraded to templates by the deadlines. Token counts are the stub's ~4
+characters per token estimate.
+
+Usage (from the ``backend`` directory):
+    python -m benchmarks.llm_batching --batch-sizes 1,5,10 --emails 200 --output batching.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from benchmarks.pipeline import BACKEND_DIR, git_commit, latency_summary, synthetic_corpus
+
+
+async def run_corpus(emails: list[dict], request_size: int, clients: int) -> dict:
+    """Process the corpus in requests of ``request_size`` emails, in this process."""
+    from app.llm import get_llm_provider
+    from app.metrics import BATCH_ITEMS, LLM_TOKENS
+    from app.pipeline import process_email_batch
+    from app.schemas import Email
+
+    requests = [
+        [Email(**email) for email in emails[i:i + request_size]]
+        for i in range(0, len(emails), request_size)
+    ]
+    # Load the NLP models outside the measurement
+    await process_email_batch([Email(subject="Warm-up", body="Warm-up email body.")])
+
+    provider = get_llm_provider()
+    calls_before = provider.calls
+    prompt_before = LLM_TOKENS.value(kind="prompt", stage="reply")
+    completion_before = LLM_TOKENS.value(kind="completion", stage="reply")
+
+    queue = list(reversed(requests))
+    latencies = []
+    degraded = 0
+
+    async def client() -> None:
+        nonlocal degraded
+        while queue:
+            batch = queue.pop()
+            start = time.perf_counter()
+            responses = await process_email_batch(batch)
+            latencies.append((time.perf_counter() - start) * 1000)
+            degraded += sum(response.degraded for response in responses)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    count = len(emails)
+    answered = BATCH_ITEMS.value(result="answered")
+    retried = BATCH_ITEMS.value(result="retried")
+    return {
+        "llm_calls_per_email": round((provider.calls - calls_before) / count, 3),
+        "prompt_tokens_per_email": round(
+            (LLM_TOKENS.value(kind="prompt", stage="reply") - prompt_before) / count, 1
+        ),
+        "completion_tokens_per_email": round(
+            (LLM_TOKENS.value(kind="completion", stage="reply") - completion_before) / count, 1
+        ),
+        "batched_share": round((answered + retried) / count, 3),
+        "retried_share": round(retried / count, 3),
+        "degraded_share": round(degraded / count, 3),
+        "requests": {**latency_summary(latencies), "emails_per_sec": round(count / elapsed, 2)},
+    }
+
+
+def print_report(results: dict) -> None:
+    settings = results["settings"]
+    print(f"commit {results['commit']}  python {results['python']}  emails {settings['emails']}  "
+          f"request size {settings['request_size']}  stub latency {settings['llm_latency_ms']}ms  "
+          f"drop rate {settings['drop_rate']}  rpm limit {settings['rpm_limit'] or '-'}\n")
+    header = (f"{'batch':>5} {'calls/email':>11} {'prompt/email':>12} {'compl/email':>11} "
+              f"{'retried':>8} {'degraded':>8} {'p50_ms':>9} {'p95_ms':>9} {'emails/s':>9}")
+    print(header)
+    print("-" * len(header))
+    for batch_size, result in results["batch_sizes"].items():
+        requests = result["requests"]
+        print(f"{batch_size:>5} {result['llm_calls_per_email']:>11} {result['prompt_tokens_per_email']:>12} "
+              f"{result['completion_tokens_per_email']:>11} {result['retried_share']:>8} {result['degraded_share']:>8} "
+              f"{requests['p50_ms']:>9} {requests['p95_ms']:>9} {requests['emails_per_sec']:>9}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-sizes", default="1,5,10", help="Comma-separated LLM_BATCH_SIZE values")
+    parser.add_argument("--emails", type=int, default=200, help="Synthetic emails per run")
+    parser.add_argument("--pt-share", type=float, default=0.5, help="Share of Portuguese emails")
+    parser.add_argument("--request-size", type=int, default=10, help="Emails per request (max 10)")
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent requests")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="Mean stub LLM latency")
+    parser.add_argument("--drop-rate", type=float, default=0.05,
+                        help="Share of batched emails the stub leaves out of its reply")
+    parser.add_argument("--rpm-limit", type=int, default=0, help="LLM_RPM_LIMIT for the run (0 = unlimited)")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    request_size = min(args.request_size, 10)
+
+    if args.worker:
+        emails = synthetic_corpus(args.emails, args.pt_share)
+        print(json.dumps(asyncio.run(run_corpus(emails, request_size, args.clients))))
+        return
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",") if size]
+    runs = {}
+    for batch_size in batch_sizes:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.llm_batching", "--worker", *sys.argv[1:]],
+            cwd=BACKEND_DIR,
+            env={
+                **os.environ,
+                "LLM_PROVIDER": "stub",
+                "STUB_LLM_LATENCY_MS": str(args.llm_latency_ms),
+                "STUB_LLM_LATENCY_JITTER_MS": str(args.llm_latency_ms / 4),
+                "STUB_LLM_ERROR_RATE": "0",
+                "STUB_LLM_BATCH_DROP_RATE": str(args.drop_rate),
+                "LLM_BATCH_SIZE": str(batch_size),
+                "LLM_RPM_LIMIT": str(args.rpm_limit),
+                "RESPONSE_CACHE_BACKEND": "none",
+                "LOCAL_CLASSIFIER_MODEL": "",
+                "PREPROCESS_WORKERS": "0",
+            },
+            stdout=subprocess.PIPE,
+            text=True,
+            check=True,
+        )
+        runs[str(batch_size)] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "settings": {
+            "emails": args.emails,
+            "pt_share": args.pt_share,
+            "request_size": request_size,
+            "clients": args.clients,
+            "llm_latency_ms": args.llm_latency_ms,
+            "drop_rate": args.drop_rate,
+            "rpm_limit": args.rpm_limit,
+        },
+        "batch_sizes": runs,
+    }
+    print_report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Latency and tokens per stage of the two-stage model cascade against one large-model call.
+
+Answers a labeled PT/EN corpus (the campaign templates of
+`benchmarks.near_duplicates`, with ``--non-productive-share`` of greeting
+and spam emails) with `generate_response`, once with ``LLM_CASCADE=0`` and
+once with ``LLM_CASCADE=1``. Every mode runs in a fresh subprocess with the
+stub LLM, ``--clients`` emails in flight, and the response cache,
+near-duplicate index and local classifier disabled. Preprocessing runs
+before the measurement. For each mode it reports:
+
+    - large-model and classifier calls per email;
+    - prompt and completion tokens per email of each stage (``classify``,
+      ``reply``), as counted by ``llm_tokens_total``;
+    - mean time per email of the ``llm_classify`` and ``llm`` stages;
+    - email latency (p50/p95) for productive and non-productive emails,
+      and emails/sec.
+
+The stub stands for both models: ``--llm-latency-ms`` for the large one and
+``--classifier-latency-ms`` for the small one, and it picks categories by
+keywords in both stages, so the run measures cost and latency, not how
+well a real small model classifies. Token counts are the stub's ~4
+characters per token estimate.
+
+Usage (from the ``backend`` directory):
+    python -m benchmarks.model_cascade --emails 300 --non-productive-share 0.4 --output cascade.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.near_duplicates import NAMES, TEMPLATES
+from benchmarks.pipeline import BACKEND_DIR, git_commit, latency_summary
+
+MODES = {"single": "0", "cascade": "1"}
+
+NON_PRODUCTIVE = ("greeting", "spam")
+
+
+def labeled_emails(size: int, non_productive_share: float, seed: int = 0) -> list[tuple[dict, str]]:
+    """``size`` ``(email, category)`` pairs, ``non_productive_share`` of them greeting or spam."""
+    rng = random.Random(seed)
+    pools = {True: [], False: []}
+    for category, languages in TEMPLATES.items():
+        for texts in languages.values():
+            pools[category in NON_PRODUCTIVE] += [(category, text) for text in texts]
+    emails = []
+    for _ in range(size):
+        category, template = rng.choice(pools[rng.random() < non_productive_share])
+        body = template.format(
+            name=rng.choice(NAMES),
+            number=rng.randint(1000, 99999),
+            amount=f"{rng.randint(10, 5000)},{rng.randint(0, 99):02d}",
+            date=f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}",
+        )
+        emails.append(({"subject": " ".join(body.split()[:4]), "body": body}, category))
+    return emails
+
+
+def run_corpus(emails: list[tuple[dict, str]], clients: int) -> dict:
+    """Answer every email with `generate_response`, in this process."""
+    from app.llm import get_llm_classifier_provider, get_llm_provider
+    from app.metrics import LLM_TOKENS, collect_stage_timings
+    from app.pipeline import format_email
+    from app.schemas import Email
+    from app.services import generate_response
+    from app.utils import clean_email_text, preload_nlp_models
+
+    preload_nlp_models()
+    prepared = []
+    for email, category in emails:
+        content = format_email(Email(**email))
+        prepared.append((content, *clean_email_text(content), category))
+
+    def answer(item: tuple) -> tuple:
+        content, cleaned_text, lang, new_content, category = item
+        with collect_stage_timings() as spans:
+            start = time.perf_counter()
+            result = generate_response(content, cleaned_text, lang, new_content=new_content)
+            elapsed = (time.perf_counter() - start) * 1000
+        return category, result["category"], elapsed, spans
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as executor:
+        answers = list(executor.map(answer, prepared))
+    elapsed = time.perf_counter() - start
+
+    count = len(answers)
+    latencies = {"productive": [], "non_productive": []}
+    stage_ms = defaultdict(float)
+    agreement = 0
+    for label, category, latency, spans in answers:
+        latencies["non_productive" if label in NON_PRODUCTIVE else "productive"].append(latency)
+        agreement += label == category
+        for stage, seconds in spans:
+            stage_ms[stage] += seconds * 1000
+
+    classifier = get_llm_classifier_provider()
+    return {
+        "reply_calls_per_email": round(get_llm_provider().calls / count, 3),
+        "classifier_calls_per_email": round(classifier.calls / count, 3),
+        "tokens_per_email": {
+            stage: {
+                kind: round(LLM_TOKENS.value(kind=kind, stage=stage) / count, 1)
+                for kind in ("prompt", "completion")
+            }
+            for stage in ("classify", "reply")
+        },
+        "stage_ms_per_email": {stage: round(stage_ms[stage] / count, 2) for stage in ("llm_classify", "llm")},
+        "category_agreement": round(agreement / count, 4),
+        "latency": {group: latency_summary(values) for group, values in latencies.items() if values},
+        "emails_per_sec": round(count / elapsed, 2),
+    }
+
+
+def print_report(results: dict) -> None:
+    settings = results["settings"]
+    print(f"commit {results['commit']}  python {results['python']}  emails {settings['emails']}  "
+          f"non-productive {settings['non_productive_share']:.0%}  large model {settings['llm_latency_ms']}ms  "
+          f"classifier {settings['classifier_latency_ms']}ms  clients {settings['clients']}\n")
+    header = (f"{'mode':<8} {'calls':>6} {'cls tok':>8} {'reply in':>9} {'reply out':>10} "
+              f"{'cls ms':>7} {'llm ms':>7} {'p50 prod':>9} {'p50 non':>8} {'p95':>8} {'emails/s':>9}")
+    print(header)
+    print("-" * len(header))
+    for mode, row in results["modes"].items():
+        tokens = row["tokens_per_email"]
+        latency = row["latency"]
+        p95 = max(group["p95_ms"] for group in latency.values())
+        print(f"{mode:<8} {row['reply_calls_per_email']:>6} "
+              f"{tokens['classify']['prompt'] + tokens['classify']['completion']:>8.1f} "
+              f"{tokens['reply']['prompt']:>9} {tokens['reply']['completion']:>10} "
+              f"{row['stage_ms_per_email']['llm_classify']:>7} {row['stage_ms_per_email']['llm']:>7} "
+              f"{latency.get('productive', {}).get('p50_ms', '-'):>9} "
+              f"{latency.get('non_productive', {}).get('p50_ms', '-'):>8} {p95:>8} {row['emails_per_sec']:>9}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", default="single,cascade", help="Comma-separated modes (single, cascade)")
+    parser.add_argument("--emails", type=int, default=300)
+    parser.add_argument("--non-productive-share", type=float, default=0.4,
+                        help="Share of greeting and spam emails in the corpus")
+    parser.add_argument("--clients", type=int, default=8, help="Emails in flight at once")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="Mean stub latency of the large model")
+    parser.add_argument("--classifier-latency-ms", type=float, default=50.0,
+                        help="Mean stub latency of the classifier model")
+    parser.add_argument("--completion-tokens", type=int, default=250, help="Stub completion tokens per reply")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        emails = labeled_emails(args.emails, args.non_productive_share)
+        print(json.dumps(run_corpus(emails, args.clients)))
+        return
+
+    runs = {}
+    for mode in (m for m in args.modes.split(",") if m):
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.model_cascade", "--worker", *sys.argv[1:]],
+            cwd=BACKEND_DIR,
+            env={
+                **os.environ,
+                "LLM_PROVIDER": "stub",
+                "LLM_CASCADE": MODES[mode],
+                "STUB_LLM_LATENCY_MS": str(args.llm_latency_ms),
+                "STUB_LLM_LATENCY_JITTER_MS": str(args.llm_latency_ms / 4),
+                "STUB_LLM_CLASSIFIER_LATENCY_MS": str(args.classifier_latency_ms),
+                "STUB_LLM_COMPLETION_TOKENS": str(args.completion_tokens),
+                "STUB_LLM_ERROR_RATE": "0",
+                "RESPONSE_CACHE_BACKEND": "none",
+                "NEAR_DUPLICATE_REUSE": "none",
+                "LOCAL_CLASSIFIER_MODEL": "",
+                "PREPROCESS_WORKERS": "0",
+            },
+            stdout=subprocess.PIPE,
+            text=True,
+            check=True,
+        )
+        runs[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "settings": {
+            "emails": args.emails,
+            "non_productive_share": args.non_productive_share,
+            "clients": args.clients,
+            "llm_latency_ms": args.llm_latency_ms,
+            "classifier_latency_ms": args.classifier_latency_ms,
+            "completion_tokens": args.completion_tokens,
+        },
+        "modes": runs,
+    }
+    print_report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
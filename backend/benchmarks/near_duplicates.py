@@ -0,0 +1,213 @@
+"""Similarity vs. accuracy of the near-duplicate index.
+
+Generates a labeled stream of campaign-like emails: PT/EN templates of every
+category (including invoice emails of three categories worded almost the
+same), filled with random names, dates, amounts and invoice numbers,
+with the greeting varied and sentences added or dropped at random, and some
+templates far more frequent than others. The stream goes through
+`clean_email_text` and then, for every ``--distances`` value, through a
+fresh `NearDuplicateIndex`:
+
+    - an email with a near duplicate in the index counts as answered
+      without the LLM, correctly or not (its category against the label);
+    - any other email is "classified by the LLM" (the label) and indexed.
+
+Reported per distance: share of emails answered from the index (LLM calls
+saved), accuracy of the reused categories, and the exact-match response
+cache hit rate on the same stream for comparison. ``--max-entries`` bounds
+the index, to see the effect of eviction.
+
+Usage (from the ``backend`` directory):
+    python -m benchmarks.near_duplicates --emails 2000 --distances 0,3,6,10
+"""
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+# Campaign templates per category and language
+TEMPLATES = {
+    "payment_issue": {
+        "pt": ["Tentei pagar o boleto da fatura {number} no valor de R$ {amount} mas o banco recusou o pagamento. "
+               "Podem verificar o que aconteceu com a minha cobrança? Preciso quitar antes de {date}.",
+               "Fui cobrado duas vezes pela fatura {number} em {date}. Solicito o estorno da cobrança duplicada "
+               "de R$ {amount} o quanto antes.",
+               "Não consegui pagar a fatura {number} de R$ {amount} que vence em {date}. O boleto não abre no "
+               "aplicativo do banco. Podem me enviar um novo boleto da fatura?"],
+        "en": ["I tried to pay invoice {number} for ${amount} but my card was declined. "
+               "Can you check what happened with the charge? I need to pay it before {date}.",
+               "I was charged twice for invoice {number} on {date}. Please refund the duplicate charge "
+               "of ${amount} as soon as possible.",
+               "I could not pay invoice {number} of ${amount} due on {date}. The payment link does not open in "
+               "my bank app. Can you send me a new payment link for the invoice?"],
+    },
+    "technical_support": {
+        "pt": ["Não consigo acessar o sistema desde {date}. A senha é recusada mesmo depois de redefinir. "
+               "Meu usuário é {name} e o protocolo anterior foi {number}.",
+               "O aplicativo fecha sozinho ao abrir o relatório {number}. Já reinstalei e o erro continua "
+               "aparecendo no meu celular."],
+        "en": ["I cannot access the system since {date}. My password is rejected even after a reset. "
+               "My username is {name} and the previous ticket was {number}.",
+               "The app crashes when I open report {number}. I already reinstalled it and the error keeps "
+               "showing up on my phone."],
+    },
+    "information_request": {
+        "pt": ["Gostaria de saber como funciona a renovação do contrato {number} que vence em {date}. "
+               "Quais são os planos disponíveis e os valores?",
+               "Vocês emitem nota fiscal para pessoa jurídica? Preciso das informações para o pedido {number}.",
+               "Ainda não paguei a fatura {number} de R$ {amount} que vence em {date}. Antes de pagar o boleto, "
+               "podem me dizer quais outras formas de pagamento da fatura vocês aceitam?"],
+        "en": ["I would like to know how the renewal of contract {number} expiring on {date} works. "
+               "Which plans are available and how much do they cost?",
+               "Do you issue invoices for companies? I need the details for order {number}.",
+               "I have not paid invoice {number} of ${amount} due on {date} yet. Before paying, can you tell me "
+               "which other payment methods you accept for the invoice?"],
+    },
+    "greeting": {
+        "pt": ["Desejo a toda a equipe um feliz natal e um próspero ano novo! Obrigado pela parceria em {date}.",
+               "Parabéns pelo excelente trabalho no projeto {number}. Foi um prazer trabalhar com vocês."],
+        "en": ["Wishing the whole team a merry christmas and a happy new year! Thanks for the partnership in {date}.",
+               "Congratulations on the excellent work on project {number}. It was a pleasure working with you."],
+    },
+    "complaint": {
+        "pt": ["Estou muito insatisfeito com o atendimento. Abri o chamado {number} em {date} e até agora "
+               "ninguém respondeu. Isso é um absurdo.",
+               "A cobrança da fatura {number} veio com valor errado de R$ {amount} e o suporte não resolve. "
+               "Estou cansado de esperar.",
+               "Já paguei a fatura {number} de R$ {amount} em {date} e vocês continuam cobrando o boleto. "
+               "Estou revoltado com esse descaso com a minha fatura."],
+        "en": ["I am very unhappy with your support. I opened ticket {number} on {date} and nobody has "
+               "answered yet. This is unacceptable.",
+               "The charge on invoice {number} came with the wrong amount of ${amount} and support does not "
+               "fix it. I am tired of waiting.",
+               "I already paid invoice {number} of ${amount} on {date} and you keep charging me for it. "
+               "I am outraged by this disregard for my invoice."],
+    },
+    "spam": {
+        "pt": ["Parabéns {name}! Você ganhou um desconto exclusivo de {amount}% em toda a loja. "
+               "Clique no link abaixo até {date} para resgatar o seu prêmio.",
+               "Oferta imperdível: empréstimo aprovado de R$ {amount} sem consulta. Responda com seu CPF."],
+        "en": ["Congratulations {name}! You won an exclusive {amount}% discount on the whole store. "
+               "Click the link below before {date} to claim your prize.",
+               "Amazing offer: loan of ${amount} approved with no credit check. Reply with your details."],
+    },
+}
+
+GREETINGS = {"pt": ["Olá,", "Bom dia,", "Prezados,", "Oi, tudo bem?", ""], "en": ["Hi,", "Hello,", "Dear team,", ""]}
+EXTRA_SENTENCES = {
+    "pt": ["Aguardo retorno.", "Obrigado desde já.", "Qualquer dúvida estou à disposição."],
+    "en": ["Looking forward to your reply.", "Thanks in advance.", "Let me know if you need anything else."],
+}
+NAMES = ["Ana Souza", "Bruno Lima", "Carla Dias", "Diego Alves", "Elisa Rocha", "Fábio Nunes",
+         "John Smith", "Mary Jones", "Peter Brown", "Linda Clark", "James Wilson", "Susan Taylor"]
+
+
+def campaign_stream(size: int, seed: int = 0) -> list[tuple[dict, str]]:
+    """``size`` ``(email, category)`` pairs drawn from `TEMPLATES` with Zipf-like popularity."""
+    rng = random.Random(seed)
+    templates = [
+        (category, lang, template)
+        for category, languages in TEMPLATES.items()
+        for lang, texts in languages.items()
+        for template in texts
+    ]
+    rng.shuffle(templates)
+    weights = [1 / (rank + 1) for rank in range(len(templates))]
+    stream = []
+    for category, lang, template in rng.choices(templates, weights, k=size):
+        name = rng.choice(NAMES)
+        sentences = template.format(
+            name=name,
+            number=rng.randint(1000, 99999),
+            amount=f"{rng.randint(10, 5000)},{rng.randint(0, 99):02d}",
+            date=f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}",
+        ).split(". ")
+        if len(sentences) > 1 and rng.random() < 0.2:
+            sentences.pop(rng.randrange(1, len(sentences)))
+        body = ". ".join(sentences)
+        if rng.random() < 0.3:
+            body += " " + rng.choice(EXTRA_SENTENCES[lang])
+        body = f"{rng.choice(GREETINGS[lang])} {body}\n\n{name}".strip()
+        subject = " ".join(template.split()[:4]).format(name=name, number="", amount="", date="")
+        stream.append(({"subject": subject, "body": body}, category))
+    return stream
+
+
+def replay(cleaned: list[tuple[str, str]], labels: list[str], max_distance: int, max_entries: int) -> dict:
+    """Run the stream through a fresh index with the given distance."""
+    from app.near_duplicates import NearDuplicateIndex
+
+    index = NearDuplicateIndex(max_distance, max_entries)
+    correct = wrong = 0
+    start = time.perf_counter()
+    for (text, lang), label in zip(cleaned, labels):
+        match = index.get(text, lang)
+        if match is None:
+            index.add(text, lang, {"category": label})
+        elif match[0]["category"] == label:
+            correct += 1
+        else:
+            wrong += 1
+    elapsed = time.perf_counter() - start
+    reused = correct + wrong
+    return {
+        "reused_share": round(reused / len(labels), 4),
+        "reuse_accuracy": round(correct / reused, 4) if reused else None,
+        "wrong_share": round(wrong / len(labels), 4),
+        "entries": index.stats()["entries"],
+        "ms_per_email": round(elapsed * 1000 / len(labels), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--distances", default="0,3,6,10,14", help="Comma-separated NEAR_DUPLICATE_MAX_DISTANCE values")
+    parser.add_argument("--max-entries", type=int, default=10000, help="NEAR_DUPLICATE_MAX_ENTRIES")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    from app.cache import ResponseCache
+    from app.pipeline import format_email
+    from app.schemas import Email
+    from app.utils import clean_email_text, preload_nlp_models
+
+    preload_nlp_models()
+    stream = campaign_stream(args.emails)
+    labels = [category for _, category in stream]
+    cleaned = [clean_email_text(format_email(Email(**email)))[:2] for email, _ in stream]
+    if not any(text.strip() for text, _ in cleaned):
+        # spaCy models without a lemmatizer produce no lemmas at all
+        print("No lemmas from the installed spaCy models: fingerprinting lowercased words instead\n")
+        from app.extraction import extract_new_content
+        from app.utils import _remove_noise
+        cleaned = [
+            (" ".join(_remove_noise(extract_new_content(format_email(Email(**email)))).lower().split()), lang)
+            for (email, _), (_, lang) in zip(stream, cleaned)
+        ]
+
+    seen = set()
+    exact_hits = 0
+    for text, lang in cleaned:
+        key = ResponseCache.make_key(text, lang)
+        exact_hits += key in seen
+        seen.add(key)
+
+    results = {"emails": len(stream), "exact_cache_hit_rate": round(exact_hits / len(stream), 4), "distances": {}}
+    print(f"exact-match cache hit rate: {results['exact_cache_hit_rate']:.1%}\n")
+    header = f"{'distance':>8} {'reused':>8} {'accuracy':>9} {'wrong':>7} {'entries':>8} {'ms/email':>9}"
+    print(header)
+    print("-" * len(header))
+    for distance in (int(d) for d in args.distances.split(",") if d):
+        row = results["distances"][str(distance)] = replay(cleaned, labels, distance, args.max_entries)
+        accuracy = f"{row['reuse_accuracy']:.1%}" if row["reuse_accuracy"] is not None else "-"
+        print(f"{distance:>8} {row['reused_share']:>8.1%} {accuracy:>9} {row['wrong_share']:>7.1%} "
+              f"{row['entries']:>8} {row['ms_per_email']:>9}")
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""End-to-end benchmark of the classification pipeline with a stubbed LLM.
+
+Runs in a fresh subprocess with ``LLM_PROVIDER=stub`` and the response cache
+disabled, so numbers reflect the service itself rather than Groq or cache
+luck. For each corpus (``emailsTest.json`` plus synthetic corpora of every
+size and language mix requested) it measures:
+
+    - the `clean_email_text` stages separately: new-content extraction,
+      regex noise removal, language detection and spaCy lemmatization;
+    - prompt building (system prompt lookup + user message);
+    - full ``POST /process-email`` requests through an in-process ASGI client.
+
+and reports p50/p95/p99 latency per stage, emails/sec, peak RSS, and the
+import and warm-up (startup) time of the app. ``--output`` writes the
+results as JSON tagged with the git commit; ``--compare`` prints the change
+of every metric against a previous results file.
+
+Usage (from the ``backend`` directory):
+    python -m benchmarks.pipeline --sizes 10,100 --mixes pt,en,mixed --output bench.json
+    python -m benchmarks.pipeline --compare bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from benchmarks.spacy_pipeline import percentile, rss_mb
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Share of Portuguese emails per language mix
+LANGUAGE_MIXES = {"pt": 1.0, "en": 0.0, "mixed": 0.5}
+
+# Building blocks of synthetic emails: (subject, body sentences) per language
+SYNTHETIC_PHRASES = {
+    "pt": {
+        "subjects": [
+            "Problema com pagamento", "Erro ao acessar o sistema", "Dúvida sobre o contrato",
+            "Feliz aniversário", "Reclamação sobre o atendimento", "Promoção imperdível",
+        ],
+        "sentences": [
+            "Não consigo pagar o boleto da fatura deste mês.",
+            "O sistema apresenta erro quando tento fazer login com minha senha.",
+            "Gostaria de saber como funciona a renovação do contrato.",
+            "Desejo a toda a equipe um excelente final de ano.",
+            "Estou muito insatisfeito com o tempo de resposta do suporte.",
+            "Ganhe um desconto exclusivo clicando no link abaixo.",
+            "Segue em anexo o comprovante para análise.",
+            "Aguardo um retorno o mais breve possível.",
+        ],
+    },
+    "en": {
+        "subjects": [
+            "Payment problem", "Error accessing the system", "Question about the contract",
+            "Happy birthday", "Complaint about support", "Exclusive offer",
+        ],
+        "sentences": [
+            "I cannot pay the invoice for this month.",
+            "The system shows an error when I try to log in with my password.",
+            "I would like to know how the contract renewal works.",
+            "Wishing the whole team a wonderful end of the year.",
+            "I am very disappointed with the support response time.",
+            "Win an exclusive discount by clicking the link below.",
+            "Please find the receipt attached for your review.",
+            "I look forward to hearing from you as soon as possible.",
+        ],
+    },
+}
+
+
+def synthetic_corpus(size: int, pt_share: float, seed: int = 0) -> list[dict]:
+    """Generate ``size`` emails, ``pt_share`` of them in Portuguese.
+
+    Bodies have 2-12 sentences plus an occasional URL or address, so the
+    regex, detection and spaCy stages see a realistic spread of lengths.
+    """
+    rng = random.Random(seed)
+    emails = []
+    for index in range(size):
+        phrases = SYNTHETIC_PHRASES["pt" if rng.random() < pt_share else "en"]
+        sentences = rng.choices(phrases["sentences"], k=rng.randint(2, 12))
+        if rng.random() < 0.3:
+            sentences.append(f"https://example.com/ticket/{index} contato{index}@example.com")
+        emails.append({"subject": rng.choice(phrases["subjects"]), "body": " ".join(sentences)})
+    return emails
+
+
+def latency_summary(latencies_ms: list[float]) -> dict:
+    """p50/p95/p99 and mean of a list of latencies in milliseconds."""
+    return {
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 3),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def time_stages(emails: list[dict], repeat: int) -> dict:
+    """Time each stage of `clean_email_text` and prompt building per email."""
+    from app.pipeline import format_email
+    from app.prompts import build_user_message, get_system_prompt
+    from app.schemas import Email
+    from app.extraction import extract_new_content
+    from app.utils import _detect_language, _lemmatize, _remove_noise, get_spacy_model
+
+    texts = [format_email(Email(**email)) for email in emails]
+    stages = {"extract": [], "regex": [], "detect": [], "spacy": [], "prompt": []}
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            extracted = extract_new_content(text)
+            after_extract = time.perf_counter()
+            stripped = _remove_noise(extracted)
+            after_regex = time.perf_counter()
+            lang = _detect_language(stripped)
+            after_detect = time.perf_counter()
+            nlp = get_spacy_model(lang)
+            cleaned = _lemmatize(nlp(stripped)) if nlp else " ".join(stripped.lower().split())
+            after_spacy = time.perf_counter()
+            get_system_prompt(lang)
+            build_user_message(extracted)
+            after_prompt = time.perf_counter()
+
+            stages["extract"].append((after_extract - start) * 1000)
+            stages["regex"].append((after_regex - after_extract) * 1000)
+            stages["detect"].append((after_detect - after_regex) * 1000)
+            stages["spacy"].append((after_spacy - after_detect) * 1000)
+            stages["prompt"].append((after_prompt - after_spacy) * 1000)
+
+    return {stage: latency_summary(values) for stage, values in stages.items()}
+
+
+async def time_requests(app, emails: list[dict], batch_size: int, clients: int) -> dict:
+    """Send the corpus to ``/process-email`` from ``clients`` concurrent clients."""
+    import httpx
+
+    batches = [emails[i:i + batch_size] for i in range(0, len(emails), batch_size)]
+    queue = asyncio.Queue()
+    for batch in batches:
+        queue.put_nowait(batch)
+    latencies, errors = [], 0
+
+    async def client_loop(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while not queue.empty():
+            batch = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.post("/process-email", json={"emails": batch})
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code != 200
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(batches),
+        "errors": errors,
+        **latency_summary(latencies),
+        "emails_per_sec": round(len(emails) / elapsed, 2),
+    }
+
+
+async def run_benchmark(corpora: dict, repeat: int, batch_size: int, clients: int) -> dict:
+    """Measure startup, stages and requests in this process."""
+    rss_start = rss_mb()
+    import_start = time.perf_counter()
+    from app.main import app
+    from app.warmup import warmup_state
+    import_seconds = time.perf_counter() - import_start
+
+    results = {"corpora": {}}
+    async with app.router.lifespan_context(app):
+        while not warmup_state.ready and warmup_state.error is None:
+            await asyncio.sleep(0.01)
+        if warmup_state.error:
+            raise RuntimeError(f"Warm-up failed: {warmup_state.error}")
+        results["startup"] = {
+            "import_s": round(import_seconds, 3),
+            "warmup_s": round(warmup_state.duration, 3),
+            "rss_after_startup_mb": round(rss_mb(), 1),
+            "rss_startup_delta_mb": round(rss_mb() - rss_start, 1),
+        }
+
+        for name, emails in corpora.items():
+            results["corpora"][name] = {
+                "emails": len(emails),
+                "stages": time_stages(emails, repeat),
+                "requests": await time_requests(app, emails, batch_size, clients),
+            }
+
+    results["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return results
+
+
+def build_corpora(corpus: Path, sizes: list[int], mixes: list[str]) -> dict:
+    """``emailsTest.json`` plus one synthetic corpus per size and language mix."""
+    with open(corpus, encoding="utf-8") as f:
+        corpora = {corpus.stem: json.load(f)}
+    for mix in mixes:
+        for size in sizes:
+            corpora[f"synthetic-{mix}-{size}"] = synthetic_corpus(size, LANGUAGE_MIXES[mix])
+    return corpora
+
+
+def git_commit() -> str:
+    """Short hash of the checked-out commit, or ``"unknown"``."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(results: dict) -> dict[str, float]:
+    """Flatten nested results into ``"a.b.c": value`` numeric metrics."""
+    flat = {}
+
+    def walk(prefix: str, value) -> None:
+        if isinstance(value, dict):
+            for key, inner in value.items():
+                walk(f"{prefix}.{key}" if prefix else key, inner)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix] = value
+
+    walk("", {k: v for k, v in results.items() if k in ("startup", "corpora", "peak_rss_mb")})
+    return flat
+
+
+def print_report(results: dict) -> None:
+    startup = results["startup"]
+    print(f"commit {results['commit']}  python {results['python']}  stub latency "
+          f"{results['settings']['llm_latency_ms']}ms")
+    print(f"import {startup['import_s']}s  warm-up {startup['warmup_s']}s  "
+          f"RSS after startup {startup['rss_after_startup_mb']} MiB  peak RSS {results['peak_rss_mb']} MiB\n")
+
+    header = f"{'corpus':<24} {'stage':<8} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'emails/s':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, corpus in results["corpora"].items():
+        rows = [*corpus["stages"].items(), ("request", corpus["requests"])]
+        for stage, summary in rows:
+            rate = summary.get("emails_per_sec", "")
+            print(f"{name:<24} {stage:<8} {summary['p50_ms']:>9} {summary['p95_ms']:>9} "
+                  f"{summary['p99_ms']:>9} {rate:>9}")
+
+
+def print_comparison(baseline: dict, current: dict) -> None:
+    """Print every metric present in both runs with its relative change."""
+    before, after = flatten(baseline), flatten(current)
+    print(f"{'metric':<60} {baseline['commit']:>10} {current['commit']:>10} {'change':>8}")
+    for metric in sorted(before.keys() & after.keys()):
+        old, new = before[metric], after[metric]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "-"
+        print(f"{metric:<60} {old:>10} {new:>10} {change:>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=BACKEND_DIR / "emailsTest.json")
+    parser.add_argument("--sizes", default="10,100", help="Comma-separated synthetic corpus sizes")
+    parser.add_argument("--mixes", default="pt,en,mixed", help=f"Language mixes: {', '.join(LANGUAGE_MIXES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over each corpus for stage timings")
+    parser.add_argument("--batch-size", type=int, default=1, help="Emails per /process-email request (max 10)")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent HTTP clients")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="Mean stub LLM latency")
+    parser.add_argument("--preprocess-workers", type=int, default=0, help="PREPROCESS_WORKERS for the run")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--compare", type=Path, help="Previous results JSON to compare against")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    mixes = [mix for mix in args.mixes.split(",") if mix]
+    unknown = set(mixes) - LANGUAGE_MIXES.keys()
+    if unknown:
+        parser.error(f"unknown language mixes: {', '.join(sorted(unknown))}")
+
+    if args.worker:
+        corpora = build_corpora(args.corpus, sizes, mixes)
+        results = asyncio.run(run_benchmark(corpora, args.repeat, min(args.batch_size, 10), args.clients))
+        print(json.dumps(results))
+        return
+
+    forwarded = [arg for arg in sys.argv[1:] if arg != "--json"]
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.pipeline", "--worker", *forwarded],
+        cwd=BACKEND_DIR,
+        env={
+            **os.environ,
+            "LLM_PROVIDER": "stub",
+            "STUB_LLM_LATENCY_MS": str(args.llm_latency_ms),
+            "STUB_LLM_LATENCY_JITTER_MS": str(args.llm_latency_ms / 4),
+            "STUB_LLM_ERROR_RATE": "0",
+            "RESPONSE_CACHE_BACKEND": "none",
+            "LOCAL_CLASSIFIER_MODEL": "",
+            "PREPROCESS_WORKERS": str(args.preprocess_workers),
+        },
+        stdout=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "settings": {
+            "sizes": sizes,
+            "mixes": mixes,
+            "repeat": args.repeat,
+            "batch_size": min(args.batch_size, 10),
+            "clients": args.clients,
+            "llm_latency_ms": args.llm_latency_ms,
+            "preprocess_workers": args.preprocess_workers,
+        },
+        **json.loads(proc.stdout.strip().splitlines()[-1]),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print()
+            print_comparison(json.load(f), results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Memory and throughput of the serving modes, with a stubbed LLM.
+
+Starts the API as a real server in each requested mode:
+
+    - ``uvicorn``: the Dockerfile's single ``uvicorn app.main:app`` process
+      (with its ``PREPROCESS_WORKERS`` preprocessing pool);
+    - ``uvicorn-workers``: ``uvicorn --workers N``, every worker loading its
+      own models;
+    - ``gunicorn``: ``gunicorn -c gunicorn.conf.py`` with ``N`` workers forked
+      after the models were loaded in the master.
+
+For each mode it drives ``POST /process-email`` with concurrent clients
+and reports emails/sec and request latency, then the memory of every
+process of the server: RSS, and PSS (proportional set size, which splits
+shared pages between the processes sharing them, so the PSS total is the
+memory the mode really uses). Copy-on-write sharing shows up as a PSS well
+below the RSS.
+
+Usage (from the ``backend`` directory):
+    python -m benchmarks.serving --modes uvicorn,gunicorn --workers 4 --output serving.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+import httpx
+from benchmarks.pipeline import git_commit, latency_summary, synthetic_corpus
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+MODES = ("uvicorn", "uvicorn-workers", "gunicorn")
+
+
+def server_command(mode: str, port: int, workers: int) -> list[str]:
+    if mode == "uvicorn":
+        return [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)]
+    if mode == "uvicorn-workers":
+        return [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                "--workers", str(workers)]
+    return [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"]
+
+
+def process_tree(root: int) -> list[int]:
+    """PIDs of ``root`` and all its descendants."""
+    children: dict[int, list[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                ppid = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, []))
+    return tree
+
+
+def memory_mb(pid: int) -> dict:
+    """RSS and PSS of one process in MiB (from ``/proc/<pid>/smaps_rollup``)."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as rollup:
+        for line in rollup:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0][:-1].lower() + "_mb"] = round(int(parts[1]) / 1024, 1)
+    return values
+
+
+def server_memory(root: int) -> dict:
+    processes = []
+    for pid in process_tree(root):
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as cmdline:
+                name = cmdline.read().replace(b"\0", b" ").decode(errors="replace").strip()
+            processes.append({"pid": pid, "cmd": name[:60], **memory_mb(pid)})
+        except OSError:
+            continue
+    return {
+        "processes": processes,
+        "total_rss_mb": round(sum(p.get("rss_mb", 0) for p in processes), 1),
+        "total_pss_mb": round(sum(p.get("pss_mb", 0) for p in processes), 1),
+    }
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    """Wait until ``/ready`` answers 200 several times in a row (every worker)."""
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while streak < 10:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Server did not become ready in time")
+        try:
+            response = await client.get("/ready")
+            streak = streak + 1 if response.status_code == 200 else 0
+        except httpx.TransportError:
+            streak = 0
+        await asyncio.sleep(0.05 if streak else 0.25)
+
+
+async def drive_load(client: httpx.AsyncClient, emails: list[dict], clients: int) -> dict:
+    """Send every email as a one-email request from ``clients`` concurrent clients."""
+    queue = list(enumerate(emails))
+    latencies = []
+
+    async def worker():
+        while queue:
+            index, email = queue.pop()
+            email = {**email, "subject": f"{email['subject']} #{index}"}
+            start = time.perf_counter()
+            response = await client.post("/process-email", json={"emails": [email]})
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    return {**latency_summary(latencies), "emails_per_sec": round(len(emails) / elapsed, 2)}
+
+
+async def run_mode(mode: str, args, emails: list[dict]) -> dict:
+    env = {
+        **os.environ,
+        "PORT": str(args.port),
+        "LLM_PROVIDER": "stub",
+        "STUB_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "STUB_LLM_LATENCY_JITTER_MS": str(args.llm_latency_ms / 4),
+        "STUB_LLM_ERROR_RATE": "0",
+        "RESPONSE_CACHE_BACKEND": "none",
+        "LOCAL_CLASSIFIER_MODEL": "",
+        "JOB_STORE_PATH": str(Path(args.job_store).resolve()),
+    }
+    # uvicorn also reads WEB_CONCURRENCY as its worker count
+    env.pop("WEB_CONCURRENCY", None)
+    if mode == "gunicorn":
+        env["WEB_CONCURRENCY"] = str(args.workers)
+    else:
+        env["PREPROCESS_WORKERS"] = str(args.preprocess_workers)
+    server = subprocess.Popen(
+        server_command(mode, args.port, args.workers),
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.clients)
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.port}", timeout=60, limits=limits
+        ) as client:
+            start = time.perf_counter()
+            await wait_ready(client, args.startup_timeout)
+            startup_s = round(time.perf_counter() - start, 2)
+            idle = server_memory(server.pid)
+            load = await drive_load(client, emails, args.clients)
+            loaded = server_memory(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {"startup_s": startup_s, "requests": load, "memory_idle": idle, "memory_loaded": loaded}
+
+
+def print_report(results: dict) -> None:
+    settings = results["settings"]
+    print(f"commit {results['commit']}  python {results['python']}  workers {settings['workers']}  "
+          f"clients {settings['clients']}  stub latency {settings['llm_latency_ms']}ms\n")
+    header = (f"{'mode':<16} {'procs':>5} {'RSS MiB':>9} {'PSS MiB':>9} {'PSS/proc':>9} "
+              f"{'emails/s':>9} {'p50_ms':>9} {'p95_ms':>9}")
+    print(header)
+    print("-" * len(header))
+    for mode, result in results["modes"].items():
+        memory = result["memory_loaded"]
+        procs = len(memory["processes"])
+        print(f"{mode:<16} {procs:>5} {memory['total_rss_mb']:>9} {memory['total_pss_mb']:>9} "
+              f"{memory['total_pss_mb'] / procs:>9.1f} {result['requests']['emails_per_sec']:>9} "
+              f"{result['requests']['p50_ms']:>9} {result['requests']['p95_ms']:>9}")
+    print()
+    for mode, result in results["modes"].items():
+        for process in result["memory_loaded"]["processes"]:
+            print(f"{mode:<16} pid {process['pid']:<8} RSS {process.get('rss_mb', 0):>7} "
+                  f"PSS {process.get('pss_mb', 0):>7}  {process['cmd']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", default="uvicorn,gunicorn", help=f"Comma-separated: {', '.join(MODES)}")
+    parser.add_argument("--workers", type=int, default=4, help="Workers of the multi-process modes")
+    parser.add_argument("--emails", type=int, default=400, help="Emails sent per mode")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent HTTP clients")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="Mean stub LLM latency")
+    parser.add_argument("--preprocess-workers", type=int, default=1,
+                        help="PREPROCESS_WORKERS of the uvicorn modes (gunicorn uses 0)")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--startup-timeout", type=float, default=180.0)
+    parser.add_argument("--job-store", default="benchmark-jobs.sqlite3")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    modes = [mode for mode in args.modes.split(",") if mode]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+
+    emails = synthetic_corpus(args.emails, 0.5)
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "settings": {
+            "workers": args.workers,
+            "emails": args.emails,
+            "clients": args.clients,
+            "llm_latency_ms": args.llm_latency_ms,
+            "preprocess_workers": args.preprocess_workers,
+        },
+        "modes": {mode: asyncio.run(run_mode(mode, args, emails)) for mode in modes},
+    }
+    print_report(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark `clean_email_text` with the full vs. minimal spaCy pipeline.
+
+Each mode runs in a fresh subprocess (``SPACY_PIPELINE=full|minimal``) so its
+resident memory reflects only the models it loaded. Reports per-email
+latency, RSS after loading the models, and a digest of the cleaned output to
+confirm both modes produce the same lemmas.
+
+Usage (from the ``backend`` directory):
+    python -m benchmarks.spacy_pipeline [--corpus emailsTest.json] [--repeat 20]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MiB."""
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def load_corpus(path: Path) -> list[str]:
+    """Load a JSON list of ``{"subject", "body"}`` emails as pipeline input text."""
+    with open(path, encoding="utf-8") as corpus:
+        emails = json.load(corpus)
+    return [f"Subject: {e['subject']}\n\nBody: {e['body']}" for e in emails]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_mode(corpus: Path, repeat: int) -> dict:
+    """Measure the pipeline selected by ``SPACY_PIPELINE`` in this process."""
+    from app.utils import clean_email_text, preload_nlp_models
+
+    rss_start = rss_mb()
+    load_start = time.perf_counter()
+    preload_nlp_models()
+    load_seconds = time.perf_counter() - load_start
+    rss_models = rss_mb()
+
+    texts = load_corpus(corpus)
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(clean_email_text(text)[0].encode("utf-8"))
+
+    latencies = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            clean_email_text(text)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "pipeline": os.environ.get("SPACY_PIPELINE", "minimal"),
+        "emails": len(latencies),
+        "model_load_s": round(load_seconds, 3),
+        "rss_models_mb": round(rss_models - rss_start, 1),
+        "rss_total_mb": round(rss_mb(), 1),
+        "latency_mean_ms": round(statistics.mean(latencies), 3),
+        "latency_p50_ms": round(percentile(latencies, 50), 3),
+        "latency_p95_ms": round(percentile(latencies, 95), 3),
+        "output_digest": digest.hexdigest()[:16],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=BACKEND_DIR / "emailsTest.json")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the corpus")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_mode(args.corpus, args.repeat)))
+        return
+
+    results = []
+    for mode in ("full", "minimal"):
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.spacy_pipeline", "--worker",
+             "--corpus", str(args.corpus), "--repeat", str(args.repeat)],
+            cwd=BACKEND_DIR,
+            env={**os.environ, "SPACY_PIPELINE": mode, "PREPROCESS_WORKERS": "0"},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    columns = list(results[0].keys())
+    print("  ".join(f"{c:>16}" for c in columns))
+    for row in results:
+        print("  ".join(f"{str(row[c]):>16}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
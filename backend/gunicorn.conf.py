@@ -0,0 +1,41 @@
+"""Gunicorn settings for the multi-process serving mode.
+
+``uvicorn --workers N`` imports the app and loads both spaCy models in every
+worker. Here the app is imported once in the master (``preload_app``), the
+models are loaded there by `preload_for_fork` before any worker is forked,
+and the workers share those pages copy-on-write.
+
+Preprocessing runs in each worker's thread pool (``PREPROCESS_WORKERS=0``
+unless set explicitly), since a per-worker process pool would load its own
+copy of the models again.
+
+Usage (from the ``backend`` directory):
+    WEB_CONCURRENCY=4 gunicorn -c gunicorn.conf.py app.main:app
+"""
+
+import os
+
+# Read by app.config when the app is preloaded below
+os.environ.setdefault("PREPROCESS_WORKERS", "0")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# uvicorn.workers is deprecated; the worker now ships as the uvicorn-worker package
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+# LLM calls can take a while; the app enforces its own deadlines
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    """Load the models in the master once the app is imported, before forking."""
+    from app.warmup import preload_for_fork
+
+    timings = preload_for_fork()
+    server.log.info(
+        "Models loaded before fork: "
+        + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+    )
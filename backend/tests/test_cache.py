@@ -0,0 +1,70 @@
+"""TTL expiry and LRU eviction of the response cache backends."""
+
+import pytest
+from app import cache
+from app.cache import DiskCacheBackend, MemoryCacheBackend, ResponseCache
+
+
+class Clock:
+    """Stands in for the `time` module, advanced by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "disk"])
+def make_backend(request, tmp_path):
+    def make(ttl: float, max_entries: int):
+        if request.param == "memory":
+            return MemoryCacheBackend(ttl, max_entries)
+        return DiskCacheBackend(str(tmp_path / "cache.sqlite3"), ttl, max_entries)
+    return make
+
+
+def test_entries_expire_after_the_ttl(clock, make_backend):
+    backend = make_backend(ttl=60, max_entries=10)
+    backend.set("a", {"category": "greeting"})
+
+    clock.now += 59
+    assert backend.get("a") == {"category": "greeting"}
+    clock.now += 2
+    assert backend.get("a") is None
+
+
+def test_least_recently_used_entry_is_evicted(clock, make_backend):
+    backend = make_backend(ttl=60, max_entries=2)
+    backend.set("a", {"category": "a"})
+    clock.now += 1
+    backend.set("b", {"category": "b"})
+    clock.now += 1
+    # Reading "a" makes "b" the least recently used
+    assert backend.get("a") == {"category": "a"}
+    clock.now += 1
+    backend.set("c", {"category": "c"})
+
+    assert len(backend) == 2
+    assert backend.get("b") is None
+    assert backend.get("a") == {"category": "a"}
+    assert backend.get("c") == {"category": "c"}
+
+
+def test_keys_ignore_case_and_whitespace_and_count_hits(make_backend):
+    response_cache = ResponseCache(make_backend(ttl=60, max_entries=10))
+    response_cache.set("Preciso  da fatura", "pt", {"category": "billing", "detected_language": "pt"})
+
+    assert response_cache.get("preciso da fatura", "pt") == {"category": "billing"}
+    assert response_cache.get("preciso da fatura", "en") is None
+    assert (response_cache.hits, response_cache.misses) == (1, 1)
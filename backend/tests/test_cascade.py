@@ -0,0 +1,73 @@
+"""Routing of the two-stage model cascade."""
+
+import json
+import pytest
+from app import services
+from app.degradation import CircuitBreaker
+from app.llm import LLMCompletion
+
+EMAIL = "Subject: Boleto\n\nBody: Não consegui pagar o boleto da fatura deste mês."
+CLEANED = "conseguir pagar boleto fatura mês"
+
+REPLY = {
+    "is_productive": True,
+    "category": "payment_issue",
+    "suggested_subject": "Re: Boleto da fatura",
+    "suggested_body": "Olá, enviamos a segunda via do boleto para o seu e-mail. Qualquer dúvida, estamos à disposição.",
+}
+
+
+class FakeProvider:
+    """Answers every call with ``content`` and records the ``max_tokens`` asked for."""
+
+    name = "fake"
+
+    def __init__(self, content: str):
+        self.content = content
+        self.max_tokens: list[int] = []
+
+    def complete(self, system_prompt, user_message, max_tokens, temperature, json_mode=True, timeout=None):
+        self.max_tokens.append(max_tokens)
+        return LLMCompletion(self.content, prompt_tokens=10, completion_tokens=5, model="fake")
+
+
+@pytest.fixture
+def cascade(monkeypatch):
+    """Returns a function routing the cascade to a classifier naming ``category``."""
+    reply_model = FakeProvider(json.dumps(REPLY))
+    monkeypatch.setattr(services, "LLM_CASCADE", True)
+    monkeypatch.setattr(services, "LLM_REPLY_MAX_TOKENS", {"payment_issue": 450})
+    monkeypatch.setattr(services, "get_circuit_breaker", lambda: CircuitBreaker())
+    monkeypatch.setattr(services, "get_response_cache", lambda: None)
+    monkeypatch.setattr(services, "get_near_duplicate_index", lambda: None)
+    monkeypatch.setattr(services, "get_local_classifier", lambda: None)
+    monkeypatch.setattr(services, "get_llm_provider", lambda: reply_model)
+
+    def route(category: str) -> FakeProvider:
+        classifier = FakeProvider(json.dumps({"category": category}))
+        monkeypatch.setattr(services, "get_llm_classifier_provider", lambda: classifier)
+        return reply_model
+    return route
+
+
+def test_non_productive_emails_never_reach_the_reply_model(cascade):
+    reply_model = cascade("spam")
+    result = services.generate_response(EMAIL, CLEANED, "pt")
+
+    assert result["category"] == "spam"
+    assert not reply_model.max_tokens
+
+
+def test_productive_emails_get_their_category_budget(cascade):
+    reply_model = cascade("payment_issue")
+    result = services.generate_response(EMAIL, CLEANED, "pt")
+
+    assert result["category"] == "payment_issue"
+    assert reply_model.max_tokens == [450]
+
+
+def test_unknown_category_falls_back_to_a_single_stage_call(cascade):
+    reply_model = cascade("weather")
+    services.generate_response(EMAIL, CLEANED, "pt")
+
+    assert reply_model.max_tokens == [services.DEFAULT_MAX_TOKENS]
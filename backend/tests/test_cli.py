@@ -0,0 +1,80 @@
+"""Input readers, resumed runs and per-email failure isolation of the offline CLI."""
+
+import json
+from app import cli
+
+EMAILS = [{"id": str(index), "subject": f"Pedido {index}", "body": "Qual o status do meu pedido?"} for index in range(3)]
+
+
+def answer(email_content: str) -> dict:
+    if "Pedido 1" in email_content:
+        raise KeyError("suggested_body")
+    return {"is_productive": True, "category": "information_request", "suggested_subject": "Re: Pedido",
+            "suggested_body": "Seu pedido está a caminho.", "detected_language": "pt"}
+
+
+def test_unexpected_error_becomes_an_error_record(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "classify_and_respond", answer)
+    inputs = tmp_path / "emails.json"
+    inputs.write_text(json.dumps(EMAILS), encoding="utf-8")
+    output = tmp_path / "results.jsonl"
+
+    counters = cli.run([inputs], output, workers=2, resume=False, progress_every=60)
+
+    records = {record["id"]: record for record in map(json.loads, output.read_text().splitlines())}
+    assert counters["processed"] == 3 and counters["errors"] == 1
+    assert records["1"]["code"] == "KeyError"
+    assert records["2"]["category"] == "information_request"
+
+
+def test_resume_retries_errors_and_degraded_answers(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text("\n".join(json.dumps(record) for record in [
+        {"id": "0", "category": "information_request", "degraded": False},
+        {"id": "1", "error": "LLM unavailable", "code": "LLMServiceError"},
+        {"id": "2", "category": "information_request", "degraded": True},
+    ]) + "\n", encoding="utf-8")
+
+    assert cli.load_completed_ids(output) == {"0"}
+
+
+def test_mbox_messages_are_split_and_unquoted(tmp_path):
+    mbox = tmp_path / "inbox.mbox"
+    mbox.write_bytes(
+        b"From a@example.com Mon Jan  1 00:00:00 2024\nSubject: Boleto\n\nPreciso do boleto.\n"
+        b">From the finance team, thanks.\n\n"
+        b"From b@example.com Mon Jan  1 00:01:00 2024\nSubject: Oi\n\nTudo certo.\n"
+    )
+
+    messages = list(cli.iter_inputs([mbox]))
+
+    assert [record_id for record_id, _ in messages] == [f"{mbox}:0", f"{mbox}:1"]
+    first = cli._message_to_email(messages[0][1])
+    assert first.subject == "Boleto"
+    assert "From the finance team" in first.body
+    assert cli._message_to_email(messages[1][1]).body.strip() == "Tudo certo."
+
+
+def test_json_array_items_spanning_read_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "_JSON_CHUNK_SIZE", 7)
+    inputs = tmp_path / "emails.json"
+    inputs.write_text(json.dumps(EMAILS + [{"subject": "Sem id", "body": "]}"}], indent=2), encoding="utf-8")
+
+    items = list(cli.iter_inputs([inputs]))
+
+    assert [record_id for record_id, _ in items] == ["0", "1", "2", f"{inputs}:3"]
+    assert items[3][1]["body"] == "]}"
+
+
+def test_resumed_run_skips_completed_ids_after_a_cut_line(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "classify_and_respond", lambda email_content: answer(email_content.replace("1", "9")))
+    inputs = tmp_path / "emails.jsonl"
+    inputs.write_text("\n".join(map(json.dumps, EMAILS)), encoding="utf-8")
+    output = tmp_path / "results.jsonl"
+    output.write_text(json.dumps({"id": "0", "category": "information_request"}) + '\n{"id": "1", "cat', encoding="utf-8")
+
+    counters = cli.run([inputs], output, workers=1, resume=True, progress_every=60)
+
+    lines = output.read_text().splitlines()
+    assert counters["skipped"] == 1 and counters["processed"] == 2
+    assert [json.loads(line)["id"] for line in lines[2:]] == ["1", "2"]
@@ -0,0 +1,89 @@
+"""Circuit breaker trials: calls that end without a verdict, and stale calls."""
+
+import time
+import pytest
+from app import services
+from app.degradation import CircuitBreaker
+from app.llm import StubProvider
+
+EMAIL = "Subject: Boleto\n\nBody: Não consegui pagar o boleto da fatura deste mês."
+CLEANED = "conseguir pagar boleto fatura mês"
+
+
+def use_breaker(monkeypatch, breaker: CircuitBreaker, provider: StubProvider) -> None:
+    """Send every email to ``provider`` through ``breaker``, with no cache or classifier shortcut."""
+    monkeypatch.setattr(services, "get_circuit_breaker", lambda: breaker)
+    monkeypatch.setattr(services, "get_response_cache", lambda: None)
+    monkeypatch.setattr(services, "get_near_duplicate_index", lambda: None)
+    monkeypatch.setattr(services, "get_local_classifier", lambda: None)
+    monkeypatch.setattr(services, "get_llm_provider", lambda: provider)
+
+
+@pytest.fixture
+def half_open_breaker(monkeypatch):
+    """A breaker opened by one failure whose reset timeout already passed."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure(breaker.allow())
+    time.sleep(0.02)
+    assert breaker.state == "half_open"
+    use_breaker(monkeypatch, breaker, StubProvider(latency_ms=0, jitter_ms=0))
+    return breaker
+
+
+def test_queue_deadline_releases_trial(half_open_breaker):
+    # The deadline passes while the trial call waits for the scheduler
+    result = services.generate_response(EMAIL, CLEANED, "pt", deadline=time.monotonic() - 1)
+
+    assert result["degraded"] is True
+    assert half_open_breaker.state == "half_open"
+    assert half_open_breaker.allow(), "the next call must be let through as a new trial"
+
+
+def test_next_trial_closes_breaker(half_open_breaker):
+    services.generate_response(EMAIL, CLEANED, "pt", deadline=time.monotonic() - 1)
+
+    result = services.generate_response(EMAIL, CLEANED, "pt")
+
+    assert "degraded" not in result
+    assert half_open_breaker.state == "closed"
+
+
+def test_client_disconnect_releases_trial(half_open_breaker):
+    events = services.stream_response(EMAIL, CLEANED, "pt")
+    assert next(events)[0] == "category"
+    events.close()
+
+    assert half_open_breaker.allow()
+
+
+def test_stale_call_cannot_settle_or_release_the_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    stale = breaker.allow()
+    breaker.record_failure(breaker.allow())
+    time.sleep(0.02)
+    trial = breaker.allow()
+    assert trial.trial
+
+    # The slow call admitted while the breaker was closed ends now
+    breaker.release_trial(stale)
+    breaker.record_failure(stale)
+    assert breaker.state == "half_open"
+    assert breaker.allow() is None, "only one trial may be in flight"
+
+    breaker.record_success(stale)
+    assert breaker.state == "half_open"
+
+    breaker.record_success(trial)
+    assert breaker.state == "closed"
+
+
+def test_slow_provider_call_ends_at_the_deadline(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    use_breaker(monkeypatch, breaker, StubProvider(latency_ms=5000, jitter_ms=0))
+
+    start = time.monotonic()
+    result = services.generate_response(EMAIL, CLEANED, "pt", deadline=start + 0.2)
+
+    assert time.monotonic() - start < 1
+    assert result["degraded"] is True
+    assert breaker.failures == 1
@@ -0,0 +1,28 @@
+"""Where sign-offs end the new message of an email."""
+
+from app.extraction import extract_new_content
+
+
+def test_sign_off_mid_message_keeps_what_follows():
+    text = (
+        "Subject: Boleto\n\nBody: Oi, tudo bem?\nObrigado\n"
+        "Ainda não recebi a segunda via do boleto de março.\nPodem reenviar hoje?\n\n"
+        "Atenciosamente,\nMaria Souza\nAnalista Financeira | Empresa X\nTel: (11) 3333-4444"
+    )
+    extracted = extract_new_content(text)
+    assert "segunda via do boleto" in extracted
+    assert "Podem reenviar hoje?" in extracted
+    assert extracted.endswith("Analista Financeira | Empresa X")
+
+
+def test_bare_thanks_before_a_request_is_not_a_closing():
+    text = "Body: Hi team,\nThanks!\nI still need the invoice for order 1234.\nBest\nJohn"
+    assert "invoice for order 1234" in extract_new_content(text)
+
+
+def test_sign_off_before_signature_and_disclaimer_closes_the_message():
+    text = (
+        "Body: My access is blocked.\n\nBest regards,\nJohn Smith\n\n"
+        "CONFIDENTIALITY NOTICE: This email and any attachments are confidential."
+    )
+    assert extract_new_content(text) == "Body: My access is blocked.\n\nBest regards,\nJohn Smith"
@@ -0,0 +1,24 @@
+"""Conversion of HTML email bodies to the plain text the extraction reads."""
+
+from app.html_text import html_to_text
+
+
+def test_skips_styles_decodes_entities_and_breaks_blocks():
+    text = (
+        "Subject: Fatura\n\n<html><head><style>p { color: red; }</style></head><body>"
+        "<p>Ol&aacute;, preciso da fatura &amp; do recibo.</p><div>Obrigado,<br>Ana</div>"
+        "</body></html>"
+    )
+    assert html_to_text(text, 1000) == (
+        "Subject: Fatura\n\nOlá, preciso da fatura & do recibo.\n\nObrigado,\nAna"
+    )
+
+
+def test_blockquote_lines_get_quote_prefixes():
+    text = "<p>Sure, see below.</p><blockquote><p>Can you send the invoice?</p></blockquote>"
+    assert html_to_text(text, 1000) == "Sure, see below.\n\n> Can you send the invoice?"
+
+
+def test_text_after_the_last_tag_is_cut_at_the_budget():
+    text = "<p>Hello</p>" + "word " * 100_000
+    assert len(html_to_text(text, 200)) <= 200
@@ -0,0 +1,31 @@
+"""Adoption of unfinished jobs after a restart."""
+
+import os
+from app import jobs
+from app.schemas import Email
+
+EMAILS = [Email(subject="Boleto", body="Não consegui pagar o boleto."), Email(subject="Hi", body="Hello there.")]
+
+
+def test_restart_with_same_pid_adopts_jobs(tmp_path, monkeypatch):
+    store = jobs.JobStore(str(tmp_path / "jobs.sqlite3"))
+    job = store.create(EMAILS)
+    assert store.adopt_orphaned() == []
+
+    # New process start with the same PID (uvicorn as PID 1 in a container)
+    monkeypatch.setattr(jobs, "_boot", (os.getpid(), "restarted"))
+    adopted = jobs.JobStore(store.path).adopt_orphaned()
+
+    assert [(job_id, index) for job_id, index, _ in adopted] == [(job["job_id"], 0), (job["job_id"], 1)]
+
+
+def test_jobs_of_running_sibling_are_kept(tmp_path, monkeypatch):
+    store = jobs.JobStore(str(tmp_path / "jobs.sqlite3"))
+    store.create(EMAILS)
+    # Owned by another running process (our parent stands in for a sibling worker)
+    store._conn.execute("UPDATE jobs SET owner_pid = ?", (os.getppid(),))
+    store._conn.commit()
+
+    monkeypatch.setattr(jobs, "_boot", (os.getpid(), "sibling"))
+
+    assert jobs.JobStore(store.path).adopt_orphaned() == []
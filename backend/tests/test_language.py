@@ -0,0 +1,42 @@
+"""Decisions of the fast language detector and its fallback."""
+
+from app.language import DEFAULT_LANGUAGE, FastLanguageDetector, LanguageDetector
+
+
+class FixedDetector(LanguageDetector):
+    def __init__(self, lang: str):
+        self.lang = lang
+        self.texts: list[str] = []
+
+    def detect(self, text: str) -> str:
+        self.texts.append(text)
+        return self.lang
+
+
+def test_clear_texts_are_decided_without_the_fallback():
+    fallback = FixedDetector("es")
+    detector = FastLanguageDetector(["pt", "en"], fallback=fallback)
+
+    assert detector.detect("Olá, gostaria de saber quando a minha fatura vai chegar.") == "pt"
+    assert detector.detect("Hi, could you please tell me when my invoice will arrive?") == "en"
+    assert detector.stats()["fast_hits"] == 2
+    assert not fallback.texts
+
+
+def test_ambiguous_text_goes_to_the_fallback_prefix():
+    fallback = FixedDetector("en")
+    detector = FastLanguageDetector(["pt", "en"], prefix_chars=20, fallback=fallback)
+
+    assert detector.detect("Pedido 12345 / Order 12345 " * 10) == "en"
+    assert fallback.texts == ["Pedido 12345 / Order"]
+    assert detector.stats() == {"fast_hits": 0, "fallbacks": 1, "fast_hit_rate": 0.0}
+
+
+def test_text_without_evidence_defaults_without_a_fallback():
+    assert FastLanguageDetector(["pt", "en"]).detect("12345 !!!") == DEFAULT_LANGUAGE
+
+
+def test_only_the_prefix_is_scored():
+    detector = FastLanguageDetector(["pt", "en"], prefix_chars=30)
+    text = "Obrigado pela ajuda com o boleto. " + "the invoice for the order " * 20
+    assert detector.detect(text) == "pt"
@@ -0,0 +1,38 @@
+"""Lemma memo output against the model it memoizes."""
+
+import spacy
+from spacy.language import Language
+from app.lemmas import LemmaMemo
+from app.utils import _lemmatize
+
+# Lemmas of a homograph after a subject pronoun (verb) and elsewhere (noun)
+VERB_LEMMAS = {"leaves": "leave", "saw": "see"}
+NOUN_LEMMAS = {"leaves": "leaf", "saw": "saw"}
+
+
+@Language.component("test_lemmas_context_lemmatizer")
+def context_lemmatizer(doc):
+    """Stand-in for a tagger-driven lemmatizer: the lemma depends on the previous word."""
+    for token in doc:
+        after_subject = token.i > 0 and doc[token.i - 1].lower_ in ("he", "she", "i", "they")
+        token.lemma_ = (VERB_LEMMAS if after_subject else NOUN_LEMMAS).get(token.lower_, token.lower_)
+    return doc
+
+
+CORPUS = [
+    "The leaves fell from the tree.",
+    "He leaves the office early.",
+    "They saw the saw yesterday.",
+    "He leaves the office at 18.",
+    "The leaves fell from the tree.",
+    "The tree fell.",
+]
+
+
+def test_memo_matches_model_mode():
+    nlp = spacy.blank("en")
+    nlp.add_pipe("test_lemmas_context_lemmatizer")
+    memo = LemmaMemo(nlp, "en", max_entries=100)
+
+    assert [memo.lemmatize(text) for text in CORPUS] == [_lemmatize(nlp(text)) for text in CORPUS]
+    assert memo.hits > 0
@@ -0,0 +1,54 @@
+"""Failure normalization of the Groq and OpenAI-compatible providers and stub bookkeeping."""
+
+import httpx
+import pytest
+from app.llm import GroqProvider, LLMProviderError, OpenAICompatibleProvider, StubProvider
+
+
+def provider_answering(handler) -> OpenAICompatibleProvider:
+    provider = OpenAICompatibleProvider("model", "http://llm.test/v1", "", timeout=1)
+    provider.client = httpx.Client(base_url="http://llm.test/v1", transport=httpx.MockTransport(handler))
+    return provider
+
+
+def test_malformed_completion_is_retryable():
+    provider = provider_answering(lambda request: httpx.Response(200, text='{"choices": [{"mess'))
+    with pytest.raises(LLMProviderError) as error:
+        provider.complete("system", "user", 100, 0.3)
+    assert error.value.retryable
+
+
+def test_malformed_stream_chunk_is_retryable():
+    body = 'data: {"choices": [{"delta": {"content": "Ol"}}]}\n\ndata: {"choi\n\n'
+    provider = provider_answering(lambda request: httpx.Response(200, text=body))
+    stream = provider.stream("system", "user", 100, 0.3)
+    with pytest.raises(LLMProviderError) as error:
+        list(stream)
+    assert error.value.retryable
+
+
+def test_stub_forgets_messages_once_answered():
+    provider = StubProvider(latency_ms=0, jitter_ms=0)
+    for index in range(50):
+        provider.complete("system", f"Email {index}", 100, 0.3)
+    assert provider.calls == 50
+    assert not provider._attempts
+
+
+class BrokenStream(httpx.SyncByteStream):
+    def __iter__(self):
+        yield b'data: {"id": "1", "object": "chat.completion.chunk", "created": 0, "model": "model", ' \
+              b'"choices": [{"index": 0, "delta": {"content": "Ol"}}]}\n\n'
+        raise httpx.ReadTimeout("read timed out")
+
+
+def test_groq_stream_read_error_is_retryable():
+    provider = GroqProvider("model", "key", timeout=1)
+    transport = httpx.MockTransport(lambda request: httpx.Response(
+        200, headers={"content-type": "text/event-stream"}, stream=BrokenStream()))
+    provider.client = provider._errors.Groq(
+        api_key="key", max_retries=0, http_client=httpx.Client(transport=transport))
+    stream = provider.stream("system", "user", 100, 0.3)
+    with pytest.raises(LLMProviderError) as error:
+        list(stream)
+    assert error.value.retryable
@@ -0,0 +1,56 @@
+"""Training, persistence and the LLM shortcut of the local classifier."""
+
+import pytest
+from app import services
+from app.local_classifier import LocalClassifier
+
+SAMPLES = [
+    ("feliz natal boas festa equipe", "pt", "greeting"),
+    ("feliz ano novo equipe abraço", "pt", "greeting"),
+    ("boas festa família equipe", "pt", "greeting"),
+    ("ganhar prêmio clicar link agora", "pt", "spam"),
+    ("oferta imperdível clicar link ganhar", "pt", "spam"),
+    ("prêmio grátis clicar agora", "pt", "spam"),
+    ("boleto fatura vencer pagar", "pt", "payment_issue"),
+    ("pagar boleto fatura atrasar", "pt", "payment_issue"),
+    ("cobrança fatura pagar duplicar", "pt", "payment_issue"),
+]
+
+
+@pytest.fixture(scope="module")
+def model():
+    return LocalClassifier.train(SAMPLES, epochs=50)
+
+
+def test_confident_predictions_match_the_training_labels(model):
+    for text, lang, category in SAMPLES:
+        assert model.classify(text, lang) == category
+    assert model.stats()["hit_rate"] == 1.0
+
+
+def test_unknown_text_is_left_to_the_llm(model):
+    assert model.classify("senha acesso sistema bloquear", "pt") is None
+    assert model.local_hits < model.decisions
+
+
+def test_saved_model_predicts_the_same(model, tmp_path):
+    path = tmp_path / "model.json"
+    model.save(path)
+    loaded = LocalClassifier.load(path, threshold=model.threshold)
+
+    text = "pagar fatura boleto"
+    assert loaded.predict_proba(text, "pt") == pytest.approx(model.predict_proba(text, "pt"))
+
+
+def test_confident_email_skips_the_llm(monkeypatch, model):
+    def no_llm():
+        raise AssertionError("the LLM must not be called")
+
+    monkeypatch.setattr(services, "get_response_cache", lambda: None)
+    monkeypatch.setattr(services, "get_near_duplicate_index", lambda: None)
+    monkeypatch.setattr(services, "get_local_classifier", lambda: model)
+    monkeypatch.setattr(services, "get_llm_provider", no_llm)
+
+    result = services.generate_response("Subject: Natal\n\nBody: Feliz Natal!", "feliz natal boas festa", "pt")
+    assert result["category"] == "greeting"
+    assert result["is_productive"] is False
@@ -0,0 +1,62 @@
+"""SimHash fingerprints and LSH band lookups of the near-duplicate index."""
+
+import random
+import pytest
+from app import near_duplicates
+from app.near_duplicates import FINGERPRINT_BITS, NearDuplicateIndex, fingerprint
+
+RESULT = {"category": "billing", "suggested_body": "Segue a fatura."}
+
+
+@pytest.fixture
+def raw_fingerprints(monkeypatch):
+    """Texts are their own fingerprints, written in decimal."""
+    monkeypatch.setattr(near_duplicates, "fingerprint", int)
+
+
+def flip(value: int, bits) -> int:
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+@pytest.mark.parametrize("max_distance", [0, 3, 4, 7])
+def test_fingerprints_within_max_distance_share_a_band(raw_fingerprints, max_distance):
+    rng = random.Random(max_distance)
+    index = NearDuplicateIndex(max_distance, max_entries=1000)
+    for _ in range(200):
+        value = rng.getrandbits(FINGERPRINT_BITS)
+        index.add(str(value), "pt", RESULT)
+        near = flip(value, rng.sample(range(FINGERPRINT_BITS), max_distance))
+        assert index.get(str(near), "pt") is not None
+    assert index.misses == 0
+
+
+def test_fingerprints_differing_in_every_band_are_not_candidates(raw_fingerprints):
+    index = NearDuplicateIndex(3, max_entries=10)
+    index.add("0", "pt", RESULT)
+    # 4 bands of 16 bits: one differing bit in each of them
+    assert index.get(str(flip(0, [0, 16, 32, 48])), "pt") is None
+    assert index.get(str(flip(0, [0, 1, 16])), "pt") == (RESULT, 3)
+    assert index.get(str(flip(0, [0, 1, 16])), "en") is None
+
+
+def test_evicted_entries_leave_no_buckets_behind(raw_fingerprints):
+    index = NearDuplicateIndex(3, max_entries=2)
+    # One full band each, 32 bits apart from one another
+    first, second, third = 0xFFFF, 0xFFFF << 16, 0xFFFF << 32
+    for value in (first, second, third):
+        index.add(str(value), "pt", RESULT)
+
+    assert index.get(str(first), "pt") is None
+    assert index.get(str(third), "pt") == (RESULT, 0)
+    # Only the buckets of the two entries left remain
+    assert ("pt", 0, 0xFFFF) not in index._buckets
+    assert set().union(*index._buckets.values()) == {1, 2}
+
+
+def test_numbers_do_not_change_the_fingerprint():
+    first = fingerprint("pagar boleto fatura 123 vencer ontem cliente")
+    second = fingerprint("pagar boleto fatura 98765 vencer ontem cliente")
+    assert first == second is not None
+    assert fingerprint("boleto fatura vencer") is None
@@ -0,0 +1,50 @@
+"""Failure isolation between the emails of one request."""
+
+import asyncio
+from app import pipeline
+from app.exceptions import AppError
+from app.schemas import Email
+
+
+def test_unexpected_error_is_isolated_to_its_email(monkeypatch):
+    def generate_response(email_content, cleaned_text, lang, priority, deadline, new_content):
+        if "broken" in email_content:
+            raise KeyError("suggested_body")
+        return {"is_productive": False, "category": "greeting", "suggested_subject": "Re: Hi",
+                "suggested_body": "Thanks for your message.", "detected_language": lang}
+
+    monkeypatch.setattr(pipeline, "generate_response", generate_response)
+
+    async def run():
+        semaphore = asyncio.Semaphore(2)
+        return await asyncio.gather(*(
+            pipeline._process_single_email(Email(subject="Hi", body=body), semaphore, ("hello", "en", body))
+            for body in ("Hello there.", "This one is broken.")
+        ))
+
+    (ok, ok_error), (failed, failed_error) = asyncio.run(run())
+
+    assert ok["category"] == "greeting" and ok_error is None
+    assert failed["degraded"] is True
+    assert isinstance(failed_error, AppError)
+
+
+def test_broken_event_stream_still_ends_with_a_result(monkeypatch):
+    async def clean_email_text_async(text):
+        return "hello", "en", text
+
+    def stream_response(full_email_text, cleaned_text, lang, deadline, new_content):
+        yield "category", {"category": "greeting"}
+        raise KeyError("suggested_body")
+
+    monkeypatch.setattr(pipeline, "clean_email_text_async", clean_email_text_async)
+    monkeypatch.setattr(pipeline, "stream_response", stream_response)
+
+    async def run():
+        events = await pipeline.open_email_event_stream(Email(subject="Hi", body="Hello there."))
+        return [event async for event in events]
+
+    events = asyncio.run(run())
+
+    assert [event for event, _ in events] == ["category", "error", "result"]
+    assert events[-1][1]["degraded"] is True
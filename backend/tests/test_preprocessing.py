@@ -0,0 +1,45 @@
+"""Replacement of the preprocessing pool after a worker dies."""
+
+import asyncio
+import os
+import pytest
+from app import preprocessing
+from app.exceptions import NLPProcessingError
+
+
+def _no_models(warmup_barrier) -> None:
+    pass
+
+
+def _crash(text: str):
+    os._exit(1)
+
+
+@pytest.fixture
+def crashing_pool(monkeypatch):
+    monkeypatch.setattr(preprocessing, "PREPROCESS_WORKERS", 2)
+    monkeypatch.setattr(preprocessing, "PREPROCESS_START_METHOD", "fork")
+    monkeypatch.setattr(preprocessing, "_init_worker", _no_models)
+    monkeypatch.setattr(preprocessing, "_clean_email_text_timed", _crash)
+    yield
+    preprocessing.shutdown_preprocessing_pool()
+
+
+def test_concurrent_crashes_replace_the_pool_once(crashing_pool):
+    async def crash_twice():
+        return await asyncio.gather(
+            preprocessing.clean_email_text_async("a"),
+            preprocessing.clean_email_text_async("b"),
+            return_exceptions=True,
+        )
+
+    broken = preprocessing.start_preprocessing_pool()
+    errors = asyncio.run(crash_twice())
+    assert all(isinstance(error, NLPProcessingError) for error in errors)
+    assert preprocessing._executor is None
+
+    replacement = preprocessing.start_preprocessing_pool()
+    assert replacement is not broken
+    # A late caller of the broken pool must not drop its replacement
+    asyncio.run(preprocessing._replace_broken_pool(broken))
+    assert preprocessing._executor is replacement
@@ -0,0 +1,103 @@
+"""Pacing, priorities and retry policy of the LLM scheduler."""
+
+import threading
+import time
+import pytest
+from app.llm import LLMProviderError, parse_retry_after
+from app.rate_limit import (
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    LLMDeadlineExceeded,
+    LLMScheduler,
+    TokenBucket,
+)
+
+
+def failing(*errors):
+    """Call that raises ``errors`` in turn, then succeeds."""
+    errors = list(errors)
+    attempts = []
+
+    def call():
+        attempts.append(time.monotonic())
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+    return call, attempts
+
+
+def test_token_bucket_refills_up_to_its_capacity():
+    bucket = TokenBucket(capacity=60, rate=1)
+    now = bucket._updated
+    bucket.consume(60, now)
+
+    assert bucket.wait_time(10, now) == pytest.approx(10)
+    assert bucket.wait_time(10, now + 4) == pytest.approx(6)
+    # Amounts above the capacity only wait for a full bucket
+    assert bucket.wait_time(500, now + 4) == pytest.approx(56)
+    bucket.wait_time(0, now + 1000)
+    assert bucket.level == 60
+
+
+def test_interactive_callers_overtake_queued_bulk_ones():
+    scheduler = LLMScheduler(rpm=600)
+    scheduler.requests.level = 0
+    order = []
+
+    def run(name, priority):
+        scheduler.run(lambda: order.append(name), 10, priority=priority)
+
+    def wait_queued(count):
+        while len(scheduler._queue) < count:
+            time.sleep(0.001)
+
+    bulk = threading.Thread(target=run, args=("bulk", PRIORITY_BULK))
+    bulk.start()
+    wait_queued(1)
+    interactive = threading.Thread(target=run, args=("interactive", PRIORITY_INTERACTIVE))
+    interactive.start()
+    wait_queued(2)
+    bulk.join()
+    interactive.join()
+
+    assert order == ["interactive", "bulk"]
+
+
+def test_retry_after_sets_the_retry_delay():
+    scheduler = LLMScheduler(backoff_base=0)
+    call, attempts = failing(LLMProviderError("unavailable", 503, retry_after=0.2))
+
+    assert scheduler.run(call, 10) == "ok"
+    assert attempts[1] - attempts[0] >= 0.2
+    assert scheduler.stats()["retries"] == 1
+
+
+def test_rate_limit_halves_the_request_rate_and_success_recovers_it():
+    scheduler = LLMScheduler(rpm=60, backoff_base=0)
+    call, attempts = failing(LLMProviderError("slow down", 429, retry_after=0.1))
+
+    assert scheduler.run(call, 10) == "ok"
+    # The retry waited for the pause every caller shares
+    assert attempts[1] - attempts[0] >= 0.1
+    assert scheduler.rate_factor == pytest.approx(0.55)
+    assert scheduler.requests.rate == pytest.approx(0.55)
+    assert scheduler.stats()["rate_limited"] == 1
+
+
+def test_client_errors_and_late_retries_are_not_retried():
+    scheduler = LLMScheduler(backoff_base=0)
+    call, attempts = failing(LLMProviderError("bad request", 400))
+    with pytest.raises(LLMProviderError):
+        scheduler.run(call, 10)
+    assert len(attempts) == 1
+
+    call, attempts = failing(LLMProviderError("unavailable", 503, retry_after=5))
+    with pytest.raises(LLMDeadlineExceeded):
+        scheduler.run(call, 10, deadline=time.monotonic() + 1)
+    assert len(attempts) == 1
+
+
+def test_retry_after_headers_in_milliseconds_take_precedence():
+    assert parse_retry_after({"retry-after-ms": "1500", "retry-after": "10"}) == 1.5
+    assert parse_retry_after({"retry-after": "10"}) == 10
+    assert parse_retry_after({}) is None
@@ -0,0 +1,35 @@
+"""Incremental parsing of the JSON reply streamed by the LLM."""
+
+import json
+import pytest
+from app.streaming import JSONFieldStream
+
+REPLY = (
+    '{"is_productive": true, "category": "billing", "tags": [{"a": "}"}, 2],\n'
+    ' "suggested_subject": "Re: Fatura", "suggested_body": '
+    '"Ol\\u00e1 Ana,\\nsegue a \\"segunda via\\" \\ud83d\\ude00. Abra\\u00e7os"}'
+)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 16, len(REPLY)])
+def test_chunked_reply_gives_the_same_values_and_body(chunk_size):
+    parser = JSONFieldStream(["suggested_body"])
+    values, deltas = {}, []
+    for start in range(0, len(REPLY), chunk_size):
+        for kind, key, value in parser.feed(REPLY[start:start + chunk_size]):
+            if kind == "value":
+                values[key] = value
+            else:
+                assert key == "suggested_body"
+                deltas.append(value)
+
+    assert values == json.loads(REPLY)
+    assert "".join(deltas) == values["suggested_body"]
+
+
+def test_body_is_reported_before_its_closing_quote():
+    parser = JSONFieldStream(["suggested_body"])
+    assert parser.feed('{"category": "billing", "suggested_bo') == [("value", "category", "billing")]
+    assert parser.feed('dy": "Segue a') == [("delta", "suggested_body", "Segue a")]
+    assert parser.feed(' fatura.') == [("delta", "suggested_body", " fatura.")]
+    assert parser.feed('"}') == [("value", "suggested_body", "Segue a fatura.")]
@@ -33,7 +33,7 @@ function App() {
     setResults([]);
 
     try {
-      const response = await processEmails(emails);
+      const response = await processEmails(emails, setResults);
       setResults(response);
     } catch (err) {
       setError((err as Error).message || 'Error to process emails');
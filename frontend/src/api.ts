@@ -1,8 +1,19 @@
-import type { APIResponse, Email } from './types';
+import type { APIResponse, Email, JobResult } from './types';
 
 const API_URL = import.meta.env.VITE_API_URL;
 
-export async function processEmails(emails: Email[]): Promise<APIResponse[]> {
+// Batches up to this size use /process-email; larger ones run as a background job
+export const SYNC_BATCH_LIMIT = 10;
+export const MAX_EMAILS = 1000;
+
+export async function processEmails(
+  emails: Email[],
+  onProgress?: (results: APIResponse[]) => void,
+): Promise<APIResponse[]> {
+  if (emails.length > SYNC_BATCH_LIMIT) {
+    return processEmailsAsJob(emails, onProgress);
+  }
+
   const response = await fetch(`${API_URL}/process-email`, {
     method: 'POST',
     headers: {
@@ -20,3 +31,46 @@ export async function processEmails(emails: Email[]): Promise<APIResponse[]> {
   
   return data as APIResponse[];
 }
+
+async function processEmailsAsJob(
+  emails: Email[],
+  onProgress?: (results: APIResponse[]) => void,
+): Promise<APIResponse[]> {
+  const response = await fetch(`${API_URL}/jobs`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ emails }),
+  });
+
+  if (!response.ok) {
+    const errorData = await response.json();
+    throw new Error(errorData.detail || errorData.error || 'Erro ao processar emails');
+  }
+
+  const { jobId } = await response.json();
+  const results: (APIResponse | undefined)[] = new Array(emails.length);
+  const completed = () => results.filter((result): result is APIResponse => result !== undefined);
+
+  return new Promise((resolve, reject) => {
+    const events = new EventSource(`${API_URL}/jobs/${jobId}/events`);
+
+    events.addEventListener('result', (event) => {
+      const { index, ...result } = JSON.parse((event as MessageEvent).data) as JobResult;
+      results[index] = result;
+      onProgress?.(completed());
+    });
+    events.addEventListener('done', () => {
+      events.close();
+      resolve(completed());
+    });
+    events.onerror = () => {
+      // EventSource reconnects by itself (resuming after the last result);
+      // give up only once the browser has closed the stream
+      if (events.readyState === EventSource.CLOSED) {
+        reject(new Error('Conexão perdida ao acompanhar o processamento'));
+      }
+    };
+  });
+}
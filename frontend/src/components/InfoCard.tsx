@@ -8,7 +8,7 @@ export function InfoCard() {
         <p className="font-semibold mb-1">Como funciona?</p>
         <p>
           Cole o texto do email ou faça upload de um arquivo .txt ou .json. A IA irá classificar como{' '}
-          <strong>Produtivo</strong> ou <strong>Improdutivo</strong> e sugerir uma resposta automática. Máximo de 10 emails por análise.
+          <strong>Produtivo</strong> ou <strong>Improdutivo</strong> e sugerir uma resposta automática. Máximo de 1000 emails por análise; lotes com mais de 10 são processados em segundo plano e os resultados aparecem à medida que ficam prontos.
         </p>
       </div>
     </div>
@@ -2,6 +2,7 @@ import { useState } from 'react';
 import { Pencil, Type, Upload, UploadCloud, FileText, Sparkles } from 'lucide-react';
 import type { Email } from '../types';
 import { readFileContent, parseEmailsFromFile } from '../utils/emailParser';
+import { MAX_EMAILS } from '../api';
 
 interface InputSectionProps {
   onAnalyze: (emails: Email[]) => void;
@@ -99,8 +100,8 @@ export function InputSection({ onAnalyze, isLoading }: InputSectionProps) {
           return;
         }
 
-        if (emails.length > 10) {
-          setError('Máximo de 10 emails por vez. Seu arquivo contém ' + emails.length + ' emails.');
+        if (emails.length > MAX_EMAILS) {
+          setError(`Máximo de ${MAX_EMAILS} emails por vez. Seu arquivo contém ${emails.length} emails.`);
           return;
         }
 
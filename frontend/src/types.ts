@@ -18,6 +18,12 @@ export interface APIResponse {
     subject: string;
     body: string;
   };
+  degraded?: boolean;
+}
+
+export interface JobResult extends APIResponse {
+  index: number;
+  seq: number;
 }
 
 export type EmailCategory =
@@ -0,0 +1,23 @@
+import assert from 'node:assert/strict';
+import { test } from 'node:test';
+import { parseEmailsFromFile } from './emailParser.ts';
+
+test('keeps every email of the file', () => {
+  const content = Array.from(
+    { length: 25 },
+    (_, i) => `Subject: Pedido ${i}\nBody: Qual o status do pedido ${i}?\n`,
+  ).join('\n');
+
+  const emails = parseEmailsFromFile(content);
+
+  assert.equal(emails.length, 25);
+  assert.deepEqual(emails[24], { subject: 'Pedido 24', body: 'Qual o status do pedido 24?' });
+});
+
+test('joins body lines and skips emails without a body', () => {
+  const content = 'Subject: Vazio\n\nSubject: Boleto\nBody: Não consigo pagar.\nPodem ajudar?\n';
+
+  assert.deepEqual(parseEmailsFromFile(content), [
+    { subject: 'Boleto', body: 'Não consigo pagar.\nPodem ajudar?' },
+  ]);
+});
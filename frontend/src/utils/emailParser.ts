@@ -39,7 +39,8 @@ export function parseEmailsFromFile(content: string): Email[] {
     }
   }
 
-  return emails.slice(0, 10); // Max 10 emails
+  // The caller enforces MAX_EMAILS so it can tell the user how many the file has
+  return emails;
 }
 
 export function readFileContent(file: File): Promise<string> {